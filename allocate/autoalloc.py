@@ -0,0 +1,171 @@
+"""
+Load-balanced auto-allocation of pending jobs to writers.
+
+Writer load is read in one aggregation (open word count and nearest expected
+deadline of each writer's allocated / in-progress jobs) and kept in a heap.
+Pending jobs are taken most urgent first (earliest ``strict_deadline``) and
+each goes to the least loaded writer, whose load is then pushed back with the
+job added. That is O(jobs x log writers): thousands of jobs over hundreds of
+writers plan in a few milliseconds once the two reads are done.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Optional
+
+from authentication.models import CustomUser
+from crm_project.mongo import get_collection
+from marketing.models import Job
+
+from .services import MAX_BATCH, allocate_jobs
+from .workload import open_work
+
+_NO_DEADLINE = datetime.max.replace(tzinfo=dt_timezone.utc)
+
+
+@dataclass
+class WriterLoad:
+    writer_id: int
+    name: str
+    open_words: int = 0
+    open_jobs: int = 0
+    nearest_deadline: Optional[datetime] = None
+
+    def sort_key(self):
+        # Fewest open words first; on a tie, the writer whose next deadline is
+        # furthest away (or who has none) is the less busy one.
+        nearest = self.nearest_deadline.timestamp() if self.nearest_deadline else float('inf')
+        return (self.open_words, -nearest, self.writer_id)
+
+
+@dataclass(frozen=True)
+class Assignment:
+    job: int
+    job_id: str
+    word_count: int
+    strict_deadline: Optional[datetime]
+    writer_id: int
+    writer_name: str
+
+
+@dataclass
+class AllocationPlan:
+    assignments: List[Assignment] = field(default_factory=list)
+    # (job pk, job_id) of jobs no writer had capacity for
+    unassigned: List[tuple] = field(default_factory=list)
+    writers: List[WriterLoad] = field(default_factory=list)
+
+
+def _aware(value):
+    return value.replace(tzinfo=dt_timezone.utc) if value and value.tzinfo is None else value
+
+
+def _column(name):
+    return Job._meta.get_field(name).column
+
+
+def writer_loads():
+    """
+    Current load of every approved, active writer.
+    """
+    loads = {
+        pk: WriterLoad(pk, f'{first} {last}'.strip())
+        for pk, first, last in CustomUser.objects.filter(
+            role='writer', is_active=True, approval_status='approved'
+        ).values_list('id', 'first_name', 'last_name')
+    }
+    if not loads:
+        return []
+
+    for pk, work in open_work('writer', loads).items():
+        load = loads[pk]
+        load.open_words = work['words']
+        load.open_jobs = work['jobs']
+        load.nearest_deadline = _aware(work['nearest'])
+    return list(loads.values())
+
+
+def pending_jobs(limit=None):
+    """
+    Pending jobs as dicts, most urgent (earliest strict deadline) first.
+    Jobs without a deadline go last.
+    """
+    columns = {name: _column(name) for name in ('job_id', 'word_count', 'strict_deadline', 'expected_deadline')}
+    docs = get_collection(Job).find(
+        {_column('status'): 'pending_allocation'},
+        {'id': 1, **{column: 1 for column in columns.values()}},
+    )
+    jobs = [
+        {'pk': doc['id'], **{name: doc.get(column) for name, column in columns.items()}}
+        for doc in docs
+    ]
+    for job in jobs:
+        job['strict_deadline'] = _aware(job['strict_deadline'])
+        job['expected_deadline'] = _aware(job['expected_deadline'])
+    jobs.sort(key=lambda job: (job['strict_deadline'] or _NO_DEADLINE, job['pk']))
+    return jobs[:limit] if limit else jobs
+
+
+def plan(limit=None, max_words=None):
+    """
+    Work out who gets which pending job, without writing anything.
+
+    ``max_words`` caps a writer's open word count; jobs that would push even
+    the least loaded writer over it stay unassigned.
+    """
+    writers = writer_loads()
+    result = AllocationPlan(writers=writers)
+    jobs = pending_jobs(limit)
+    if not writers:
+        result.unassigned = [(job['pk'], job['job_id']) for job in jobs]
+        return result
+
+    heap = [(load.sort_key(), load) for load in writers]
+    heapq.heapify(heap)
+    for job in jobs:
+        words = job['word_count'] or 0
+        load = heap[0][1]
+        if max_words is not None and load.open_words + words > max_words:
+            result.unassigned.append((job['pk'], job['job_id']))
+            continue
+
+        load.open_words += words
+        load.open_jobs += 1
+        if job['expected_deadline'] and (
+            load.nearest_deadline is None or job['expected_deadline'] < load.nearest_deadline
+        ):
+            load.nearest_deadline = job['expected_deadline']
+        heapq.heapreplace(heap, (load.sort_key(), load))
+
+        result.assignments.append(Assignment(
+            job=job['pk'],
+            job_id=job['job_id'],
+            word_count=words,
+            strict_deadline=job['strict_deadline'],
+            writer_id=load.writer_id,
+            writer_name=load.name,
+        ))
+    return result
+
+
+def apply(allocation_plan, allocator):
+    """
+    Carry out a plan through the bulk allocation path. Returns its results.
+    """
+    return allocate_pairs([(a.job, a.writer_id) for a in allocation_plan.assignments], allocator)
+
+
+def allocate_pairs(pairs, allocator):
+    """
+    Allocate each ``(job pk, writer pk)`` pair, ``MAX_BATCH`` at a time, and
+    return the results of allocate_jobs: jobs no longer pending are skipped.
+    """
+    items = [
+        {'job': job, 'assignee_type': 'writer', 'assignee_id': writer_id}
+        for job, writer_id in pairs
+    ]
+    results = []
+    for start in range(0, len(items), MAX_BATCH):
+        results.extend(allocate_jobs(allocator, items[start:start + MAX_BATCH]))
+    return results
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from allocate import autoalloc
+from authentication.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Allocate pending jobs to the least loaded approved writers, most urgent "
+        "strict deadline first. Use --dry-run to preview the plan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Print the plan without allocating anything.',
+        )
+        parser.add_argument(
+            '--allocator', metavar='EMAIL',
+            help='Allocator recorded as allocated_by (required unless --dry-run).',
+        )
+        parser.add_argument(
+            '--limit', type=int,
+            help='Only consider the N most urgent pending jobs.',
+        )
+        parser.add_argument(
+            '--max-words', type=int,
+            help="Cap on a writer's open word count.",
+        )
+
+    def handle(self, *args, **options):
+        allocator = None
+        if not options['dry_run']:
+            if not options['allocator']:
+                raise CommandError('--allocator is required unless --dry-run is given.')
+            try:
+                allocator = CustomUser.objects.get(email=options['allocator'], role='allocator')
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"No allocator with email {options['allocator']}.")
+
+        started = time.perf_counter()
+        plan = autoalloc.plan(limit=options['limit'], max_words=options['max_words'])
+        elapsed = (time.perf_counter() - started) * 1000
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        for a in plan.assignments:
+            deadline = a.strict_deadline.strftime('%Y-%m-%d %H:%M') if a.strict_deadline else '-'
+            self.stdout.write(f'{prefix}{a.job_id:<20} {a.word_count:>7} words  due {deadline}  -> {a.writer_name}')
+        self.stdout.write(
+            f'{prefix}Planned {len(plan.assignments)} job(s) over {len(plan.writers)} writer(s) '
+            f'in {elapsed:.1f} ms; {len(plan.unassigned)} left unassigned.'
+        )
+        if options['dry_run']:
+            return
+
+        results = autoalloc.apply(plan, allocator)
+        allocated = sum(1 for result in results if result['ok'])
+        self.stdout.write(self.style.SUCCESS(f'Allocated {allocated} job(s).'))
+        for result in results:
+            if not result['ok']:
+                self.stdout.write(self.style.WARNING(f"job {result['job']}: {result['error']}"))
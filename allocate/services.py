@@ -0,0 +1,153 @@
+"""
+Bulk job allocation.
+
+``allocate_jobs`` takes many ``(job pk, assignee type, assignee id)`` items and
+costs a fixed number of round trips however many there are: one query for
+the assignees, one for the jobs, one ``bulk_write`` and one counter update,
+plus one ``notify_assignee`` task per job allocated.
+"""
+
+from django.utils import timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from authentication.models import CustomUser
+from crm_project.mongo import get_collection
+from marketing import counters
+from marketing.models import Job
+
+from .tasks import notify_assignee
+from .workload import invalidate_workload
+
+ASSIGNEE_TYPES = ('writer', 'process')
+
+# Largest batch accepted in one call.
+MAX_BATCH = 200
+
+
+def _column(name):
+    return Job._meta.get_field(name).column
+
+
+def _assignment(assignee_type, assignee, allocator, now):
+    """
+    Field changes made by allocating a job, as ``{field name: value}``.
+    """
+    if assignee_type == 'writer':
+        return {
+            'allocated_to': assignee.pk,
+            'allocated_by': allocator.pk,
+            'allocated_at': now,
+            'status': 'allocated',
+        }
+    return {
+        'process_user': assignee.pk,
+        'process_assigned_at': now,
+        'status': 'processing_queue',
+    }
+
+
+def allocate_jobs(allocator, items):
+    """
+    Allocate every pending job in ``items`` (dicts with ``job``,
+    ``assignee_type`` and ``assignee_id``) and return one result dict per
+    item, in order: ``{'job': pk, 'ok': True, 'job_id', 'status', 'assignee'}``
+    or ``{'job': pk, 'ok': False, 'error': message}``.
+
+    Only jobs still pending allocation are touched; a job allocated by someone
+    else in the meantime comes back as an error instead of being reassigned.
+    Every job allocated gets its assignee notified.
+    """
+    results = [None] * len(items)
+    wanted = {}
+    for i, item in enumerate(items):
+        try:
+            pk = int(item['job'])
+            assignee_id = int(item['assignee_id'])
+            assignee_type = item['assignee_type']
+        except (KeyError, TypeError, ValueError):
+            results[i] = {'job': item.get('job') if isinstance(item, dict) else None,
+                          'ok': False, 'error': 'Malformed allocation.'}
+            continue
+        if assignee_type not in ASSIGNEE_TYPES:
+            results[i] = {'job': pk, 'ok': False, 'error': 'Invalid assignee type.'}
+        elif pk in wanted:
+            results[i] = {'job': pk, 'ok': False, 'error': 'Job listed more than once.'}
+        else:
+            wanted[pk] = (i, assignee_type, assignee_id)
+
+    assignees = CustomUser.objects.filter(
+        id__in={assignee_id for _, _, assignee_id in wanted.values()},
+        role__in=ASSIGNEE_TYPES,
+        is_active=True,
+        approval_status='approved',
+    ).only('id', 'role', 'first_name', 'last_name').in_bulk()
+    jobs = Job.objects.filter(pk__in=wanted).only('job_id', *counters.JobSnapshot._fields).in_bulk()
+
+    now = timezone.now()
+    # BSON dates have millisecond precision; keep `now` comparable after a write.
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    ops, planned = [], {}
+    for pk, (i, assignee_type, assignee_id) in wanted.items():
+        assignee = assignees.get(assignee_id)
+        job = jobs.get(pk)
+        if job is None:
+            results[i] = {'job': pk, 'ok': False, 'error': 'Job not found.'}
+        elif job.status != 'pending_allocation':
+            results[i] = {'job': pk, 'ok': False, 'error': f'Job {job.job_id} is no longer pending allocation.'}
+        elif assignee is None or assignee.role != assignee_type:
+            results[i] = {'job': pk, 'ok': False, 'error': 'Invalid assignee selected.'}
+        else:
+            changes = _assignment(assignee_type, assignee, allocator, now)
+            ops.append(UpdateOne(
+                {'id': pk, _column('status'): 'pending_allocation'},
+                {'$set': {**{_column(name): value for name, value in changes.items()},
+                          _column('updated_at'): now}},
+            ))
+            planned[pk] = (i, job, assignee, changes)
+
+    if ops:
+        collection = get_collection(Job)
+        try:
+            result = collection.bulk_write(ops, ordered=False)
+            lost = len(ops) - result.matched_count
+        except BulkWriteError:
+            lost = len(ops)
+        landed = set(planned)
+        if lost:
+            # Somebody else got to some of the jobs first (or the write failed
+            # part-way): find out which of our updates actually stuck.
+            landed = {
+                doc['id'] for doc in collection.find(
+                    {'id': {'$in': list(planned)},
+                     '$or': [{_column('allocated_at'): now}, {_column('process_assigned_at'): now}]},
+                    {'id': 1},
+                )
+            }
+
+        transitions = []
+        for pk, (i, job, assignee, changes) in planned.items():
+            if pk not in landed:
+                results[i] = {'job': pk, 'ok': False, 'error': f'Job {job.job_id} was allocated by someone else.'}
+                continue
+            old = counters.snapshot(job)
+            new = old._replace(**{
+                (f'{name}_id' if name in ('allocated_to', 'process_user') else name): value
+                for name, value in changes.items() if name != 'allocated_by'
+            })
+            transitions.append((old, new))
+            results[i] = {
+                'job': pk,
+                'ok': True,
+                'job_id': job.job_id,
+                'status': changes['status'],
+                'assignee': f'{assignee.first_name} {assignee.last_name}',
+            }
+        counters.apply_transitions(transitions)
+        if transitions:
+            invalidate_workload()
+        for pk, (i, job, assignee, changes) in planned.items():
+            if results[i]['ok']:
+                notify_assignee.enqueue(pk, assignee.pk)
+
+    return results
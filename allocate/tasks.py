@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from authentication.models import CustomUser
+from marketing.models import Job
+from tasks.queue import task
+
+
+@task(max_attempts=5, retry_delay=60)
+def notify_assignee(job_id, assignee_id):
+    """
+    Email the writer or process user a job was just allocated to.
+    """
+    job = Job.objects.filter(pk=job_id).first()
+    assignee = CustomUser.objects.filter(pk=assignee_id).first()
+    if job is None or assignee is None or not assignee.email:
+        return
+    if assignee_id not in (job.allocated_to_id, job.process_user_id):
+        return  # reallocated since
+    lines = [f'Hello {assignee.first_name or assignee.username},', '', f'Job {job.job_id} has been assigned to you.']
+    if job.topic:
+        lines.append(f'Topic: {job.topic}')
+    if job.word_count:
+        lines.append(f'Word count: {job.word_count}')
+    if job.expected_deadline:
+        lines.append(f'Expected deadline: {job.expected_deadline:%Y-%m-%d %H:%M} UTC')
+    send_mail(f'New job assigned: {job.job_id}', '\n'.join(lines) + '\n', settings.DEFAULT_FROM_EMAIL,
+              [assignee.email])
@@ -1,3 +1,128 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.messages import get_messages
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from marketing.models import Job
+from monitoring.standin import StandInTestCase
+from tasks.models import Task
+
+from .services import allocate_jobs
+from .tasks import notify_assignee
+
+
+def make_user(email, role):
+    return CustomUser.objects.create_user(
+        username=email, email=email, password='pass12345', first_name=email.split('@')[0],
+        last_name='Test', role=role, approval_status='approved', is_active=True,
+    )
+
+
+class AllocationNotificationTests(StandInTestCase):
+    """
+    Every path that allocates a job queues exactly one notify_assignee task
+    per job allocated, and none for the jobs it could not allocate.
+    """
+
+    def setUp(self):
+        super().setUp()
+        settings = override_settings(TASKS_IN_PROCESS=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.allocator = make_user('allocator@example.com', 'allocator')
+        self.writer = make_user('writer@example.com', 'writer')
+        self.marketer = make_user('marketer@example.com', 'marketing')
+
+    def make_job(self, job_id, status='pending_allocation'):
+        return Job.objects.create(
+            job_id=job_id,
+            instructions='Write it',
+            created_by=self.marketer,
+            status=status,
+            expected_deadline=timezone.now() + timedelta(days=2),
+        )
+
+    def notifications(self):
+        return sorted(
+            json.loads(task.payload)['args'] for task in Task.objects.filter(name=notify_assignee.name)
+        )
+
+    def expected(self, *jobs):
+        return sorted([job.pk, self.writer.pk] for job in jobs)
+
+    def test_bulk_allocation_notifies_each_landed_job_once(self):
+        first, second = self.make_job('PENDING-1'), self.make_job('PENDING-2')
+        taken = self.make_job('TAKEN-1', status='allocated')
+
+        results = allocate_jobs(self.allocator, [
+            {'job': job.pk, 'assignee_type': 'writer', 'assignee_id': self.writer.pk}
+            for job in (first, second, taken)
+        ])
+
+        self.assertEqual([result['ok'] for result in results], [True, True, False])
+        self.assertEqual(self.notifications(), self.expected(first, second))
+
+    def test_single_allocation_notifies_once(self):
+        job = self.make_job('PENDING-1')
+        client = Client()
+        client.force_login(self.allocator)
+
+        response = client.post(reverse('allocate:allocate_job', args=[job.pk]), {
+            'assignee_type': 'writer', 'assignee_id': self.writer.pk,
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.notifications(), self.expected(job))
+        # Already allocated: a second attempt changes nothing.
+        client.post(reverse('allocate:allocate_job', args=[job.pk]), {
+            'assignee_type': 'writer', 'assignee_id': self.writer.pk,
+        })
+        self.assertEqual(self.notifications(), self.expected(job))
+
+
+class AutoAllocateViewTests(StandInTestCase):
+    """
+    Applying an auto-allocation carries out the previewed plan, not a new one.
+    """
+
+    def setUp(self):
+        super().setUp()
+        settings = override_settings(TASKS_IN_PROCESS=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.allocator = make_user('allocator@example.com', 'allocator')
+        self.writer = make_user('writer@example.com', 'writer')
+        self.other = make_user('other@example.com', 'writer')
+        marketer = make_user('marketer@example.com', 'marketing')
+        self.jobs = [
+            Job.objects.create(job_id=f'PENDING-{i}', instructions='Write it', created_by=marketer,
+                               status='pending_allocation', word_count=100)
+            for i in range(2)
+        ]
+        self.client = Client()
+        self.client.force_login(self.allocator)
+
+    def test_post_applies_the_previewed_pairs(self):
+        url = reverse('allocate:auto_allocate')
+        preview = self.client.get(url)
+        planned = preview.context['assignments']
+        self.assertEqual(len(planned.split(',')), 2)
+
+        # Meanwhile: one previewed job is allocated by hand, one new job arrives.
+        taken, kept = self.jobs
+        allocate_jobs(self.allocator, [{'job': taken.pk, 'assignee_type': 'writer', 'assignee_id': self.other.pk}])
+        late = Job.objects.create(job_id='LATE', instructions='Write it', created_by=taken.created_by,
+                                  status='pending_allocation', word_count=100)
+
+        response = self.client.post(url, {'assignments': planned})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Job.objects.get(pk=taken.pk).allocated_to_id, self.other.pk)
+        self.assertEqual(Job.objects.get(pk=kept.pk).status, 'allocated')
+        self.assertEqual(Job.objects.get(pk=late.pk).status, 'pending_allocation')
+        warnings = [str(m) for m in get_messages(response.wsgi_request) if m.level_tag == 'warning']
+        self.assertEqual(warnings, ['1 job(s) skipped: Job PENDING-0 is no longer pending allocation.'])
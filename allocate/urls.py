@@ -4,6 +4,10 @@ from . import views
 app_name = 'allocate'
 
 urlpatterns = [
-    path('<int:job_id>/', views.allocate_job_view, name='allocate_job'),
+    path('<int:pk>/', views.allocate_job_view, name='allocate_job'),
+    path('auto/', views.auto_allocate_view, name='auto_allocate'),
+    path('bulk/', views.bulk_allocate, name='bulk_allocate'),
     path('get-assignees/', views.get_assignees_ajax, name='get_assignees'),
+    path('queue/', views.queue_json, name='queue'),
+    path('job/<int:pk>/', views.job_detail, name='job_detail'),
 ]
\ No newline at end of file
@@ -1,21 +1,30 @@
+import hashlib
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
+from django.views.decorators.http import require_POST
 from django.http import JsonResponse
-from authentication.models import CustomUser
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from crm_project.pagination import DEFAULT_PAGE_SIZE, InvalidCursor, KeysetPaginator
 from marketing.models import Job
+from . import autoalloc
+from .services import MAX_BATCH, allocate_jobs
+from .workload import DEFAULT_SEARCH_LIMIT, search_assignees
 
 @login_required
-def allocate_job_view(request, job_id):
+def allocate_job_view(request, pk):
     """
-    Allocate a job to either a Writer or Process user
+    Allocate a job to either a Writer or Process user (through allocate_jobs)
     """
     if request.user.role != 'allocator':
         messages.error(request, 'You do not have permission to allocate jobs.')
         return redirect('dashboard')
    
-    job = get_object_or_404(Job, pk=job_id)
+    job = get_object_or_404(Job, pk=pk)
    
     if request.method == 'POST':
         assignee_type = request.POST.get('assignee_type')
@@ -25,36 +34,20 @@ def allocate_job_view(request, job_id):
             messages.error(request, 'Please select both assignment type and assignee.')
             return redirect('dashboard')
        
-        try:
-            assignee = CustomUser.objects.get(
-                id=assignee_id,
-                role=assignee_type,
-                is_active=True,
-                approval_status='approved'
-            )
-        except CustomUser.DoesNotExist:
-            messages.error(request, 'Invalid assignee selected.')
-            return redirect('dashboard')
-       
-        # Allocate based on type
-        if assignee_type == 'writer':
-            job.allocated_to = assignee
-            job.allocated_by = request.user
-            job.allocated_at = timezone.now()
-            job.status = 'allocated'
-            job.save(update_fields=['allocated_to', 'allocated_by', 'allocated_at', 'status'])
+        [result] = allocate_jobs(request.user, [
+            {'job': job.pk, 'assignee_type': assignee_type, 'assignee_id': assignee_id},
+        ])
+        if not result['ok']:
+            messages.error(request, result['error'])
+        elif assignee_type == 'writer':
             messages.success(
                 request,
-                f'Job {job.job_id} successfully allocated to writer {assignee.first_name} {assignee.last_name}.'
+                f'Job {job.job_id} successfully allocated to writer {result["assignee"]}.'
             )
-        elif assignee_type == 'process':
-            job.process_user = assignee
-            job.process_assigned_at = timezone.now()
-            job.status = 'processing_queue'
-            job.save(update_fields=['process_user', 'process_assigned_at', 'status'])
+        else:
             messages.success(
                 request,
-                f'Job {job.job_id} successfully assigned to process user {assignee.first_name} {assignee.last_name}.'
+                f'Job {job.job_id} successfully assigned to process user {result["assignee"]}.'
             )
        
         return redirect('dashboard')
@@ -62,10 +55,81 @@ def allocate_job_view(request, job_id):
     # GET request - redirect to dashboard
     return redirect('dashboard')
 
+@login_required
+@require_POST
+def bulk_allocate(request):
+    """
+    Allocate many jobs in one request.
+    JSON body: {"allocations": [{"job": <pk>, "assignee_type": "writer"|"process", "assignee_id": <pk>}, ...]}
+    Returns one result per allocation, in order.
+    """
+    if request.user.role != 'allocator':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    try:
+        allocations = json.loads(request.body)['allocations']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON body with an "allocations" list'}, status=400)
+    if not isinstance(allocations, list) or not allocations:
+        return JsonResponse({'error': 'No allocations given'}, status=400)
+    if len(allocations) > MAX_BATCH:
+        return JsonResponse({'error': f'At most {MAX_BATCH} allocations per request'}, status=400)
+
+    results = allocate_jobs(request.user, allocations)
+    allocated = sum(1 for result in results if result['ok'])
+    return JsonResponse({
+        'results': results,
+        'allocated': allocated,
+        'failed': len(results) - allocated,
+    })
+
+@login_required
+def auto_allocate_view(request):
+    """
+    Auto-allocate pending jobs to the least loaded writers.
+    GET shows a dry-run preview of the plan; POST carries out exactly the
+    previewed (job, writer) pairs, skipping jobs allocated in the meantime.
+    """
+    if request.user.role != 'allocator':
+        messages.error(request, 'You do not have permission to allocate jobs.')
+        return redirect('dashboard')
+
+    if request.method == 'POST':
+        # "<job pk>:<writer pk>,..." - one field, however long the plan
+        # (DATA_UPLOAD_MAX_NUMBER_FIELDS counts fields).
+        pairs = [value.partition(':')[::2] for value in request.POST.get('assignments', '').split(',') if value]
+        if not pairs:
+            messages.error(request, 'Nothing to allocate.')
+            return redirect('dashboard')
+        results = autoalloc.allocate_pairs(pairs, request.user)
+        allocated = sum(1 for result in results if result['ok'])
+        if allocated:
+            messages.success(request, f'Auto-allocated {allocated} job(s) to writers.')
+        skipped = [result['error'] for result in results if not result['ok']]
+        if skipped:
+            messages.warning(request, f'{len(skipped)} job(s) skipped: ' + ' '.join(skipped[:10])
+                             + (' ...' if len(skipped) > 10 else ''))
+        return redirect('dashboard')
+
+    try:
+        max_words = int(request.GET.get('max_words') or 0) or None
+    except ValueError:
+        max_words = None
+
+    plan = autoalloc.plan(max_words=max_words)
+    return render(request, 'allocate/auto_allocate.html', {
+        'plan': plan,
+        'assignments': ','.join(f'{a.job}:{a.writer_id}' for a in plan.assignments),
+        'max_words': max_words,
+        'writers': sorted(plan.writers, key=lambda load: -load.open_words),
+    })
+
 @login_required
 def get_assignees_ajax(request):
     """
-    AJAX endpoint to get list of writers or process users
+    AJAX typeahead for writers or process users.
+    ?type=writer|process&q=<name or email prefix>&limit=<n>
+    Each hit carries the assignee's open jobs and words. Supports ETag / 304.
     """
     if request.user.role != 'allocator':
         return JsonResponse({'error': 'Unauthorized'}, status=403)
@@ -74,11 +138,81 @@ def get_assignees_ajax(request):
    
     if assignee_type not in ['writer', 'process']:
         return JsonResponse({'error': 'Invalid type'}, status=400)
-   
-    users = CustomUser.objects.filter(
-        role=assignee_type,
-        is_active=True,
-        approval_status='approved'
-    ).values('id', 'first_name', 'last_name', 'email').order_by('first_name', 'last_name')
-   
-    return JsonResponse({'assignees': list(users)})
\ No newline at end of file
+
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit'}, status=400)
+
+    assignees = search_assignees(assignee_type, request.GET.get('q', ''), limit)
+    response = JsonResponse({'assignees': assignees})
+    # Revalidate every time; an unchanged result set costs a 304 and no body.
+    response['ETag'] = quote_etag(hashlib.md5(response.content).hexdigest())
+    response['Cache-Control'] = 'private, no-cache'
+    return get_conditional_response(request, etag=response['ETag'], response=response)
+
+@login_required
+def queue_json(request):
+    """
+    JSON keyset page of the allocator queues.
+    ?queue=pending|allocated, plus ?cursor=<next_cursor> for following pages.
+    """
+    if request.user.role != 'allocator':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    queues = {
+        'pending': Job.objects.filter(status='pending_allocation'),
+        'allocated': Job.objects.filter(status__in=['allocated', 'in_progress']),
+    }
+    queryset = queues.get(request.GET.get('queue', 'pending'))
+    if queryset is None:
+        return JsonResponse({'error': 'Invalid queue'}, status=400)
+
+    try:
+        paginator = KeysetPaginator(queryset, per_page=int(request.GET.get('per_page', DEFAULT_PAGE_SIZE)))
+        page = paginator.page(request.GET.get('cursor') or None)
+    except (ValueError, InvalidCursor):
+        return JsonResponse({'error': 'Invalid cursor or page size'}, status=400)
+
+    return JsonResponse({
+        'results': [job.as_dict() for job in page],
+        'next_cursor': page.next_cursor,
+    })
+
+
+@login_required
+def job_detail(request, pk):
+    """
+    Details and allocation form for a single job, loaded when the allocator
+    opens the job modal. Returns an HTML fragment, or JSON with ?format=json.
+    """
+    if request.user.role != 'allocator':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    job = get_object_or_404(Job.objects.prefetch_related('created_by', 'allocated_to'), pk=pk)
+
+    if request.GET.get('format') == 'json':
+        data = job.as_dict()
+        data.update({
+            'instructions': job.instructions,
+            'completion_instructions': job.completion_instructions,
+            'referencing_style': job.get_referencing_style_display() if job.referencing_style else None,
+            'writing_style': job.get_writing_style_display() if job.writing_style else None,
+            'attachment_url': reverse('job_attachment', args=[job.pk]) if job.attachment else None,
+            'preview': {
+                'status': job.preview_status,
+                'text': job.preview_text,
+                'pages': job.preview_pages,
+                'words': job.preview_words,
+                'detail': job.preview_detail,
+            } if job.attachment else None,
+            'created_by_name': f'{job.created_by.first_name} {job.created_by.last_name}',
+            'allocated_to_name': (f'{job.allocated_to.first_name} {job.allocated_to.last_name}'
+                                  if job.allocated_to else None),
+            'allocated_to_role': job.allocated_to.role if job.allocated_to else None,
+            'detail_url': reverse('allocate:job_detail', args=[job.pk]),
+            'allocate_url': reverse('allocate:allocate_job', args=[job.pk]),
+        })
+        return JsonResponse(data)
+
+    return render(request, 'allocate/job_detail.html', {'job': job})
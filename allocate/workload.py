@@ -0,0 +1,120 @@
+"""
+Assignee workload and typeahead search.
+
+``open_work`` aggregates the open jobs of writers / process users in one
+round trip. The typeahead reads it through a short-lived cache entry per
+assignee type, which allocation invalidates, so searching while typing
+doesn't re-aggregate on every keystroke.
+"""
+
+import re
+
+from django.core.cache import cache
+
+from authentication.models import CustomUser
+from crm_project.mongo import get_collection
+from marketing.models import Job
+
+# assignee type -> (job field pointing at the assignee, statuses still open)
+OPEN_WORK = {
+    'writer': ('allocated_to', ['allocated', 'in_progress']),
+    'process': ('process_user', ['processing_queue', 'processing']),
+}
+
+WORKLOAD_CACHE_TIMEOUT = 30
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email')
+
+
+def _column(name):
+    return Job._meta.get_field(name).column
+
+
+def open_work(assignee_type, assignee_ids=None):
+    """
+    ``{assignee pk: {'jobs', 'words', 'nearest'}}`` for assignees with open
+    jobs (``nearest`` being the earliest expected deadline among them).
+    """
+    field, statuses = OPEN_WORK[assignee_type]
+    match = {_column(field): {'$ne': None}, _column('status'): {'$in': statuses}}
+    if assignee_ids is not None:
+        match[_column(field)] = {'$in': list(assignee_ids)}
+
+    rows = get_collection(Job).aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': '$' + _column(field),
+            'words': {'$sum': {'$ifNull': ['$' + _column('word_count'), 0]}},
+            'jobs': {'$sum': 1},
+            'nearest': {'$min': '$' + _column('expected_deadline')},
+        }},
+    ])
+    return {row['_id']: {'jobs': row['jobs'], 'words': int(row['words']), 'nearest': row['nearest']}
+            for row in rows}
+
+
+def _cache_key(assignee_type):
+    return f'allocate:workload:{assignee_type}'
+
+
+def cached_workload(assignee_type):
+    """
+    ``{assignee pk: (open jobs, open words)}``, at most
+    WORKLOAD_CACHE_TIMEOUT seconds old.
+    """
+    workload = cache.get(_cache_key(assignee_type))
+    if workload is None:
+        workload = {pk: (work['jobs'], work['words']) for pk, work in open_work(assignee_type).items()}
+        cache.set(_cache_key(assignee_type), workload, WORKLOAD_CACHE_TIMEOUT)
+    return workload
+
+
+def invalidate_workload():
+    cache.delete_many([_cache_key(assignee_type) for assignee_type in OPEN_WORK])
+
+
+def _prefix_variants(query):
+    # Anchored, case-sensitive regexes are index range scans; case-insensitive
+    # ones are not. Names are stored as typed, so try the common casings.
+    return {query, query.lower(), query.capitalize()}
+
+
+def search_assignees(assignee_type, query='', limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Up to ``limit`` approved, active assignees of ``assignee_type`` whose
+    first name, last name or email starts with ``query``, ordered by name and
+    annotated with their open jobs / words.
+    """
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    meta = CustomUser._meta
+    match = {
+        meta.get_field('role').column: assignee_type,
+        meta.get_field('approval_status').column: 'approved',
+        meta.get_field('is_active').column: True,
+    }
+    query = query.strip()
+    if query:
+        # One simple anchored regex per branch: each is a tight prefix range on
+        # one of the user_search_* indexes (an alternation would not be).
+        match['$or'] = [
+            {meta.get_field(name).column: {'$regex': '^' + re.escape(variant)}}
+            for name in SEARCH_FIELDS
+            for variant in sorted(_prefix_variants(query))
+        ]
+
+    columns = {name: meta.get_field(name).column for name in ('id',) + SEARCH_FIELDS}
+    docs = get_collection(CustomUser).find(
+        match, {column: 1 for column in columns.values()},
+    ).sort([(columns['first_name'], 1), (columns['last_name'], 1)]).limit(limit)
+
+    workload = cached_workload(assignee_type)
+    results = []
+    for doc in docs:
+        hit = {name: doc.get(column) for name, column in columns.items()}
+        hit['open_jobs'], hit['open_words'] = workload.get(hit['id'], (0, 0))
+        results.append(hit)
+    return results
+
@@ -48,6 +48,18 @@ class CustomUser(AbstractUser):
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+
+    # MongoDB indexes, created through pymongo by `manage.py sync_job_indexes`
+    # (same format as Job.MONGO_INDEXES).
+    MONGO_INDEXES = [
+        # assignee typeahead: prefix search on name / email within a role
+        {'name': 'user_search_first_name',
+         'keys': [('role', 1), ('approval_status', 1), ('is_active', 1), ('first_name', 1), ('last_name', 1)]},
+        {'name': 'user_search_last_name',
+         'keys': [('role', 1), ('approval_status', 1), ('is_active', 1), ('last_name', 1)]},
+        {'name': 'user_search_email',
+         'keys': [('role', 1), ('approval_status', 1), ('is_active', 1), ('email', 1)]},
+    ]
     
     class Meta:
         db_table = 'authentication_customuser'
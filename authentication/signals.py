@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from crm_project import changes
+
+from .models import CustomUser
+
+
+# Saved without changing anything a page shows (the login's last_login update).
+UNSHOWN_FIELDS = frozenset({'last_login', 'password'})
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def mark_users_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and update_fields <= UNSHOWN_FIELDS:
+        return
+    # 'users': user lists, approval counts and assignee lists;
+    # 'user:<pk>': pages showing this user's own details (crm_project.changes).
+    changes.bump(['users', f'user:{instance.pk}'])
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from tasks.queue import task
+
+from .models import CustomUser
+
+
+@task(max_attempts=5, retry_delay=60)
+def send_approval_decision(user_id):
+    """
+    Email a user whether their registration was approved or rejected.
+    """
+    user = CustomUser.objects.filter(pk=user_id).first()
+    if user is None or not user.email or user.approval_status == 'pending':
+        return
+    name = user.first_name or user.username
+    if user.approval_status == 'approved':
+        subject = 'Your account has been approved'
+        body = (
+            f'Hello {name},\n\n'
+            f'Your registration has been approved with the role {user.get_role_display()}. '
+            f'You can now log in.\n'
+        )
+    else:
+        subject = 'Your registration was not approved'
+        body = f'Hello {name},\n\nYour registration has been rejected.\n'
+        if user.rejection_reason:
+            body += f'\nReason: {user.rejection_reason}\n'
+    send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [user.email])
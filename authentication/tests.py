@@ -1,3 +1,32 @@
-from django.test import TestCase
+from django.contrib.auth.models import update_last_login
 
-# Create your tests here.
+from crm_project import changes
+from monitoring.standin import StandInTestCase
+
+from .models import CustomUser
+
+
+class UserChangeMarkerTests(StandInTestCase):
+    """
+    Saving a user bumps the user change markers, unless the save only
+    touched fields no page shows.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(
+            username='writer@example.com', email='writer@example.com', password='pass12345', role='writer',
+        )
+        self.scopes = ['users', f'user:{self.user.pk}']
+
+    def test_login_does_not_bump(self):
+        before = changes.read_versions(self.scopes)
+        update_last_login(None, self.user)
+        self.assertEqual(changes.read_versions(self.scopes), before)
+
+    def test_shown_field_bumps(self):
+        before = changes.read_versions(self.scopes)
+        self.user.first_name = 'Renamed'
+        self.user.save(update_fields=['first_name', 'last_login'])
+        after = changes.read_versions(self.scopes)
+        self.assertTrue(all(after[scope] != before[scope] for scope in self.scopes))
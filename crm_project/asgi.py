@@ -3,6 +3,13 @@ ASGI config for crm_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with e.g. ``uvicorn crm_project.asgi:application`` and set
+ASYNC_DASHBOARDS=1, so the dashboards run their reads concurrently (see
+crm_project.parallel and ``manage.py bench_dashboards``), and
+LIVE_DASHBOARDS=1 for live dashboard updates. Those come from the process
+that made the change: with several workers, changes made in the others
+reach a stream as a ``resync`` event (crm_project.events).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -13,4 +20,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+application = django_application
+
+from django.conf import settings  # noqa: E402
+
+if settings.LIVE_DASHBOARDS:
+    # Imported once Django is set up.
+    from crm_project.events import EventStreamApp
+    from marketing import live
+
+    # The live dashboard stream is served with asyncio (see crm_project.events).
+    application = EventStreamApp(django_application, 'dashboard_events', live.channels_for)
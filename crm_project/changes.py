@@ -0,0 +1,123 @@
+"""
+Change markers for conditional GET.
+
+Every write that can alter a dashboard bumps a version number on one or more
+named scopes (``allocator``, ``users``, ``writer:<pk>``, ...) in the
+``change_markers`` collection. A dashboard's validator is a hash of the
+versions of the scopes it displays plus who is asking, so checking whether
+the page changed is one indexed ``find`` by ``_id`` - and when it didn't the
+view answers ``304 Not Modified`` without running its querysets or rendering.
+"""
+
+import hashlib
+import logging
+from datetime import timezone as dt_timezone
+
+from django.contrib import messages
+from django.utils import timezone
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from .mongo import get_database
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'change_markers'
+
+
+def _collection():
+    return get_database()[COLLECTION]
+
+
+def bump(scopes):
+    """
+    Record a change to each of ``scopes``.
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return
+    try:
+        _collection().bulk_write([
+            UpdateOne({'_id': scope}, {'$inc': {'v': 1}, '$currentDate': {'at': True}}, upsert=True)
+            for scope in scopes
+        ], ordered=False)
+    except PyMongoError:
+        # A missed bump only means a stale 304 until the next write to the scope.
+        logger.warning('Could not bump change markers %s', sorted(scopes), exc_info=True)
+
+
+def versions(request, scopes):
+    """
+    ``{scope: (version, changed_at)}`` for ``scopes``, or None if the markers
+    can't be read. Memoized on the request so the ETag and Last-Modified
+    callbacks share one round trip.
+    """
+    key = tuple(sorted(scopes))
+    cache = request.__dict__.setdefault('_change_versions', {})
+    if key not in cache:
+        cache[key] = read_versions(key)
+    return cache[key]
+
+
+def read_versions(scopes):
+    """
+    ``versions`` without the memoizing, for callers outside a request.
+    """
+    try:
+        docs = _collection().find({'_id': {'$in': list(scopes)}})
+        return {doc['_id']: (doc.get('v', 0), doc.get('at')) for doc in docs}
+    except PyMongoError:
+        logger.warning('Could not read change markers', exc_info=True)
+        return None
+
+
+def _cacheable(request):
+    # Pending flash messages are part of the page and are consumed by
+    # rendering it, so a 304 would swallow them.
+    return request.method in ('GET', 'HEAD') and not len(messages.get_messages(request))
+
+
+def conditional_etag(scopes_for):
+    """
+    ETag callback for ``django.views.decorators.http.condition``.
+
+    ``scopes_for(request)`` names the scopes a page shows (or None to opt the
+    request out). The tag also covers the user, their role, the query string
+    (pagination cursors), today's date (``... today`` counters) and the CSRF
+    cookie, whose token the page embeds.
+    """
+    def etag(request, *args, **kwargs):
+        scopes = scopes_for(request)
+        if scopes is None or not _cacheable(request):
+            return None
+        current = versions(request, scopes)
+        if current is None:
+            return None
+        parts = [
+            str(request.user.pk),
+            request.user.role,
+            request.get_full_path(),
+            timezone.localdate().isoformat(),
+            request.META.get('CSRF_COOKIE', ''),
+        ]
+        parts += [f'{scope}={current.get(scope, (0, None))[0]}' for scope in sorted(scopes)]
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return etag
+
+
+def conditional_last_modified(scopes_for):
+    """
+    Last-Modified callback to pair with ``conditional_etag``: the latest
+    change among the page's scopes.
+    """
+    def last_modified(request, *args, **kwargs):
+        scopes = scopes_for(request)
+        if scopes is None or not _cacheable(request):
+            return None
+        current = versions(request, scopes)
+        stamps = [at for _, at in (current or {}).values() if at]
+        if not stamps:
+            return None
+        latest = max(stamps)
+        return timezone.make_aware(latest, dt_timezone.utc) if timezone.is_naive(latest) else latest
+    return last_modified
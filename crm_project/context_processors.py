@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def live_dashboards(request):
+    """
+    ``live_dashboards``: whether pages should open the live update stream
+    (LIVE_DASHBOARDS, see crm_project.events).
+    """
+    return {'live_dashboards': settings.LIVE_DASHBOARDS}
@@ -0,0 +1,165 @@
+"""
+Serving stored files to authorized users.
+
+Views authorize the request, then call ``serve()`` with the file's name.
+MEDIA_SENDFILE picks who sends the bytes:
+
+    'nginx'   X-Accel-Redirect to MEDIA_ACCEL_REDIRECT_PREFIX + the file's
+              path under MEDIA_ROOT; the prefix must be an ``internal``
+              location aliasing MEDIA_ROOT. nginx handles Range and
+              conditional requests itself.
+    'apache'  X-Sendfile with the absolute path (mod_xsendfile).
+    None      Python: ETag / If-None-Match, a single-range Range (and
+              If-Range), and a FileResponse whose file the WSGI server can
+              hand to sendfile() (``wsgi.file_wrapper``, e.g. gunicorn).
+
+Nothing under MEDIA_ROOT is served without going through a view.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+from .storage import name_sha256
+
+# Roles that see every job's files.
+STAFF_ROLES = ('allocator', 'manager', 'admin', 'superadmin')
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def can_access_job_files(user, job):
+    """
+    Staff, the marketer who created the job, its writer and its process user.
+    """
+    if user.role in STAFF_ROLES:
+        return True
+    owner = {
+        'marketing': job.created_by_id,
+        'writer': job.allocated_to_id,
+        'process': job.process_user_id,
+    }.get(user.role)
+    return owner is not None and owner == user.pk
+
+
+def _content_disposition(as_attachment, filename):
+    # As FileResponse writes it.
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        file_expr = 'filename="{}"'.format(filename.replace('\\', '\\\\').replace('"', r'\"'))
+    except UnicodeEncodeError:
+        file_expr = "filename*=utf-8''{}".format(quote(filename))
+    return f'{disposition}; {file_expr}'
+
+
+class _FileRange:
+    """
+    ``length`` bytes of ``file`` from its current position. Keeps
+    ``fileno()`` so the WSGI server can still use sendfile(), bounded by
+    the Content-Length.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _byte_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single-range Range header, None to
+    ignore the header, or False when it can't be satisfied.
+    """
+    match = _RANGE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None  # several ranges or malformed: send the whole file
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length and size else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return False
+    return start, end
+
+
+def serve(request, name, storage=default_storage, as_attachment=False):
+    """
+    Response sending the stored file ``name``, under its original file name.
+    """
+    try:
+        full_path = storage.path(name)
+        stat = os.stat(full_path)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        raise Http404('No such file.')
+
+    filename = posixpath.basename(name)
+    content_type, encoding = mimetypes.guess_type(filename)
+    if encoding or not content_type:
+        # Never Content-Encoding: a .gz must download as it is.
+        content_type = 'application/octet-stream'
+    headers = {
+        'Content-Disposition': _content_disposition(as_attachment, filename),
+        'Cache-Control': 'private, max-age=0, must-revalidate',
+    }
+
+    backend = settings.MEDIA_SENDFILE
+    if backend == 'nginx':
+        relative = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        headers['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(relative)
+        return HttpResponse(content_type=content_type, headers=headers)
+    if backend == 'apache':
+        headers['X-Sendfile'] = full_path
+        return HttpResponse(content_type=content_type, headers=headers)
+
+    # Content-addressed names carry their hash; legacy files change with
+    # their mtime and size.
+    etag = quote_etag(name_sha256(name) or f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    headers['ETag'] = etag
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        return HttpResponseNotModified(headers={'ETag': etag, 'Cache-Control': headers['Cache-Control']})
+
+    size = stat.st_size
+    headers['Accept-Ranges'] = 'bytes'
+    byte_range = None
+    if 'Range' in request.headers and request.headers.get('If-Range', etag) == etag:
+        byte_range = _byte_range(request.headers['Range'], size)
+    if byte_range is False:
+        headers['Content-Range'] = f'bytes */{size}'
+        return HttpResponse(status=416, headers=headers)
+
+    f = open(full_path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        f.seek(start)
+        response = FileResponse(_FileRange(f, end - start + 1), status=206, content_type=content_type)
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        headers['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(f, content_type=content_type)
+    for header, value in headers.items():
+        response[header] = value
+    return response
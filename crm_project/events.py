@@ -0,0 +1,322 @@
+"""
+Server-sent events, fed by an in-process publish/subscribe broker.
+
+``publish(channels, event, data)`` hands a message to every open stream
+subscribed to one of ``channels``; ``EventStreamApp`` serves the streams,
+a ``text/event-stream`` of those messages. Channels are change-marker scopes
+(crm_project.changes: ``allocator``, ``writer:<pk>``, ...), and publishers
+send one message per marker bump, which is what lets a stream notice what
+it missed (below).
+
+Each message has an id, and the broker keeps the last SSE_REPLAY of them:
+a browser reconnecting with ``Last-Event-ID`` gets what it missed. When
+that is no longer kept (or the id comes from another process), the stream
+sends a ``resync`` event instead, and the page should reload what it shows.
+
+The broker lives in one process. Writes made by other processes - other
+web workers, ``sweep_deadlines``, ``run_tasks`` - are noticed through the
+change markers: every SSE_HEARTBEAT_SECONDS a stream compares how far the
+markers of its channels moved with the messages it got, and sends
+``resync`` if some are missing (otherwise a comment line, which also keeps
+proxies from timing the connection out).
+
+Streams are only served under ASGI, with LIVE_DASHBOARDS set: under WSGI
+each open tab would hold a worker thread for the length of its stream, and
+Django 4.1 iterates streaming responses on the event loop under ASGI, so
+``EventStreamApp`` serves the stream URL itself, with asyncio. A stream
+ends after SSE_MAX_SECONDS and the browser reconnects without losing
+anything. Without LIVE_DASHBOARDS nothing is published.
+"""
+
+import asyncio
+import io
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import Counter, deque, namedtuple
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import reverse
+
+from .changes import read_versions
+
+Message = namedtuple('Message', ['id', 'channels', 'event', 'data'])
+
+# Messages a slow client may fall behind by before it gets a resync instead.
+MAX_PENDING = 1000
+
+STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    # Don't let nginx buffer the stream.
+    'X-Accel-Buffering': 'no',
+}
+
+
+class Subscription:
+    """
+    Messages for one stream, read with ``aget``.
+    """
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        # Messages per channel, against the change markers.
+        self.received = Counter()
+        self.overflowed = False
+        self._messages = deque()
+        self._lock = threading.Lock()
+        self._waker = None
+
+    def deliver(self, message):
+        with self._lock:
+            if len(self._messages) < MAX_PENDING:
+                self._messages.append(message)
+            else:
+                self.overflowed = True
+            self.received.update(self.channels & message.channels)
+            waker = self._waker
+        if waker:
+            loop, ready = waker
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # the loop closed with the stream
+
+    def _take(self):
+        messages, overflowed = list(self._messages), self.overflowed
+        self._messages.clear()
+        self.overflowed = False
+        return messages, overflowed
+
+    async def aget(self, timeout):
+        """
+        ``(messages, overflowed)`` as soon as there are any, or after
+        ``timeout`` seconds.
+        """
+        ready = asyncio.Event()
+        with self._lock:
+            if self._messages or self.overflowed:
+                return self._take()
+            self._waker = (asyncio.get_running_loop(), ready)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waker = None
+        with self._lock:
+            return self._take()
+
+    def take_received(self):
+        with self._lock:
+            received, self.received = self.received, Counter()
+        return received
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self, replay):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._recent = deque(maxlen=replay)
+        self._ids = itertools.count(1)
+        self._last = 0
+        # Ids are only meaningful to the process that issued them.
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def message_id(self, n):
+        return f'{self.epoch}-{n}'
+
+    @property
+    def last_id(self):
+        return self.message_id(self._last)
+
+    def subscribe(self, channels, last_event_id=None):
+        """
+        A new Subscription to ``channels``, holding what was published
+        after ``last_event_id`` if that is still known.
+        """
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+            if last_event_id:
+                epoch, _, n = last_event_id.partition('-')
+                n = int(n) if n.isdigit() else -1
+                oldest = self._recent[0].id if self._recent else self._last + 1
+                if epoch != self.epoch or not oldest - 1 <= n <= self._last:
+                    subscription.overflowed = True
+                else:
+                    for message in self._recent:
+                        if message.id > n and subscription.channels & message.channels:
+                            subscription.deliver(message)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channels, event, data):
+        channels = frozenset(channels)
+        with self._lock:
+            message = Message(next(self._ids), channels, event, data)
+            self._last = message.id
+            self._recent.append(message)
+            targets = set().union(*(self._subscribers.get(channel, ()) for channel in channels))
+        for subscription in targets:
+            subscription.deliver(message)
+        return message
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = Broker(settings.SSE_REPLAY)
+    return _broker
+
+
+def publish(channels, event, data):
+    """
+    Send ``event`` with JSON-serializable ``data`` to the streams of
+    ``channels`` in this process.
+    """
+    if channels and settings.LIVE_DASHBOARDS:
+        broker().publish(channels, event, data)
+
+
+def _frame(event, data, message_id=None):
+    lines = [f'id: {message_id}'] if message_id else []
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder))
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class _Stream:
+    """
+    One stream's framing, timing and the heartbeat's change-marker check.
+    """
+
+    def __init__(self, subscription):
+        self.subscription = subscription
+        self.markers = read_versions(subscription.channels)
+        self.next_heartbeat = time.monotonic() + settings.SSE_HEARTBEAT_SECONDS
+        self.deadline = time.monotonic() + settings.SSE_MAX_SECONDS
+
+    def opening(self):
+        # How long the browser waits before reconnecting, in ms.
+        return b'retry: 3000\n\n'
+
+    def render(self, messages, overflowed):
+        broker = self.subscription.broker
+        if overflowed:
+            return _frame('resync', {}, broker.last_id)
+        return b''.join(_frame(message.event, message.data, broker.message_id(message.id))
+                        for message in messages)
+
+    def heartbeat_due(self):
+        return time.monotonic() >= self.next_heartbeat
+
+    def heartbeat(self):
+        self.next_heartbeat = time.monotonic() + settings.SSE_HEARTBEAT_SECONDS
+        markers = read_versions(self.subscription.channels)
+        if markers is None:
+            return b': keepalive\n\n'
+        previous, self.markers = self.markers or {}, markers
+        received = self.subscription.take_received()
+        for channel, (version, _) in markers.items():
+            moved = version - previous.get(channel, (0, None))[0]
+            if moved > received[channel]:
+                # Written by another process: this one never heard of it.
+                return _frame('resync', {}, self.subscription.broker.last_id)
+        return b': keepalive\n\n'
+
+    def wait_time(self):
+        return max(0, min(self.next_heartbeat, self.deadline) - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.deadline
+
+
+class EventStreamApp:
+    """
+    ASGI application serving the URL named ``url_name`` as an event stream
+    of ``channels_for(user)`` and passing everything else on to
+    ``application``. ``channels_for`` returns None to refuse the user.
+    """
+
+    def __init__(self, application, url_name, channels_for):
+        self.application = application
+        self.url_name = url_name
+        self.channels_for = channels_for
+        self._path = None
+
+    async def __call__(self, scope, receive, send):
+        if self._path is None:
+            self._path = reverse(self.url_name)
+        if scope['type'] != 'http' or scope['path'] != self._path or scope['method'] != 'GET':
+            return await self.application(scope, receive, send)
+
+        channels, last_event_id = await sync_to_async(self._authorize)(scope)
+        if not channels:
+            await send({'type': 'http.response.start', 'status': 403,
+                        'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b'Forbidden'})
+            return
+
+        headers = [(b'content-type', b'text/event-stream')]
+        headers += [(name.lower().encode(), value.encode()) for name, value in STREAM_HEADERS.items()]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        subscription = broker().subscribe(channels, last_event_id)
+        disconnected = asyncio.ensure_future(self._disconnect(receive))
+        try:
+            stream = await sync_to_async(_Stream, thread_sensitive=False)(subscription)
+            await send({'type': 'http.response.body', 'body': stream.opening(), 'more_body': True})
+            while not stream.expired():
+                getter = asyncio.ensure_future(subscription.aget(stream.wait_time()))
+                await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    getter.cancel()
+                    return
+                messages, overflowed = getter.result()
+                body = stream.render(messages, overflowed) if messages or overflowed else b''
+                if stream.heartbeat_due():
+                    body += await sync_to_async(stream.heartbeat, thread_sensitive=False)()
+                if body:
+                    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            subscription.close()
+
+    async def _disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def _authorize(self, scope):
+        # What SessionMiddleware and AuthenticationMiddleware would do.
+        request = ASGIRequest(scope, io.BytesIO())
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        user = get_user(request)
+        channels = self.channels_for(user) if user.is_authenticated else None
+        return channels, request.headers.get('Last-Event-ID')
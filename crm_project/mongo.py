@@ -0,0 +1,142 @@
+"""
+Direct pymongo access to the collections Djongo manages.
+
+Djongo keeps a pymongo ``Database`` behind every Django connection, so we reuse
+that handle (and its connection pool) instead of opening a second client.
+"""
+
+from django.db import connections
+from pymongo import IndexModel, ReturnDocument
+
+
+def get_database(alias='default'):
+    """
+    Return the pymongo Database backing the given Django connection.
+    """
+    conn = connections[alias]
+    conn.ensure_connection()
+    return conn.connection
+
+
+def get_collection(model, alias='default'):
+    """
+    Return the pymongo Collection that stores ``model``.
+    """
+    return get_database(alias)[model._meta.db_table]
+
+
+def _normalize_keys(keys):
+    # The server reports directions as floats (1.0 / -1.0); specs use ints.
+    return [(field, int(direction) if isinstance(direction, (int, float)) else direction)
+            for field, direction in keys]
+
+
+def _index_matches(existing, spec):
+    return (
+        _normalize_keys(existing['key']) == _normalize_keys(spec['keys'])
+        and bool(existing.get('unique')) == bool(spec.get('unique'))
+        and existing.get('partialFilterExpression') == spec.get('partialFilterExpression')
+    )
+
+
+def _index_model(spec):
+    options = {'name': spec['name']}
+    if spec.get('unique'):
+        options['unique'] = True
+    if spec.get('partialFilterExpression'):
+        options['partialFilterExpression'] = spec['partialFilterExpression']
+    return IndexModel(spec['keys'], **options)
+
+
+def sync_indexes(collection, specs, prune=False, dry_run=False):
+    """
+    Reconcile the indexes on ``collection`` with a declarative list of specs.
+
+    Each spec is a dict with ``name`` and ``keys`` (a list of ``(field, direction)``
+    pairs) and optionally ``unique`` / ``partialFilterExpression``. Missing indexes
+    are created, indexes whose definition changed are rebuilt, and with ``prune``
+    any other non-unique index is dropped (``_id_`` and the unique indexes Djongo
+    creates for its own constraints are always kept).
+
+    Returns a list of ``(action, index_name)`` tuples describing what was (or, with
+    ``dry_run``, would be) done.
+    """
+    existing = collection.index_information()
+    wanted = {spec['name']: spec for spec in specs}
+    actions = []
+
+    for name, spec in wanted.items():
+        current = existing.get(name)
+        if current is None:
+            actions.append(('create', name))
+        elif not _index_matches(current, spec):
+            actions.append(('rebuild', name))
+        else:
+            actions.append(('keep', name))
+
+    if prune:
+        for name, info in existing.items():
+            if name == '_id_' or name in wanted or info.get('unique'):
+                continue
+            actions.append(('drop', name))
+
+    if dry_run:
+        return actions
+
+    for action, name in actions:
+        if action in ('rebuild', 'drop'):
+            collection.drop_index(name)
+    to_create = [_index_model(wanted[name]) for action, name in actions
+                 if action in ('create', 'rebuild')]
+    if to_create:
+        collection.create_indexes(to_create)
+    return actions
+
+
+def index_usage(collection):
+    """
+    Return ``{index_name: {'ops': int, 'since': datetime}}`` from ``$indexStats``.
+
+    Counters are per mongod and reset when the server restarts, so a zero only
+    means "unused since ``since``".
+    """
+    usage = {}
+    for row in collection.aggregate([{'$indexStats': {}}]):
+        accesses = row.get('accesses', {})
+        name = row['name']
+        entry = usage.setdefault(name, {'ops': 0, 'since': accesses.get('since')})
+        # Replica sets report one row per member; add them up.
+        entry['ops'] += int(accesses.get('ops', 0))
+    return usage
+
+
+def model_index_specs(model):
+    """
+    Translate ``model.MONGO_INDEXES`` (written with Django field names) into
+    specs keyed by the column names Djongo actually stores.
+    """
+    specs = []
+    for spec in getattr(model, 'MONGO_INDEXES', []):
+        keys = [(model._meta.get_field(field).column, direction)
+                for field, direction in spec['keys']]
+        specs.append(dict(spec, keys=keys))
+    return specs
+
+
+def reserve_ids(model, count, alias='default'):
+    """
+    Reserve ``count`` consecutive auto-increment ids for ``model`` and return
+    the first one.
+
+    Djongo keeps the counter in its ``__schema__`` collection and advances it
+    on every INSERT; documents inserted directly through pymongo must take
+    their ids from the same counter or later ORM inserts will collide.
+    """
+    schema = get_database(alias)['__schema__'].find_one_and_update(
+        {'name': model._meta.db_table, 'auto': {'$exists': True}},
+        {'$inc': {'auto.seq': count}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if schema is None:
+        raise LookupError(f'No auto-increment counter for {model._meta.db_table}; run migrate first.')
+    return schema['auto']['seq'] - count + 1
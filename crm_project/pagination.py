@@ -0,0 +1,132 @@
+"""
+Keyset (cursor) pagination.
+
+OFFSET pagination makes MongoDB walk and discard every skipped document, so
+deep pages get linearly slower. Here each page instead starts *after* the
+last row of the previous one, ordered by ``(field, pk)``: every page is an
+index range scan of ``per_page + 1`` rows no matter how far in it is.
+
+The ordering field must be non-null (``created_at``, ``date_joined``...).
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """
+    One page of results. Iterable and truthy like the list it wraps, so
+    templates can use it where they used a queryset before.
+    """
+
+    def __init__(self, object_list, next_cursor, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+        self.next_url = None
+        self.first_url = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return not self.cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, field='created_at', per_page=DEFAULT_PAGE_SIZE, descending=True):
+        self.queryset = queryset
+        self.field = field
+        self.per_page = max(1, min(int(per_page), MAX_PAGE_SIZE))
+        self.descending = descending
+        self._model_field = queryset.model._meta.get_field(field)
+
+    def encode(self, obj):
+        value = getattr(obj, self.field)
+        value = value.isoformat() if hasattr(value, 'isoformat') else value
+        raw = json.dumps([value, obj.pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return self._model_field.to_python(value), int(pk)
+        except Exception as e:
+            raise InvalidCursor(cursor) from e
+
+    def rows(self, after, limit):
+        """
+        Up to ``limit`` rows ordered by ``(field, pk)``, starting after the
+        ``(value, pk)`` position ``after`` (None for the first page).
+        """
+        qs = self.queryset
+        if after:
+            value, pk = after
+            op = 'lt' if self.descending else 'gt'
+            qs = qs.filter(
+                Q(**{f'{self.field}__{op}': value})
+                | Q(**{self.field: value, f'pk__{op}': pk})
+            )
+
+        prefix = '-' if self.descending else ''
+        return list(qs.order_by(f'{prefix}{self.field}', f'{prefix}pk')[:limit])
+
+    def page(self, cursor=None):
+        rows = self.rows(self.decode(cursor) if cursor else None, self.per_page + 1)
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = self.encode(rows[-1])
+        return KeysetPage(rows, next_cursor, cursor)
+
+
+def paginate(request, queryset, param='cursor', field='created_at', per_page=DEFAULT_PAGE_SIZE):
+    """
+    Return the page of ``queryset`` selected by ``request.GET[param]``.
+
+    A malformed cursor falls back to the first page. ``page.next_url`` and
+    ``page.first_url`` keep the other query parameters, so several paginated
+    lists can live on one page.
+    """
+    return paginate_with(request, KeysetPaginator(queryset, field=field, per_page=per_page), param)
+
+
+def paginate_with(request, paginator, param='cursor'):
+    """
+    ``paginate`` for a ready-made paginator, e.g. one reading rows through
+    pymongo (see marketing.repository).
+    """
+    cursor = request.GET.get(param) or None
+    try:
+        page = paginator.page(cursor)
+    except InvalidCursor:
+        page = paginator.page()
+
+    params = request.GET.copy()
+    params.pop(param, None)
+    page.first_url = '?' + params.urlencode() if params else '?'
+    if page.has_next:
+        params[param] = page.next_cursor
+        page.next_url = '?' + params.urlencode()
+    return page
@@ -0,0 +1,107 @@
+"""
+Independent page reads, run one after another or all at once.
+
+A dashboard is a handful of reads that don't depend on each other (job
+pages, user lists, counters). Views describe them as loaders - ``{context
+name: zero-argument callable}`` - shared by both variants of the page:
+
+    load(loaders)          the sync view: one after another
+    await aload(loaders)   the async view: all at once on a bounded thread
+                           pool, so the page waits about as long as its
+                           slowest read instead of the sum of them
+
+Loaders must return evaluated data (lists, pages), not lazy querysets, and
+must not touch ``request.user`` or the session: ``async_dashboard``
+resolves the user before they run. Each runs in a copy of the caller's
+context, so the request's query and command counts (monitoring, kept in
+context variables) include them.
+
+Threads rather than an async driver (motor): the reads go through the ORM
+and Djongo's pymongo client, which every thread shares (size its pool with
+MONGO_MAX_POOL_SIZE). DASHBOARD_QUERY_WORKERS bounds the threads per
+process; reads beyond it wait their turn.
+
+Django 4.1's ``login_required`` and ``condition`` are sync-only, so
+``async_dashboard`` does their work (off the event loop) for async views.
+"""
+
+import asyncio
+import contextvars
+import threading
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .changes import conditional_etag, conditional_last_modified
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.DASHBOARD_QUERY_WORKERS,
+                                           thread_name_prefix='dashboard')
+    return _executor
+
+
+def load(loaders):
+    """
+    Run ``loaders`` one after another; ``{name: result}``.
+    """
+    return {name: loader() for name, loader in loaders.items()}
+
+
+async def aload(loaders):
+    """
+    Run ``loaders`` concurrently on the query pool; ``{name: result}``.
+    """
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(_pool(), contextvars.copy_context().run, loader) for loader in loaders.values()
+    ))
+    return dict(zip(loaders, results))
+
+
+def async_dashboard(scopes_for=None):
+    """
+    ``login_required`` plus, given ``scopes_for``, the conditional GET of
+    ``condition(etag_func=conditional_etag(scopes_for), ...)``, for async
+    views.
+    """
+    etag_func = conditional_etag(scopes_for) if scopes_for else None
+    last_modified_func = conditional_last_modified(scopes_for) if scopes_for else None
+
+    def prepare(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path()), None, None
+        if etag_func is None or request.method not in ('GET', 'HEAD'):
+            return None, None, None
+        etag = etag_func(request, *args, **kwargs)
+        etag = quote_etag(etag) if etag else None
+        last_modified = last_modified_func(request, *args, **kwargs)
+        last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=last_modified), etag, last_modified
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            response, etag, last_modified = await sync_to_async(prepare)(request, *args, **kwargs)
+            if response is not None:
+                return response
+            response = await view(request, *args, **kwargs)
+            if last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(last_modified)
+            if etag:
+                response.headers.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
@@ -46,10 +46,14 @@ INSTALLED_APPS = [
     'marketing',
     'writer',
     'process',
+    'monitoring',
+    'tasks',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'monitoring.middleware.MetricsMiddleware',
+    'monitoring.middleware.QueryProfileMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,6 +75,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'crm_project.context_processors.live_dashboards',
             ],
         },
     },
@@ -78,17 +83,94 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'crm_project.wsgi.application'
 
+def _env_int(name, default=None):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_write_concern(name):
+    value = os.environ.get(name)
+    if not value:
+        return None
+    return int(value) if value.isdigit() else value
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    return value.lower() in ('1', 'true', 'yes', 'on') if value else default
+
+
+# pymongo client options. Djongo shares one MongoClient (and its connection
+# pool) per database between all threads of a process; every option can be
+# overridden from the environment. Options left as None use driver defaults.
+MONGO_CLIENT = {
+    'host': os.environ.get('MONGO_HOST', 'localhost'),
+    'port': _env_int('MONGO_PORT', 27017),
+    # Connections per process: roughly the worker's thread count plus headroom.
+    'maxPoolSize': _env_int('MONGO_MAX_POOL_SIZE', 50),
+    'minPoolSize': _env_int('MONGO_MIN_POOL_SIZE', 0),
+    # Close connections idle this long, so quiet workers shed sockets.
+    'maxIdleTimeMS': _env_int('MONGO_MAX_IDLE_TIME_MS', 300000),
+    # How long a request may wait for a free pooled connection.
+    'waitQueueTimeoutMS': _env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+    # Fail fast instead of the driver's 30s when the server is unreachable.
+    'serverSelectionTimeoutMS': _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+    'connectTimeoutMS': _env_int('MONGO_CONNECT_TIMEOUT_MS', 5000),
+    'socketTimeoutMS': _env_int('MONGO_SOCKET_TIMEOUT_MS'),
+    # Wire compression, e.g. "zstd,snappy,zlib" (zstd/snappy need their
+    # python packages). Worth it across a network, not on localhost.
+    'compressors': os.environ.get('MONGO_COMPRESSORS') or None,
+    'zlibCompressionLevel': _env_int('MONGO_ZLIB_LEVEL'),
+    # Write concern: a number of nodes or "majority".
+    'w': _env_write_concern('MONGO_W'),
+    'readPreference': os.environ.get('MONGO_READ_PREFERENCE') or None,
+    'retryWrites': _env_bool('MONGO_RETRY_WRITES', None),
+    'appname': os.environ.get('MONGO_APPNAME', 'crm_project'),
+}
+MONGO_CLIENT = {key: value for key, value in MONGO_CLIENT.items() if value is not None}
+
 DATABASES = {
     'default': {
         'ENGINE': 'djongo',
-        'NAME': 'crm_database',
-        'CLIENT': {
-            'host': 'localhost',
-            'port': 27017,
-        }
+        'NAME': os.environ.get('MONGO_DB', 'crm_database'),
+        'CLIENT': MONGO_CLIENT,
+        # Djongo closes the shared MongoClient - and with it the whole pool -
+        # whenever Django closes the connection. With the default of 0 that is
+        # the end of every request, so keep connections open (None = forever).
+        'CONN_MAX_AGE': _env_int('DB_CONN_MAX_AGE', None),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Bearer token Prometheus must send to scrape /metrics (monitoring.metrics).
+# Unset, only logged-in admins can read it.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+# Also let requests from 127.0.0.1/::1 scrape without a token. Only for a
+# scraper on the same host with no reverse proxy in front: behind nginx
+# every request comes from localhost.
+METRICS_TRUST_LOOPBACK = _env_bool('METRICS_TRUST_LOOPBACK', False)
+
+# Split ORM time into Djongo translation / MongoDB / fetching per query and
+# per request (monitoring.djongo_profile). Costs a stack walk per query.
+DJONGO_PROFILE = _env_bool('DJONGO_PROFILE', False)
+DJONGO_SLOW_QUERY_MS = _env_int('DJONGO_SLOW_QUERY_MS', 100)
+
+# Query shapes whose parsed SQL Djongo keeps (crm_project.statement_cache);
+# 0 turns the cache off.
+DJONGO_PARSE_CACHE_SIZE = _env_int('DJONGO_PARSE_CACHE_SIZE', 512)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Per-request query breakdowns and slow queries, when profiling.
+        'monitoring.djongo_profile': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -105,6 +187,30 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# One copy per distinct file, reference-counted (crm_project.storage).
+DEFAULT_FILE_STORAGE = 'crm_project.storage.ContentAddressedStorage'
+
+# Media is only served through the download views (crm_project.downloads),
+# which hand the transfer to the front proxy: 'nginx' (X-Accel-Redirect to
+# MEDIA_ACCEL_REDIRECT_PREFIX, an internal location aliasing MEDIA_ROOT),
+# 'apache' (X-Sendfile), or unset to stream from Python.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Uploads stream to disk with their SHA-256 computed on the way
+# (crm_project.uploads), into UPLOAD_TEMP_DIR: under MEDIA_ROOT, so moving a
+# finished upload into storage is a rename. Created on first upload.
+FILE_UPLOAD_HANDLERS = ['crm_project.uploads.StreamingUploadHandler']
+UPLOAD_TEMP_DIR = os.environ.get('UPLOAD_TEMP_DIR') or os.path.join(MEDIA_ROOT, '.uploads')
+UPLOAD_MAX_REQUEST_SIZE = _env_int('UPLOAD_MAX_REQUEST_SIZE', 110 * 1024 * 1024)
+UPLOAD_MAX_SIZE = _env_int('UPLOAD_MAX_SIZE', 25 * 1024 * 1024)
+# Per form field, in bytes; fields not listed get UPLOAD_MAX_SIZE.
+UPLOAD_MAX_SIZES = {
+    'attachment': _env_int('UPLOAD_MAX_ATTACHMENT_SIZE', 25 * 1024 * 1024),
+    'structure_file': _env_int('UPLOAD_MAX_STRUCTURE_SIZE', 10 * 1024 * 1024),
+    'final_copy': _env_int('UPLOAD_MAX_FINAL_COPY_SIZE', 50 * 1024 * 1024),
+    'associate_file': _env_int('UPLOAD_MAX_ASSOCIATE_SIZE', 50 * 1024 * 1024),
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -113,3 +219,39 @@ AUTH_USER_MODEL = 'authentication.CustomUser'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
+
+# Dashboards (crm_project.parallel). Under an ASGI server (e.g. `uvicorn
+# crm_project.asgi:application`) set ASYNC_DASHBOARDS=1 to serve the async
+# variants, which run a page's independent reads concurrently on up to
+# DASHBOARD_QUERY_WORKERS threads per process.
+ASYNC_DASHBOARDS = _env_bool('ASYNC_DASHBOARDS', False)
+DASHBOARD_QUERY_WORKERS = _env_int('DASHBOARD_QUERY_WORKERS', 16)
+
+# Live dashboard updates over server-sent events (crm_project.events). Only
+# set LIVE_DASHBOARDS=1 under an ASGI server (crm_project.asgi): a stream is
+# held open for SSE_MAX_SECONDS, which under WSGI would tie up a worker
+# thread per open tab. A keepalive (and missed-update check) every
+# SSE_HEARTBEAT_SECONDS; when a stream ends the browser reconnects, catching
+# up from the last SSE_REPLAY messages.
+LIVE_DASHBOARDS = _env_bool('LIVE_DASHBOARDS', False)
+SSE_HEARTBEAT_SECONDS = _env_int('SSE_HEARTBEAT_SECONDS', 15)
+SSE_MAX_SECONDS = _env_int('SSE_MAX_SECONDS', 300)
+SSE_REPLAY = _env_int('SSE_REPLAY', 500)
+
+# Background tasks (tasks.queue): run on a pool of TASKS_WORKERS threads in
+# the process that queued them; `manage.py run_tasks` picks up the rest
+# (retries, tasks left by a restart). Set TASKS_IN_PROCESS=0 to leave all
+# of them to run_tasks. A task running longer than TASKS_LEASE_SECONDS is
+# presumed dead and queued again.
+TASKS_IN_PROCESS = _env_bool('TASKS_IN_PROCESS', True)
+TASKS_WORKERS = _env_int('TASKS_WORKERS', 4)
+TASKS_LEASE_SECONDS = _env_int('TASKS_LEASE_SECONDS', 300)
+
+# Notification emails, sent from background tasks.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = _env_int('EMAIL_PORT', 25)
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = _env_bool('EMAIL_USE_TLS', False)
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'CRM <no-reply@localhost>')
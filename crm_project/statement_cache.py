@@ -0,0 +1,87 @@
+"""
+LRU cache of Djongo's sqlparse results.
+
+Djongo runs ``sqlparse.parse`` over every statement Django sends it, and
+lexing + grouping is most of its translation cost. Django's SQL is
+parameterized (``... WHERE "created_by_id" = %s``) and Djongo numbers the
+placeholders before parsing, so one query shape is one string no matter the
+values; the converters read the values from each query's own params. The
+parsed statement is never modified, so it can be shared: ``install()`` puts
+an LRU cache keyed by that string in front of the parser.
+
+DJONGO_PARSE_CACHE_SIZE sets the number of shapes kept (0 disables it).
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Longer statements (bulk INSERTs with a placeholder per value) are nearly
+# always one-offs and would only push real shapes out of the cache.
+MAX_SQL_LENGTH = 4000
+
+
+class StatementCache:
+    def __init__(self, parse, maxsize):
+        self._parse = parse
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = self.bypassed = 0
+
+    def __call__(self, sql):
+        if len(sql) > MAX_SQL_LENGTH:
+            self.bypassed += 1
+            return self._parse(sql)
+
+        with self._lock:
+            statements = self._entries.get(sql)
+            if statements is not None:
+                self._entries.move_to_end(sql)
+                self.hits += 1
+                return statements
+
+        statements = tuple(self._parse(sql))
+        with self._lock:
+            self.misses += 1
+            self._entries[sql] = statements
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return statements
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'bypassed': self.bypassed,
+            'hit_ratio': self.hits / lookups if lookups else None,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+statement_cache = None
+
+
+def install():
+    """
+    Route Djongo's parsing through the cache (once, and only if enabled).
+    Returns the cache, or None when disabled.
+    """
+    global statement_cache
+    if statement_cache is None and settings.DJONGO_PARSE_CACHE_SIZE > 0:
+        # djongo.base first: importing sql2mongo.query on its own is circular.
+        from djongo import base  # noqa: F401
+        from djongo.sql2mongo import query
+
+        statement_cache = StatementCache(query.sqlparse, settings.DJONGO_PARSE_CACHE_SIZE)
+        query.sqlparse = statement_cache
+    return statement_cache
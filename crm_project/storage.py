@@ -0,0 +1,252 @@
+"""
+Content-addressed, deduplicated media storage.
+
+Every file is stored once per content, as ``blobs/<2 hex>/<sha256>`` under
+MEDIA_ROOT. The name saved on the model is
+``<upload_to directory>/<sha256>/<original file name>``: it points at the
+blob and keeps the file name for downloads. Saving content that is already
+stored writes nothing; the uploaded temporary file is just dropped.
+
+Reference counts live in the ``media_blobs`` collection, one document per
+blob (``_id`` = sha256, ``refs``, ``size``, ``saved_at``): a save adds one,
+and ``track_references`` takes one off when a row stops pointing at a name
+(file replaced, or row deleted). ``delete()`` never removes a blob, since
+other rows may share it: unreferenced blobs are removed by
+``manage.py gc_media``, which recounts the references from the models first
+(writes that bypass the signals make the counts drift, like the dashboard
+counters) and spares recent blobs whose row may not be saved yet.
+
+Names saved before this storage (``job_attachments/Title.docx``) keep being
+read from MEDIA_ROOT as they are; ``gc_media --adopt`` moves them in.
+"""
+
+import os
+import posixpath
+import re
+import tempfile
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import FileField
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+from pymongo import DeleteOne, UpdateOne
+
+from .mongo import get_collection, get_database
+from .uploads import file_sha256
+
+COLLECTION = 'media_blobs'
+BLOB_DIR = 'blobs'
+
+_NAME = re.compile(r'(?:^|/)(?P<sha256>[0-9a-f]{64})/[^/]+$')
+
+
+def _collection():
+    return get_database()[COLLECTION]
+
+
+def name_sha256(name):
+    """
+    The content hash a stored name points at, or None for legacy names.
+    """
+    match = _NAME.search(name or '')
+    return match.group('sha256') if match else None
+
+
+def blob_name(sha256):
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def path(self, name):
+        sha256 = name_sha256(name)
+        return super().path(blob_name(sha256) if sha256 else name)
+
+    def get_available_name(self, name, max_length=None):
+        # The final name carries the content hash, so it never clashes.
+        return name
+
+    def _save(self, name, content):
+        sha256 = file_sha256(content)
+        full_path = super().path(blob_name(sha256))
+        if not os.path.exists(full_path):
+            self._write_blob(full_path, content)
+        _collection().update_one(
+            {'_id': sha256},
+            {'$inc': {'refs': 1}, '$set': {'saved_at': timezone.now()}, '$setOnInsert': {'size': content.size}},
+            upsert=True,
+        )
+        directory, file_name = posixpath.split(name)
+        return posixpath.join(directory, sha256, file_name)
+
+    def _write_blob(self, full_path, content):
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Two saves of the same content may race here; either one winning
+        # leaves the same bytes, so overwriting is fine.
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(content.temporary_file_path(), full_path, allow_overwrite=True)
+        else:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    for chunk in content.chunks():
+                        out.write(chunk)
+                os.replace(tmp_path, full_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+    def delete(self, name):
+        # Blobs may be shared; the reference goes with the row
+        # (track_references) and gc_media removes what is left unused.
+        if name and not name_sha256(name):
+            super().delete(name)
+
+
+def release(names):
+    """
+    Drop one reference to each blob ``names`` point at.
+    """
+    released = Counter(name_sha256(name) for name in names)
+    released.pop(None, None)
+    if released:
+        _collection().bulk_write([
+            UpdateOne({'_id': sha256}, {'$inc': {'refs': -count}}) for sha256, count in released.items()
+        ], ordered=False)
+
+
+def _tracked_fields(model):
+    return [field for field in model._meta.fields
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)]
+
+
+def _file_names(instance, fields):
+    # Deferred fields are left out rather than loaded.
+    values = instance.__dict__
+    return {field.attname: str(values[field.attname] or '') for field in fields if field.attname in values}
+
+
+def track_references(model):
+    """
+    Keep the blob reference counts in step with ``model``'s file fields.
+    """
+    fields = _tracked_fields(model)
+    if not fields:
+        return
+
+    def remember(sender, instance, **kwargs):
+        instance._stored_file_names = _file_names(instance, fields) if instance.pk else {}
+
+    def release_replaced(sender, instance, created, **kwargs):
+        current = _file_names(instance, fields)
+        if not created:
+            release(old for attname, old in instance._stored_file_names.items()
+                    if attname in current and current[attname] != old)
+        instance._stored_file_names = current
+
+    def release_deleted(sender, instance, **kwargs):
+        release(_file_names(instance, fields).values())
+        instance._stored_file_names = {}
+
+    uid = f'media-refs:{model._meta.label}'
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(release_replaced, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(release_deleted, sender=model, weak=False, dispatch_uid=uid)
+
+
+def stored_names():
+    """
+    ``(model, field, name)`` for every file name saved in a tracked field,
+    read straight from the collections.
+    """
+    for model in apps.get_models():
+        fields = _tracked_fields(model)
+        if not fields:
+            continue
+        projection = {field.column: 1 for field in fields}
+        for doc in get_collection(model).find({'$or': [{column: {'$nin': [None, '']}} for column in projection]},
+                                              projection):
+            for field in fields:
+                if doc.get(field.column):
+                    yield model, field, doc[field.column]
+
+
+def adopt(name, storage=default_storage):
+    """
+    Move the legacy file ``name`` into the blob store (dropping it if the
+    content is already there). Returns ``(new name, sha256)``, or None if
+    the file is missing; rows still have to be pointed at the new name.
+    """
+    full_path = storage.path(name)
+    if not os.path.exists(full_path):
+        return None
+    with open(full_path, 'rb') as f:
+        sha256 = file_sha256(File(f))
+    blob_path = storage.path(blob_name(sha256))
+    if os.path.exists(blob_path):
+        os.unlink(full_path)
+    else:
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(full_path, blob_path)
+    directory, file_name = posixpath.split(name)
+    return posixpath.join(directory, sha256, file_name), sha256
+
+
+def _blob_files(storage):
+    for directory, _, files in os.walk(storage.path(BLOB_DIR)):
+        for file_name in files:
+            if re.fullmatch(r'[0-9a-f]{64}', file_name):
+                yield file_name, os.path.join(directory, file_name)
+
+
+def rebuild(dry_run=False, min_age=timedelta(hours=1), storage=default_storage):
+    """
+    Recount every blob's references from the models and remove the blobs
+    nothing references. Blobs written or saved again within ``min_age`` are
+    spared: the row about to reference them may not be saved yet.
+
+    Returns ``(drift, removed)``: ``{sha256: (old refs, counted refs)}`` and
+    the hashes of the removed blobs.
+    """
+    refs = Counter(name_sha256(name) for _, _, name in stored_names())
+    refs.pop(None, None)
+    coll = _collection()
+    docs = {doc['_id']: doc for doc in coll.find({}, {'refs': 1, 'saved_at': 1})}
+    blobs = dict(_blob_files(storage))
+
+    drift = {}
+    for sha256 in set(docs) | set(refs):
+        old = docs.get(sha256, {}).get('refs', 0)
+        if old != refs[sha256]:
+            drift[sha256] = (old, refs[sha256])
+
+    cutoff = timezone.now() - min_age
+    removed = []
+    for sha256 in (set(docs) | set(blobs)) - set(refs):
+        saved_at = docs.get(sha256, {}).get('saved_at')
+        if saved_at is not None and saved_at.replace(tzinfo=dt_timezone.utc) > cutoff:
+            continue
+        if sha256 in blobs and os.path.getmtime(blobs[sha256]) > cutoff.timestamp():
+            continue
+        removed.append(sha256)
+
+    if not dry_run:
+        for sha256 in removed:
+            if sha256 in blobs:
+                os.unlink(blobs[sha256])
+        writes = [DeleteOne({'_id': sha256}) for sha256 in removed]
+        writes += [
+            UpdateOne({'_id': sha256}, {'$set': {'refs': counted}}, upsert=True)
+            for sha256, (_, counted) in drift.items() if sha256 not in removed
+        ]
+        if writes:
+            coll.bulk_write(writes, ordered=False)
+    return drift, removed
+
@@ -0,0 +1,163 @@
+"""
+Streaming, size-capped, checksummed file uploads.
+
+``StreamingUploadHandler`` replaces Django's memory / temporary-file pair:
+every uploaded file is written chunk by chunk to a temporary file in
+UPLOAD_TEMP_DIR - kept on the same filesystem as MEDIA_ROOT, so saving
+it to storage is a rename, not a copy - while its SHA-256 is computed on
+the fly. Nothing is held in memory beyond one chunk.
+
+Limits come from UPLOAD_MAX_SIZES (form field name -> bytes, falling back
+to UPLOAD_MAX_SIZE). A request whose Content-Length exceeds
+UPLOAD_MAX_REQUEST_SIZE is refused at its first file, and a file is cut
+off at the first chunk that takes it over its limit. The reason is kept on
+the request so ``UploadFormMixin`` can show it on the form: after a file
+is cut off the rest of the body is read and discarded, so the browser gets
+the page back. Only a request over UPLOAD_MAX_REQUEST_SIZE has its
+connection reset instead, as reading all of it is what the cap prevents.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+from django.db.models import FileField
+from django.template.defaultfilters import filesizeformat
+
+# Key of the error kept when the request as a whole is too large.
+REQUEST_ERROR = '__all__'
+
+
+def max_size(field_name):
+    return settings.UPLOAD_MAX_SIZES.get(field_name, settings.UPLOAD_MAX_SIZE)
+
+
+def upload_errors(request):
+    """
+    ``{field name: message}`` for uploads the handler refused.
+    """
+    return getattr(request, '_upload_errors', {})
+
+
+def file_sha256(uploaded):
+    """
+    SHA-256 of an uploaded file: computed while streaming, or read back for
+    files that did not come through the streaming handler.
+    """
+    digest = getattr(uploaded, 'sha256', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in uploaded.chunks():
+            hasher.update(chunk)
+        uploaded.seek(0)
+        digest = hasher.hexdigest()
+    return digest
+
+
+class StreamedUploadedFile(TemporaryUploadedFile):
+    """
+    A ``TemporaryUploadedFile`` in UPLOAD_TEMP_DIR, with its ``sha256``.
+    """
+
+    def __init__(self, name, content_type, charset, content_type_extra):
+        os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + ext, dir=settings.UPLOAD_TEMP_DIR)
+        UploadedFile.__init__(self, file, name, content_type, 0, charset, content_type_extra)
+        self.sha256 = None
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    chunk_size = 256 * 1024
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.hasher = None
+        self.limit = None
+        self.request_too_large = False
+
+    def _reject(self, field_name, message, connection_reset=False):
+        if self.request is not None:
+            self.request.__dict__.setdefault('_upload_errors', {})[field_name] = message
+        self.upload_interrupted()
+        raise StopUpload(connection_reset=connection_reset)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Refused at the first file rather than here, so the form fields
+        # before it (the CSRF token among them) are still parsed.
+        self.request_too_large = bool(content_length and content_length > settings.UPLOAD_MAX_REQUEST_SIZE)
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if self.request_too_large:
+            # Don't read (or make the client send) the rest of the body.
+            self._reject(REQUEST_ERROR, f'The upload is larger than the '
+                                        f'{filesizeformat(settings.UPLOAD_MAX_REQUEST_SIZE)} allowed per request.',
+                         connection_reset=True)
+        self.limit = max_size(field_name)
+        if content_length and content_length > self.limit:
+            self._too_large()
+        self.file = StreamedUploadedFile(file_name, content_type, charset, content_type_extra)
+        self.hasher = hashlib.sha256()
+        raise StopFutureHandlers()
+
+    def _too_large(self):
+        self._reject(self.field_name, f'{self.file_name} is larger than the '
+                                      f'{filesizeformat(self.limit)} allowed for this file.')
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.limit:
+            self._too_large()
+        self.file.write(raw_data)
+        self.hasher.update(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        # Closing the temporary file deletes it. The parser closes
+        # ``self.file`` too when the upload is stopped, so it stays set.
+        if hasattr(self, 'file'):
+            self.file.close()
+
+
+class UploadFormMixin:
+    """
+    For model forms with file fields: shows the errors of uploads the
+    handler refused, and stores each new file's SHA-256 in the model's
+    ``<field>_sha256`` field when it has one.
+
+    Pass ``upload_errors=upload_errors(request)`` when binding the form.
+    """
+
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def full_clean(self):
+        super().full_clean()
+        if not self.is_bound:
+            return
+        for name, message in self.upload_errors.items():
+            if name in self.fields:
+                # Replaces "This field is required." for the file cut off.
+                self._errors[name] = self.error_class([message])
+                self.cleaned_data.pop(name, None)
+            else:
+                self.add_error(None, message)
+
+    def _post_clean(self):
+        super()._post_clean()
+        for field in self.instance._meta.fields:
+            if not isinstance(field, FileField) or field.name not in self.files:
+                continue
+            uploaded = self.cleaned_data.get(field.name)
+            checksum_field = f'{field.name}_sha256'
+            if uploaded and hasattr(self.instance, checksum_field):
+                setattr(self.instance, checksum_field, file_sha256(uploaded))
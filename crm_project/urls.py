@@ -20,6 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 
+from monitoring.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', TemplateView.as_view(template_name='home.html'), name='home'),
@@ -29,10 +31,11 @@ urlpatterns = [
     path('writer/', include('writer.urls')),
     path('process/', include('process.urls')),
     path('allocate/', include('allocate.urls', namespace='allocate')),
+    path('monitoring/', include('monitoring.urls', namespace='monitoring')),
+    path('metrics', metrics, name='metrics'),
 
 
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -1,3 +1,115 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from marketing import counters
+from marketing.models import Job
+from monitoring.mongo_commands import command_listener
+from monitoring.standin import StandInTestCase
+
+
+def make_user(email, role, **extra):
+    fields = {
+        'first_name': email.split('@')[0],
+        'last_name': 'Test',
+        'role': role,
+        'approval_status': 'approved',
+        'is_active': True,
+    }
+    fields.update(extra)
+    return CustomUser.objects.create_user(
+        username=email, email=email, password='pass12345', **fields
+    )
+
+
+class DashboardQueryCountTests(StandInTestCase):
+    """
+    The dashboard must cost the same number of queries however many rows it
+    lists: related users are batch-loaded rather than fetched per row.
+
+    Counted both as Djongo SQL queries and as MongoDB commands: most
+    dashboard reads go straight through pymongo (marketing.repository),
+    which only the latter see.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.counter = 0
+
+    def _next(self):
+        self.counter += 1
+        return self.counter
+
+    def _add_jobs(self, n):
+        now = timezone.now()
+        for _ in range(n):
+            i = self._next()
+            # A different marketer and writer per job, so any per-row lookup
+            # would show up as extra queries.
+            marketer = make_user(f'marketer{i}@example.com', 'marketing')
+            writer = make_user(f'writer{i}@example.com', 'writer')
+            Job.objects.create(
+                job_id=f'PENDING-{i}',
+                instructions='Write it',
+                created_by=marketer,
+                status='pending_allocation',
+                expected_deadline=now + timedelta(days=2),
+            )
+            Job.objects.create(
+                job_id=f'ALLOCATED-{i}',
+                instructions='Write it',
+                created_by=marketer,
+                status='allocated',
+                allocated_to=writer,
+                allocated_at=now,
+                expected_deadline=now + timedelta(days=2),
+            )
+        # As reconcile_counters would: the dashboard reads seeded counters.
+        counters.rebuild()
+
+    def _add_rejected_users(self, n, approver):
+        for _ in range(n):
+            i = self._next()
+            make_user(
+                f'rejected{i}@example.com', 'user',
+                approval_status='rejected', is_active=False, approved_by=approver,
+            )
+
+    def _dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries, command_listener.capture() as commands:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(sum(commands.values()), 0, 'MongoDB commands were not counted')
+        return len(queries.captured_queries), sum(commands.values())
+
+    def test_allocator_dashboard_query_count_is_constant(self):
+        allocator = make_user('allocator@example.com', 'allocator')
+        self.client.force_login(allocator)
+
+        self._add_jobs(2)
+        few = self._dashboard_queries()
+
+        self._add_jobs(10)
+        many = self._dashboard_queries()
+
+        self.assertEqual(few, many)
+
+    def test_admin_dashboard_query_count_is_constant(self):
+        admin = make_user('admin@example.com', 'admin')
+        self.client.force_login(admin)
+
+        approvers = [make_user(f'approver{i}@example.com', 'admin') for i in range(10)]
+        self._add_rejected_users(2, approvers[0])
+        few = self._dashboard_queries()
+
+        for approver in approvers:
+            self._add_rejected_users(1, approver)
+        many = self._dashboard_queries()
+
+        self.assertEqual(few, many)
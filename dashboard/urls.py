@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('', views.dashboard_view, name='dashboard'),
+    path('', views.dashboard_async_view if settings.ASYNC_DASHBOARDS else views.dashboard_view, name='dashboard'),
+    path('events/', views.dashboard_events, name='dashboard_events'),
     path('change-role/<int:user_id>/', views.change_user_role, name='change_role'),
     path('approve-user/<int:user_id>/', views.approve_user, name='approve_user'),
     path('reject-user/<int:user_id>/', views.reject_user, name='reject_user'),
@@ -1,106 +1,152 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from datetime import timedelta
+from django.http import HttpResponse
+from django.views.decorators.http import condition, require_safe
 from authentication.models import CustomUser
-from marketing.models import Job
+from authentication.tasks import send_approval_decision
+from crm_project.changes import conditional_etag, conditional_last_modified
+from crm_project.mongo import get_collection
+from crm_project.pagination import paginate
+from crm_project.parallel import aload, async_dashboard, load
+from marketing import repository
+from marketing.stats import allocator_stats
 
 
-@login_required
-def dashboard_view(request):
+def _user_counts():
     """
-    Main dashboard view that routes users to their role-specific dashboard
+    Users per approval status, in one aggregation instead of three counts.
+    """
+    counts = {'approved': 0, 'pending': 0, 'rejected': 0}
+    for row in get_collection(CustomUser).aggregate([
+        {'$group': {'_id': '$approval_status', 'n': {'$sum': 1}}},
+    ]):
+        counts[row['_id']] = row['n']
+    counts['total'] = counts['approved'] + counts['pending'] + counts['rejected']
+    return counts
+
+
+def _dashboard_scopes(request):
+    """
+    Change-marker scopes shown by each role's dashboard (crm_project.changes).
     """
     role = request.user.role
-    
-    # Map roles to their respective templates
-    template_map = {
-        'user': 'dashboards/user_dashboard.html',
-        'marketing': 'dashboards/marketing_dashboard.html',
-        'allocator': 'dashboards/allocator_dashboard.html',
-        'writer': 'dashboards/writer_dashboard.html',
-        'process': 'dashboards/process_dashboard.html',
-        'manager': 'dashboards/manager_dashboard.html',
-        'admin': 'dashboards/admin_dashboard.html',
-        'superadmin': 'dashboards/superadmin_dashboard.html',
-        'accounts_team': 'dashboards/accounts_dashboard.html',
-    }
-    
-    template = template_map.get(role, 'dashboards/user_dashboard.html')
-    
-    context = {
-        'user': request.user,
-    }
-    
-    # Add additional context for admin and superadmin
+    if role == 'allocator':
+        return ['allocator', 'users']
+    if role in ('admin', 'superadmin'):
+        return ['users']
+    if role in ('marketing', 'writer', 'process'):
+        return [f'{role}:{request.user.pk}', f'user:{request.user.pk}']
+    return [f'user:{request.user.pk}']
+
+
+# Role -> dashboard template
+DASHBOARD_TEMPLATES = {
+    'user': 'dashboards/user_dashboard.html',
+    'marketing': 'dashboards/marketing_dashboard.html',
+    'allocator': 'dashboards/allocator_dashboard.html',
+    'writer': 'dashboards/writer_dashboard.html',
+    'process': 'dashboards/process_dashboard.html',
+    'manager': 'dashboards/manager_dashboard.html',
+    'admin': 'dashboards/admin_dashboard.html',
+    'superadmin': 'dashboards/superadmin_dashboard.html',
+    'accounts_team': 'dashboards/accounts_dashboard.html',
+}
+
+
+def _dashboard_loaders(request, user):
+    """
+    The independent reads behind ``user``'s dashboard, as loaders for
+    crm_project.parallel.
+    """
+    role = user.role
+
+    # Additional context for admin and superadmin
     if role in ['admin', 'superadmin']:
-        context['users'] = CustomUser.objects.filter(
-            approval_status='approved'
-        ).order_by('-date_joined')
-        
-        context['pending_users'] = CustomUser.objects.filter(
-            approval_status='pending'
-        ).order_by('-date_joined')
-        
-        context['rejected_users'] = CustomUser.objects.filter(
-            approval_status='rejected'
-        ).order_by('-date_joined')
-    
-    # Add additional context for allocator
+        return {
+            'users': lambda: paginate(
+                request, CustomUser.objects.filter(approval_status='approved'),
+                param='users_cursor', field='date_joined'
+            ),
+            'pending_users': lambda: paginate(
+                request, CustomUser.objects.filter(approval_status='pending'),
+                param='pending_cursor', field='date_joined'
+            ),
+            'rejected_users': lambda: paginate(
+                request,
+                CustomUser.objects.filter(approval_status='rejected').prefetch_related('approved_by'),
+                param='rejected_cursor', field='date_joined'
+            ),
+            'user_counts': _user_counts,
+        }
+
+    # Additional context for allocator
     if role == 'allocator':
-        context['pending_jobs'] = Job.objects.filter(
-            status='pending_allocation'
-        ).order_by('-completed_form_at')
-        
-        context['allocated_jobs'] = Job.objects.filter(
-            status__in=['allocated', 'in_progress']
-        ).order_by('-allocated_at')
-        
-        context['completed_jobs'] = Job.objects.filter(
-            status='completed'
-        ).order_by('-updated_at')[:10]
-        
-        # Get writers and process users for allocation
-        context['writers'] = CustomUser.objects.filter(
-            role='writer',
-            is_active=True,
-            approval_status='approved'
-        ).order_by('first_name', 'last_name')
-        
-        context['process_users'] = CustomUser.objects.filter(
-            role='process',
-            is_active=True,
-            approval_status='approved'
-        ).order_by('first_name', 'last_name')
-        
-        # Statistics
-        now = timezone.now()
-        start_of_today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_today = start_of_today + timedelta(days=1)
-        
-        context['now'] = now
-        
-        context['stats'] = {
-            'pending_count': Job.objects.filter(status='pending_allocation').count(),
-            'allocated_today': Job.objects.filter(
-                allocated_at__gte=start_of_today,
-                allocated_at__lt=end_of_today
-            ).count(),
-            'active_writers': CustomUser.objects.filter(
+        # Read straight from MongoDB with projections (marketing.repository);
+        # each list batch-loads its related users in one query.
+        return {
+            'pending_jobs': lambda: repository.pending_allocation_page(request),
+            'allocated_jobs': lambda: repository.allocated_page(request),
+            'completed_jobs': repository.recently_completed,
+            # Writers and process users for allocation
+            'writers': lambda: list(CustomUser.objects.filter(
                 role='writer',
                 is_active=True,
                 approval_status='approved'
-            ).count(),
-            'overdue_count': Job.objects.filter(
-                status__in=['allocated', 'in_progress'],
-                strict_deadline__lt=timezone.now()
-            ).count(),
+            ).order_by('first_name', 'last_name')),
+            'process_users': lambda: list(CustomUser.objects.filter(
+                role='process',
+                is_active=True,
+                approval_status='approved'
+            ).order_by('first_name', 'last_name')),
+            # Statistics (materialized counters)
+            'stats': allocator_stats,
         }
-    
+
+    return {}
+
+
+@login_required
+@condition(etag_func=conditional_etag(_dashboard_scopes),
+           last_modified_func=conditional_last_modified(_dashboard_scopes))
+def dashboard_view(request):
+    """
+    Main dashboard view that routes users to their role-specific dashboard
+    """
+    template = DASHBOARD_TEMPLATES.get(request.user.role, 'dashboards/user_dashboard.html')
+    context = {
+        'user': request.user,
+        **load(_dashboard_loaders(request, request.user)),
+    }
     return render(request, template, context)
 
 
+@async_dashboard(_dashboard_scopes)
+async def dashboard_async_view(request):
+    """
+    ``dashboard_view`` for ASGI: the dashboard's reads run concurrently.
+    """
+    template = DASHBOARD_TEMPLATES.get(request.user.role, 'dashboards/user_dashboard.html')
+    context = {
+        'user': request.user,
+        **await aload(_dashboard_loaders(request, request.user)),
+    }
+    return await sync_to_async(render)(request, template, context)
+
+
+@require_safe
+def dashboard_events(request):
+    """
+    Live job updates for the user's dashboard (marketing.live). With
+    LIVE_DASHBOARDS, crm_project.asgi serves this URL as server-sent events
+    before it gets here. Otherwise (or under WSGI, where a stream would hold
+    a worker thread) there are none: 204 tells EventSource not to reconnect.
+    """
+    return HttpResponse(status=204)
+
+
 @login_required
 def change_user_role(request, user_id):
     """
@@ -162,6 +208,7 @@ def approve_user(request, user_id):
         user.approved_by = request.user
         user.approved_at = timezone.now()
         user.save()
+        send_approval_decision.enqueue(user.pk)
         
         messages.success(
             request, 
@@ -195,6 +242,7 @@ def reject_user(request, user_id):
         user.approved_by = request.user
         user.approved_at = timezone.now()
         user.save()
+        send_approval_decision.enqueue(user.pk)
         
         messages.success(
             request, 
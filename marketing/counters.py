@@ -0,0 +1,301 @@
+"""
+Materialized dashboard counters.
+
+One small document per dashboard scope lives in the ``dashboard_counters``
+collection:
+
+    allocator          pending_count, overdue_count, allocated_on.<date>
+    writer:<user id>   assigned_count, in_progress, completed
+    process:<user id>  in_queue, completed_on.<date>
+    marketing:<id>     total, completed
+
+Every job contributes +1 to a set of ``(document, field)`` slots determined by
+its current state (see ``contributions``). When a job is saved or deleted we
+``$inc`` the difference between its old and new contributions, so reading a
+dashboard's counters is a single ``find_one`` by ``_id``.
+
+Counters can drift: writes that bypass the ORM skip the signals (bulk
+writers such as the deadline sweeper apply their transitions themselves). ``manage.py reconcile_counters`` rebuilds
+every document from the job collection and reports what it corrected.
+
+A document only counts as complete once a rebuild has written it (its
+``seeded`` flag): the first increment for a new scope upserts a document
+holding just that increment, and ``read`` ignores it until the next
+reconcile, so the dashboards fall back to aggregating (marketing.stats).
+Every write bumps the document's ``version``, which lets a rebuild replace
+it without losing increments made while it was recounting.
+"""
+
+import logging
+from collections import Counter, namedtuple
+from datetime import timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from crm_project import changes
+from crm_project.mongo import get_collection, get_database
+
+from . import live
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'dashboard_counters'
+
+OPEN_STATUSES = ('allocated', 'in_progress')
+
+# Days of per-date counters (allocated_on / completed_on) kept by reconcile.
+DATED_COUNTER_DAYS = 7
+
+JobSnapshot = namedtuple('JobSnapshot', [
+    'id', 'status', 'created_by_id', 'allocated_to_id', 'process_user_id',
+    'allocated_at', 'process_assigned_at', 'overdue_since',
+])
+
+
+def _collection():
+    return get_database()[COLLECTION]
+
+
+def snapshot(job):
+    """
+    Capture the fields that drive the counters, or None if any of them was
+    deferred (reading it would cost a query).
+    """
+    values = job.__dict__
+    if any(Job._meta.get_field(name).attname not in values for name in JobSnapshot._fields):
+        return None
+    return JobSnapshot(*(values[Job._meta.get_field(name).attname] for name in JobSnapshot._fields))
+
+
+def stored_snapshot(pk):
+    """
+    Snapshot of the job as currently stored, read straight from MongoDB.
+    """
+    columns = [Job._meta.get_field(name).column for name in JobSnapshot._fields]
+    doc = get_collection(Job).find_one({'id': pk}, {column: 1 for column in columns})
+    if doc is None:
+        return None
+    return JobSnapshot(*(doc.get(column) for column in columns))
+
+
+def _aware(value):
+    # pymongo hands back naive UTC datetimes, the ORM aware ones.
+    return timezone.make_aware(value, dt_timezone.utc) if timezone.is_naive(value) else value
+
+
+def _day(value):
+    return timezone.localtime(_aware(value)).date().isoformat()
+
+
+def contributions(snap):
+    """
+    The counter slots a job in state ``snap`` adds one to.
+    """
+    if snap is None:
+        return []
+    status = snap.status
+    slots = [(f'marketing:{snap.created_by_id}', 'total')]
+    if status == 'completed':
+        slots.append((f'marketing:{snap.created_by_id}', 'completed'))
+
+    if status == 'pending_allocation':
+        slots.append(('allocator', 'pending_count'))
+    if snap.allocated_at:
+        slots.append(('allocator', f'allocated_on.{_day(snap.allocated_at)}'))
+    if status in OPEN_STATUSES and snap.overdue_since:
+        slots.append(('allocator', 'overdue_count'))
+
+    if snap.allocated_to_id:
+        writer = f'writer:{snap.allocated_to_id}'
+        if status in OPEN_STATUSES:
+            slots.append((writer, 'assigned_count'))
+        if status == 'in_progress':
+            slots.append((writer, 'in_progress'))
+        if status in ('submitted', 'completed'):
+            slots.append((writer, 'completed'))
+
+    if snap.process_user_id:
+        process = f'process:{snap.process_user_id}'
+        if status == 'processing_queue':
+            slots.append((process, 'in_queue'))
+        if status == 'completed' and snap.process_assigned_at:
+            slots.append((process, f'completed_on.{_day(snap.process_assigned_at)}'))
+    return slots
+
+
+def scopes(snap):
+    """
+    Dashboard scopes (change markers, see crm_project.changes) that show a
+    job in state ``snap``.
+    """
+    if snap is None:
+        return set()
+    found = {'allocator', f'marketing:{snap.created_by_id}'}
+    if snap.allocated_to_id:
+        found.add(f'writer:{snap.allocated_to_id}')
+    if snap.process_user_id:
+        found.add(f'process:{snap.process_user_id}')
+    return found
+
+
+def apply_transitions(pairs):
+    """
+    Apply the counter deltas for a batch of ``(old_snapshot, new_snapshot)``
+    pairs in one bulk write. ``None`` stands for "no job" (creation/deletion).
+
+    Also bumps the change markers of every dashboard that shows the jobs,
+    even when no counter moved (an edited topic still changes the page),
+    and publishes the batch to their live streams (marketing.live).
+    """
+    changes.bump(set().union(*(scopes(old) | scopes(new) for old, new in pairs)))
+    live.publish_transitions(pairs)
+
+    delta = Counter()
+    for old, new in pairs:
+        delta.subtract(contributions(old))
+        delta.update(contributions(new))
+
+    by_doc = {}
+    for (doc_id, field), n in delta.items():
+        if n:
+            by_doc.setdefault(doc_id, {})[field] = n
+    if not by_doc:
+        return
+
+    try:
+        _collection().bulk_write(
+            [UpdateOne({'_id': doc_id}, {'$inc': {**inc, 'version': 1}}, upsert=True)
+             for doc_id, inc in by_doc.items()],
+            ordered=False,
+        )
+    except PyMongoError:
+        # Never fail the job write over a counter; reconcile_counters repairs it.
+        logger.warning('Could not update dashboard counters', exc_info=True)
+
+
+def read(doc_id):
+    """
+    Return the counters document for ``doc_id``, or None if it doesn't exist
+    or was never seeded by ``rebuild`` (then it only holds the increments
+    since it was created, not complete counts).
+    """
+    doc = _collection().find_one({'_id': doc_id})
+    return doc if doc is not None and doc.get('seeded') else None
+
+
+def _recount(oldest_day, doc_ids=None):
+    """
+    Counters documents computed from the job collection, by ``_id``
+    (restricted to ``doc_ids`` if given).
+    """
+    columns = [Job._meta.get_field(name).column for name in JobSnapshot._fields]
+    computed = {}
+    for doc in get_collection(Job).find({}, {column: 1 for column in columns}):
+        snap = JobSnapshot(*(doc.get(column) for column in columns))
+        for doc_id, field in contributions(snap):
+            if doc_ids is not None and doc_id not in doc_ids:
+                continue
+            if '.' in field:
+                group, day = field.split('.', 1)
+                if day < oldest_day:
+                    continue
+                bucket = computed.setdefault(doc_id, {'_id': doc_id}).setdefault(group, {})
+                bucket[day] = bucket.get(day, 0) + 1
+            else:
+                target = computed.setdefault(doc_id, {'_id': doc_id})
+                target[field] = target.get(field, 0) + 1
+    return computed
+
+
+def rebuild(dry_run=False, attempts=3):
+    """
+    Recompute every counters document from the job collection and mark it
+    seeded.
+
+    Returns ``{doc_id: (old_doc, new_doc)}`` for the documents that drifted.
+
+    Each document is only replaced if its ``version`` (bumped by every
+    ``apply_transitions``) is still the one read before the recount, so an
+    increment that lands meanwhile is never overwritten. Documents that moved
+    are recounted again, up to ``attempts`` passes; any still moving are left
+    for the next run.
+    """
+    now = timezone.now()
+    oldest_day = (timezone.localtime(now) - timedelta(days=DATED_COUNTER_DAYS)).date().isoformat()
+    collection = _collection()
+
+    drift = {}
+    doc_ids = None
+    for _ in range(attempts):
+        # Versions first: whatever moves after this read fails the write below.
+        existing = {
+            doc['_id']: doc
+            for doc in collection.find({} if doc_ids is None else {'_id': {'$in': list(doc_ids)}})
+        }
+        computed = _recount(oldest_day, doc_ids)
+
+        writes = {}
+        for doc_id in set(existing) | set(computed):
+            old = existing.get(doc_id)
+            new = computed.get(doc_id)
+            if _normalized(old) != _normalized(new):
+                drift[doc_id] = (old, new)
+            elif old is not None and old.get('seeded'):
+                continue
+            writes[doc_id] = (old, new or {'_id': doc_id})
+        if dry_run or not writes:
+            break
+
+        ids, ops = list(writes), []
+        for doc_id in ids:
+            old, new = writes[doc_id]
+            version = old.get('version') if old else None
+            ops.append(ReplaceOne(
+                {'_id': doc_id, 'version': version},
+                {**new, 'seeded': True, 'version': (version or 0) + 1},
+                upsert=True,
+            ))
+        try:
+            collection.bulk_write(ops, ordered=False)
+            doc_ids = set()
+        except BulkWriteError as e:
+            # A version mismatch turns the upsert into a duplicate _id insert.
+            if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                raise
+            doc_ids = {ids[error['index']] for error in e.details['writeErrors']}
+        for doc_id in doc_ids:
+            drift.pop(doc_id, None)
+        if not doc_ids:
+            break
+    else:
+        logger.warning('Counters kept changing during rebuild, left for the next run: %s',
+                       ', '.join(sorted(doc_ids)))
+    return drift
+
+
+def _normalized(doc):
+    # Zero counters and empty date buckets are the same as missing ones.
+    if not doc:
+        return {}
+    clean = {}
+    for key, value in doc.items():
+        if key in ('_id', 'seeded', 'version'):
+            continue
+        if isinstance(value, dict):
+            value = {k: v for k, v in value.items() if v}
+        if value:
+            clean[key] = value
+    return clean
+
+
+def describe(doc):
+    """
+    Compact one-line rendering of a counters document for command output.
+    """
+    clean = _normalized(doc)
+    if not clean:
+        return '{}'
+    return ', '.join(f'{key}={value}' for key, value in sorted(clean.items()))
@@ -0,0 +1,121 @@
+"""
+Deadline sweeper.
+
+Rather than every page comparing each job's deadlines with ``timezone.now()``
+(``Job.is_overdue`` used to), ``sweep`` runs periodically and flags the jobs
+that crossed a deadline since the last pass:
+
+    late_since     the job passed its expected_deadline
+    overdue_since  the job passed its strict_deadline
+
+Each pass is a handful of range queries on ``(status, <flag>, <deadline>)``
+indexes that only match newly crossed jobs, plus one ``update_many`` per
+flag. Flags are cleared again when a job finishes or its deadline is moved
+out. Every newly flagged batch is announced through the ``deadline_crossed``
+signal.
+"""
+
+import logging
+
+from django.utils import timezone
+
+from crm_project.mongo import get_collection
+
+from . import counters
+from .models import Job
+from .signals import deadline_crossed
+
+logger = logging.getLogger(__name__)
+
+# flag field -> the deadline it tracks
+FLAGS = {
+    'late_since': 'expected_deadline',
+    'overdue_since': 'strict_deadline',
+}
+
+
+def _column(name):
+    return Job._meta.get_field(name).column
+
+
+def active_statuses():
+    return [value for value, _ in Job._meta.get_field('status').choices
+            if value not in Job.FINISHED_STATUSES]
+
+
+def _transition(doc, snapshot_columns, flag, value):
+    # Flags outside the snapshot move no counter, but the transition still
+    # marks the job's dashboards as changed.
+    old = counters.JobSnapshot(*(doc.get(column) for column in snapshot_columns))
+    if flag in counters.JobSnapshot._fields:
+        return old, old._replace(**{flag: value})
+    return old, old
+
+
+def _flag(collection, flag, deadline, now):
+    """
+    Set ``flag`` on active jobs whose ``deadline`` has passed. Returns their pks.
+    """
+    snapshot_columns = [_column(name) for name in counters.JobSnapshot._fields]
+    docs = list(collection.find(
+        {
+            _column('status'): {'$in': active_statuses()},
+            _column(deadline): {'$lte': now},
+            _column(flag): None,
+        },
+        {'id': 1, **{column: 1 for column in snapshot_columns}},
+    ))
+    if not docs:
+        return []
+
+    pks = [doc['id'] for doc in docs]
+    collection.update_many(
+        {'id': {'$in': pks}, _column(flag): None},
+        {'$set': {_column(flag): now}},
+    )
+    counters.apply_transitions([_transition(doc, snapshot_columns, flag, now) for doc in docs])
+    return pks
+
+
+def _unflag(collection, flag, deadline, now):
+    """
+    Clear ``flag`` on jobs that finished or whose deadline moved out.
+    Returns how many were cleared.
+    """
+    snapshot_columns = [_column(name) for name in counters.JobSnapshot._fields]
+    query = {
+        # $type (not $ne: None) so the partial index on the flag applies
+        _column(flag): {'$type': 'date'},
+        '$or': [
+            {_column('status'): {'$nin': active_statuses()}},
+            {_column(deadline): {'$gt': now}},
+            {_column(deadline): None},
+        ],
+    }
+    docs = list(collection.find(query, {'id': 1, **{column: 1 for column in snapshot_columns}}))
+    if not docs:
+        return 0
+
+    collection.update_many({'id': {'$in': [doc['id'] for doc in docs]}}, {'$set': {_column(flag): None}})
+    counters.apply_transitions([_transition(doc, snapshot_columns, flag, None) for doc in docs])
+    return len(docs)
+
+
+def sweep(now=None):
+    """
+    Run one sweeper pass. Returns ``{flag: (flagged pks, cleared count)}``.
+    """
+    now = now or timezone.now()
+    # BSON dates have millisecond precision.
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    collection = get_collection(Job)
+
+    result = {}
+    for flag, deadline in FLAGS.items():
+        cleared = _unflag(collection, flag, deadline, now)
+        flagged = _flag(collection, flag, deadline, now)
+        if flagged:
+            logger.info('%d job(s) newly %s', len(flagged), flag)
+            deadline_crossed.send(sender=Job, flag=flag, job_pks=flagged, at=now)
+        result[flag] = (flagged, cleared)
+    return result
@@ -3,10 +3,12 @@ from django.utils import timezone
 from datetime import timedelta
 from django.core.exceptions import ValidationError
 
+from crm_project.uploads import UploadFormMixin
+
 from .models import Job
 
 
-class JobDropForm(forms.ModelForm):
+class JobDropForm(UploadFormMixin, forms.ModelForm):
     class Meta:
         model = Job
         fields = ['job_id', 'instructions', 'attachment']
@@ -23,7 +25,7 @@ class JobDropForm(forms.ModelForm):
             'attachment': forms.FileInput(attrs={'class': 'form-control'})
         }
 
-    # Enforce uniqueness at the app layer to avoid Djongo unique-index quirks
+    # Friendly error before the `job_job_id` unique index rejects the insert
     def clean_job_id(self):
         job_id = self.cleaned_data.get('job_id')
         if not job_id:
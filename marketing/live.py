@@ -0,0 +1,68 @@
+"""
+Live job updates for the dashboards, over server-sent events
+(crm_project.events).
+
+Every batch of job transitions ``counters.apply_transitions`` applies - ORM
+saves, bulk allocation, the deadline sweeper - is published as one ``jobs``
+event to the channels of the dashboards showing those jobs, the same scopes
+as their change markers: ``allocator``, ``writer:<pk>``, ``process:<pk>``
+and ``marketing:<pk>``. Each entry of ``jobs`` is one job:
+
+    {"id": 42, "status": "allocated", "previous": "pending_allocation",
+     "allocated_to": 7, "process_user": null}
+
+``previous`` is null for a new job and ``status`` for a deleted one; both
+are the same when something other than the status changed. Jobs that
+newly crossed a deadline are also sent to ``allocator`` as a ``deadline``
+event: ``{"flag": "late_since", "jobs": [42, ...]}``.
+"""
+
+from crm_project import events
+
+from . import counters
+
+# Roles watching the whole job flow.
+ALLOCATOR_ROLES = ('allocator', 'manager', 'admin', 'superadmin')
+
+
+def channels_for(user):
+    """
+    The channels ``user``'s dashboard listens to, or None.
+    """
+    if user.role in ALLOCATOR_ROLES:
+        return ['allocator']
+    if user.role in ('writer', 'process', 'marketing'):
+        return [f'{user.role}:{user.pk}']
+    return None
+
+
+def _entry(old, new):
+    current = new or old
+    return {
+        'id': current.id,
+        'status': new.status if new else None,
+        'previous': old.status if old else None,
+        'allocated_to': current.allocated_to_id,
+        'process_user': current.process_user_id,
+    }
+
+
+def publish_transitions(pairs):
+    """
+    Publish a batch of ``(old_snapshot, new_snapshot)`` pairs: one event
+    per channel, as ``counters.apply_transitions`` bumps one change marker
+    per scope.
+    """
+    by_channel = {}
+    for old, new in pairs:
+        if old is None and new is None:
+            continue
+        entry = _entry(old, new)
+        for channel in counters.scopes(old) | counters.scopes(new):
+            by_channel.setdefault(channel, []).append(entry)
+    for channel, jobs in by_channel.items():
+        events.publish([channel], 'jobs', {'jobs': jobs})
+
+
+def publish_deadlines(flag, job_pks):
+    events.publish(['allocator'], 'deadline', {'flag': flag, 'jobs': list(job_pks)})
@@ -0,0 +1,126 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pymongo.errors import PyMongoError
+
+from crm_project.mongo import get_collection, get_database, model_index_specs, sync_indexes
+from marketing.models import Job
+from writer.models import WriterSubmission
+
+ARCHIVE_COLLECTION = 'marketing_job_duplicates'
+
+# How far a job has moved through the workflow. When several rows share a
+# job_id we keep the most advanced one, since allocations and writer
+# submissions point at it; ties go to the most recently created row.
+STATUS_RANK = {
+    'draft': 0,
+    'pending_completion': 1,
+    'pending_allocation': 2,
+    'allocated': 3,
+    'processing_queue': 3,
+    'in_progress': 4,
+    'processing': 4,
+    'submitted': 5,
+    'completed': 6,
+    'cancelled': -1,
+}
+
+# Never copied from a duplicate into the surviving row.
+KEEP_FIELDS = {'_id', 'id', 'job_id'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Collapse Job rows that share a job_id into a single row, archive the "
+        "duplicates and create the unique job_id index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report the duplicate groups and the row that would survive.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        jobs = get_collection(Job)
+        submissions = get_collection(WriterSubmission)
+        archive = get_database()[ARCHIVE_COLLECTION]
+        fk_column = WriterSubmission._meta.get_field('job').column
+
+        try:
+            groups = list(jobs.aggregate([
+                {'$group': {'_id': '$job_id', 'rows': {'$push': '$_id'}, 'n': {'$sum': 1}}},
+                {'$match': {'n': {'$gt': 1}}},
+            ], allowDiskUse=True))
+        except PyMongoError as e:
+            raise CommandError(f'Could not scan for duplicates: {e}') from e
+
+        if not groups:
+            self.stdout.write('No duplicate job_id values found.')
+
+        conflicts = []
+        archived = 0
+        for group in groups:
+            docs = list(jobs.find({'_id': {'$in': group['rows']}}))
+            docs.sort(key=self._survivor_key, reverse=True)
+            survivor, losers = docs[0], docs[1:]
+            loser_ids = [doc['id'] for doc in losers]
+
+            # A writer submission is a OneToOne on the job; we can move one onto
+            # the survivor, but two submissions for one job need a human.
+            linked = list(submissions.find({fk_column: {'$in': [survivor['id']] + loser_ids}}))
+            if len(linked) > 1:
+                conflicts.append(group['_id'])
+                self.stdout.write(self.style.WARNING(
+                    f'{group["_id"]}: {len(linked)} writer submissions attached, skipping'
+                ))
+                continue
+
+            self.stdout.write(
+                f'{group["_id"]}: keeping id={survivor["id"]} ({survivor.get("status")}), '
+                f'archiving {", ".join(str(i) for i in loser_ids)}'
+            )
+            if dry_run:
+                continue
+
+            merged = {
+                field: value
+                for loser in losers
+                for field, value in loser.items()
+                if field not in KEEP_FIELDS and value is not None and survivor.get(field) is None
+            }
+            if merged:
+                jobs.update_one({'_id': survivor['_id']}, {'$set': merged})
+            if linked and linked[0][fk_column] != survivor['id']:
+                submissions.update_one({'_id': linked[0]['_id']}, {'$set': {fk_column: survivor['id']}})
+
+            now = timezone.now()
+            archive.insert_many([
+                dict(loser, duplicate_of=survivor['id'], archived_at=now) for loser in losers
+            ])
+            jobs.delete_many({'_id': {'$in': [loser['_id'] for loser in losers]}})
+            archived += len(losers)
+
+        if dry_run:
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} duplicate row(s) into {ARCHIVE_COLLECTION}.'
+        ))
+        if conflicts:
+            raise CommandError(
+                'Unique index not created; resolve these job_ids by hand first: '
+                + ', '.join(conflicts)
+            )
+
+        try:
+            sync_indexes(jobs, model_index_specs(Job))
+        except PyMongoError as e:
+            raise CommandError(f'Could not create the job_id unique index: {e}') from e
+        self.stdout.write(self.style.SUCCESS('job_id unique index is in place.'))
+
+    @staticmethod
+    def _survivor_key(doc):
+        return (STATUS_RANK.get(doc.get('status'), 0), doc.get('created_at') or datetime.min)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from crm_project.mongo import get_collection
+from marketing import previews
+from marketing.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract the attachment previews still missing or pending (e.g. "
+        "their task is queued or failed), synchronously."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry failed extractions.')
+        parser.add_argument('--all', action='store_true', help='Re-extract every attachment.')
+
+    def handle(self, *args, **options):
+        column = Job._meta.get_field('preview_status').column
+        match = {Job._meta.get_field('attachment').column: {'$nin': [None, '']}}
+        if not options['all']:
+            statuses = [None, 'pending'] + (['failed'] if options['retry_failed'] else [])
+            match[column] = {'$in': statuses}
+
+        done = {}
+        for doc in get_collection(Job).find(match, {'id': 1}).sort('id', 1):
+            values = previews.extract_job(doc['id'])
+            if values:
+                done[values['preview_status']] = done.get(values['preview_status'], 0) + 1
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(done.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Previews: {summary}.'))
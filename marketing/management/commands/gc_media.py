@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from crm_project import storage
+from crm_project.mongo import get_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the references to every media blob from the job and "
+        "submission file fields, fix the stored counts and delete the blobs "
+        "nothing references any more. With --adopt, first move files saved "
+        "before content-addressed storage into the blob store, merging "
+        "duplicates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without touching files or counts.')
+        parser.add_argument('--adopt', action='store_true',
+                            help='Move legacy files into the blob store and rename them on their rows.')
+        parser.add_argument('--min-age', type=int, default=60, metavar='MINUTES',
+                            help='Keep unreferenced blobs saved within this many minutes (default 60).')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        prefix = '[dry-run] ' if dry_run else ''
+        try:
+            if options['adopt']:
+                self._adopt(dry_run, prefix)
+            drift, removed = storage.rebuild(dry_run=dry_run, min_age=timedelta(minutes=options['min_age']))
+        except PyMongoError as e:
+            raise CommandError(f'Media garbage collection failed: {e}') from e
+
+        for sha256, (old, new) in sorted(drift.items()):
+            self.stdout.write(self.style.WARNING(f'{prefix}{sha256}: refs {old} -> {new}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Corrected {len(drift)} reference count(s), removed {len(removed)} unreferenced blob(s).'
+        ))
+
+    def _adopt(self, dry_run, prefix):
+        adopted = {}
+        missing = set()
+        for model, field, name in list(storage.stored_names()):
+            if storage.name_sha256(name) or name in missing:
+                continue
+            if dry_run:
+                self.stdout.write(f'{prefix}would adopt {name}')
+                continue
+            if name not in adopted:
+                result = storage.adopt(name)
+                if result is None:
+                    missing.add(name)
+                    self.stderr.write(self.style.ERROR(f'{name}: file is missing, left as is'))
+                    continue
+                adopted[name] = result
+            new_name, sha256 = adopted[name]
+            update = {field.column: new_name}
+            checksum = f'{field.name}_sha256'
+            if any(f.name == checksum for f in model._meta.fields):
+                update[model._meta.get_field(checksum).column] = sha256
+            # Direct writes: the references are recounted right after.
+            get_collection(model).update_many({field.column: name}, {'$set': update})
+            self.stdout.write(f'{name} -> {new_name}')
+        if adopted:
+            distinct = len({sha256 for _, sha256 in adopted.values()})
+            self.stdout.write(self.style.SUCCESS(
+                f'Adopted {len(adopted)} file(s) into {distinct} blob(s).'
+            ))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from marketing import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the materialized dashboard counters from the job collection "
+        "and report any drift that was corrected. Run once after deploying the "
+        "counters, then periodically (cron or --loop)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drift without rewriting the counters.',
+        )
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help='Keep running, reconciling every SECONDS seconds.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                self._reconcile(options['dry_run'])
+            except PyMongoError as e:
+                if not options['loop']:
+                    raise CommandError(f'Counter reconcile failed: {e}') from e
+                self.stderr.write(self.style.ERROR(f'Counter reconcile failed: {e}'))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
+
+    def _reconcile(self, dry_run):
+        drift = counters.rebuild(dry_run=dry_run)
+        prefix = '[dry-run] ' if dry_run else ''
+        if not drift:
+            self.stdout.write(f'{prefix}Counters are in sync.')
+            return
+        for doc_id, (old, new) in sorted(drift.items()):
+            self.stdout.write(self.style.WARNING(
+                f'{prefix}{doc_id}: {counters.describe(old)} -> {counters.describe(new)}'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'{prefix}Corrected {len(drift)} counter document(s).'))
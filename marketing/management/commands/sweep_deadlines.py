@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from marketing import deadlines
+
+
+class Command(BaseCommand):
+    help = (
+        "Flag jobs that passed their expected deadline (late_since) or strict "
+        "deadline (overdue_since), and clear flags that no longer apply. Run it "
+        "from cron or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help='Keep running, sweeping every SECONDS seconds.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                self._sweep()
+            except PyMongoError as e:
+                if not options['loop']:
+                    raise CommandError(f'Deadline sweep failed: {e}') from e
+                self.stderr.write(self.style.ERROR(f'Deadline sweep failed: {e}'))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
+
+    def _sweep(self):
+        for flag, (flagged, cleared) in deadlines.sweep().items():
+            line = f'{flag:<14} flagged {len(flagged)}, cleared {cleared}'
+            self.stdout.write(self.style.WARNING(line) if flagged else line)
@@ -0,0 +1,78 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from crm_project.mongo import get_collection, index_usage, model_index_specs, sync_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Create and reconcile the MongoDB indexes declared in MONGO_INDEXES "
+        "(Job, CustomUser, ...), and report how often each index has been used."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Show what would change without touching the collection.',
+        )
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Drop non-unique indexes that are not declared in the spec.',
+        )
+        parser.add_argument(
+            '--usage', action='store_true',
+            help='Report $indexStats usage counters and flag unused indexes.',
+        )
+
+    def handle(self, *args, **options):
+        models = [model for model in apps.get_models() if getattr(model, 'MONGO_INDEXES', None)]
+        for model in models:
+            if len(models) > 1:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{model._meta.label} ({model._meta.db_table}):'))
+            self._sync(model, options)
+
+    def _sync(self, model, options):
+        collection = get_collection(model)
+        specs = model_index_specs(model)
+
+        try:
+            actions = sync_indexes(
+                collection, specs,
+                prune=options['prune'],
+                dry_run=options['dry_run'],
+            )
+        except PyMongoError as e:
+            raise CommandError(f'Index sync failed: {e}') from e
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        for action, name in actions:
+            if action == 'keep':
+                self.stdout.write(f'{prefix}keep     {name}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{prefix}{action:<8} {name}'))
+
+        if options['usage']:
+            self._report_usage(collection, {spec['name'] for spec in specs})
+
+    def _report_usage(self, collection, declared):
+        try:
+            usage = index_usage(collection)
+        except PyMongoError as e:
+            raise CommandError(f'Could not read $indexStats: {e}') from e
+
+        self.stdout.write('')
+        self.stdout.write('Index usage (ops since counters were reset):')
+        unused = []
+        for name, entry in sorted(usage.items(), key=lambda item: -item[1]['ops']):
+            since = entry['since'].strftime('%Y-%m-%d %H:%M') if entry['since'] else '?'
+            marker = '' if name in declared or name == '_id_' else '  (not declared)'
+            self.stdout.write(f'  {name:<32} {entry["ops"]:>12}  since {since}{marker}')
+            if entry['ops'] == 0 and name != '_id_':
+                unused.append(name)
+
+        if unused:
+            self.stdout.write(self.style.WARNING(
+                'Unused indexes: ' + ', '.join(unused)
+                + ' - consider removing them from the spec (or run with --prune if undeclared).'
+            ))
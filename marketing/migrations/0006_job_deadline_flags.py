@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0005_job_process_assigned_at_job_process_user_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='late_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='overdue_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
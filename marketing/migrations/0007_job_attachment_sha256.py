@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0006_job_deadline_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='attachment_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+    ]
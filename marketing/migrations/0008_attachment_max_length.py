@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0007_job_attachment_sha256'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='attachment',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to='job_attachments/'),
+        ),
+    ]
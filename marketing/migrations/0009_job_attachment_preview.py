@@ -0,0 +1,38 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0008_attachment_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='preview_detail',
+            field=models.CharField(blank=True, editable=False, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='preview_pages',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='preview_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('ready', 'Ready'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='preview_text',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='preview_words',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,5 +1,4 @@
 from django.db import models
-from django.utils import timezone
 from datetime import timedelta
 from authentication.models import CustomUser
 from django.conf import settings
@@ -37,9 +36,29 @@ class Job(models.Model):
     ]
     
     # Job Drop fields
-    job_id = models.CharField(max_length=100, unique=True)
+    # job_id uniqueness is enforced by the `job_job_id` unique index in
+    # MONGO_INDEXES (see `manage.py compact_job_ids`) and by JobDropForm.
+    job_id = models.CharField(max_length=64)
     instructions = models.TextField()
-    attachment = models.FileField(upload_to='job_attachments/', null=True, blank=True)
+    attachment = models.FileField(upload_to='job_attachments/', max_length=255, null=True, blank=True)
+    # Hex SHA-256 of the attachment, computed while it was uploaded
+    attachment_sha256 = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    # Attachment preview, filled in the background (marketing.previews)
+    PREVIEW_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    ]
+    preview_status = models.CharField(max_length=20, choices=PREVIEW_STATUS_CHOICES, null=True, blank=True,
+                                      editable=False)
+    preview_text = models.TextField(blank=True, null=True, editable=False)
+    preview_pages = models.IntegerField(null=True, blank=True, editable=False)
+    preview_words = models.IntegerField(null=True, blank=True, editable=False)
+    # e.g. "PNG, 1200×800" for images
+    preview_detail = models.CharField(max_length=200, blank=True, null=True, editable=False)
+
     created_by = models.ForeignKey(
         CustomUser, 
         on_delete=models.CASCADE, 
@@ -95,7 +114,6 @@ class Job(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     
-    job_id = models.CharField(max_length=64)  # your code/id string
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='created_jobs')
     # Writer assignment
     allocated_to = models.ForeignKey(
@@ -111,6 +129,12 @@ class Job(models.Model):
     )
     process_assigned_at = models.DateTimeField(null=True, blank=True)
 
+    # Deadline flags, set by `manage.py sweep_deadlines` when a job still in
+    # progress passes its expected / strict deadline, and cleared again if the
+    # job finishes or the deadline moves.
+    late_since = models.DateTimeField(null=True, blank=True)
+    overdue_since = models.DateTimeField(null=True, blank=True)
+
     status = models.CharField(
         max_length=32,
         choices=[
@@ -127,30 +151,108 @@ class Job(models.Model):
     )
 
     
+    # MongoDB indexes, created through pymongo by `manage.py sync_job_indexes`
+    # (Djongo's migration-driven Meta.indexes are unreliable). Keys use Django
+    # field names; each entry backs one of the hot dashboard filters.
+    MONGO_INDEXES = [
+        # allocator queues: status filter, newest first
+        {'name': 'job_status_created', 'keys': [('status', 1), ('created_at', -1)]},
+        # allocated list ordered by allocation time / "allocated today"
+        {'name': 'job_status_allocated_at', 'keys': [('status', 1), ('allocated_at', -1)]},
+        {'name': 'job_allocated_at', 'keys': [('allocated_at', -1)]},
+        # deadline sweeper: unflagged jobs that crossed their expected / strict deadline
+        {'name': 'job_sweep_late', 'keys': [('status', 1), ('late_since', 1), ('expected_deadline', 1)]},
+        {'name': 'job_sweep_overdue', 'keys': [('status', 1), ('overdue_since', 1), ('strict_deadline', 1)]},
+        # flagged jobs only: overdue counters/lists and the sweeper's un-flag pass
+        {'name': 'job_late_since', 'keys': [('late_since', -1)],
+         'partialFilterExpression': {'late_since': {'$type': 'date'}}},
+        {'name': 'job_overdue_since', 'keys': [('overdue_since', -1)],
+         'partialFilterExpression': {'overdue_since': {'$type': 'date'}}},
+        # marketing views: jobs created by a user
+        {'name': 'job_created_by_created', 'keys': [('created_by', 1), ('created_at', -1)]},
+        # writer dashboard queue
+        {'name': 'job_writer_queue', 'keys': [('allocated_to', 1), ('status', 1), ('expected_deadline', 1)]},
+        # process dashboard queue
+        {'name': 'job_process_queue', 'keys': [('process_user', 1), ('status', 1), ('expected_deadline', 1)]},
+        # previews: reuse the one of a job with the same attachment content
+        {'name': 'job_attachment_sha256', 'keys': [('attachment_sha256', 1)],
+         'partialFilterExpression': {'attachment_sha256': {'$type': 'string'}}},
+        # one row per human-readable id (JobDropForm's duplicate check)
+        {'name': 'job_job_id', 'keys': [('job_id', 1)], 'unique': True},
+    ]
+
+    # Statuses after which deadlines no longer matter.
+    FINISHED_STATUSES = ['completed', 'cancelled']
+
+    # Written only in the background, straight to MongoDB: the deadline
+    # sweeper's flags (marketing.deadlines) and the attachment preview
+    # (marketing.previews). Saving an existing job leaves them out, so it
+    # can't write back the values the instance was loaded with.
+    BACKGROUND_FIELDS = (
+        'late_since', 'overdue_since',
+        'preview_status', 'preview_text', 'preview_pages', 'preview_words', 'preview_detail',
+    )
+
     class Meta:
         ordering = ['-created_at']
         db_table = 'marketing_job'
-        # REMOVED indexes - Djongo doesn't support them well
-    
+        # No Meta.indexes - see MONGO_INDEXES above.
+
     def __str__(self):
         return f"{self.job_id} - {self.status}"
     
+    def as_dict(self):
+        """
+        JSON-safe summary of the job, used by the list/queue JSON endpoints.
+        """
+        def iso(value):
+            return value.isoformat() if value else None
+
+        return {
+            'id': self.pk,
+            'job_id': self.job_id,
+            'topic': self.topic,
+            'word_count': self.word_count,
+            'amount': str(self.amount) if self.amount is not None else None,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'created_by_id': self.created_by_id,
+            'allocated_to_id': self.allocated_to_id,
+            'process_user_id': self.process_user_id,
+            'expected_deadline': iso(self.expected_deadline),
+            'strict_deadline': iso(self.strict_deadline),
+            'allocated_at': iso(self.allocated_at),
+            'created_at': iso(self.created_at),
+        }
+
     def save(self, *args, **kwargs):
         # Auto-calculate strict deadline (24 hours after expected deadline)
         if self.expected_deadline and not self.strict_deadline:
             self.strict_deadline = self.expected_deadline + timedelta(hours=24)
+        if not self._state.adding and not args and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            # Like Model.save, deferred fields aren't written either.
+            skipped = self.get_deferred_fields() | set(self.BACKGROUND_FIELDS)
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.attname not in skipped]
         super().save(*args, **kwargs)
     
+    @property
+    def is_late(self):
+        return self.late_since is not None
+
     @property
     def is_overdue(self):
-        if self.strict_deadline and self.status not in ['completed', 'cancelled']:
-            return timezone.now() > self.strict_deadline
-        return False
+        return self.overdue_since is not None
     
-    @property
-    def time_remaining(self):
+    def time_remaining(self, now):
+        """
+        Time left until the expected deadline at ``now``, e.g. "2d 5h". Pass
+        one ``now`` for every row of a page rather than reading the clock
+        per row.
+        """
         if self.expected_deadline and self.status not in ['completed', 'cancelled']:
-            remaining = self.expected_deadline - timezone.now()
+            remaining = self.expected_deadline - now
             if remaining.total_seconds() > 0:
                 days = remaining.days
                 hours = remaining.seconds // 3600
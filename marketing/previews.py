@@ -0,0 +1,239 @@
+"""
+Attachment previews, extracted in the background.
+
+When a job gets a new attachment, ``schedule()`` marks its preview pending
+and queues the ``marketing.tasks.extract_preview`` task, so the request
+that uploaded it returns without waiting. The task reads the stored file
+and sets on the job:
+
+    preview_text    the first PREVIEW_CHARS characters of the text
+    preview_words   words in the whole text
+    preview_pages   pages (.docx: as Word last counted them; PDF; image frames)
+    preview_detail  a short description (image format and size)
+    preview_status  pending -> ready / unsupported / failed
+
+.docx files are read as the zip of XML they are and PDFs by their page
+objects and text-showing operators (no layout, no CID fonts: enough for a
+preview); images go through Pillow. Attachments are content-addressed, so
+a file already previewed for another job is copied, not extracted again.
+
+Queued tasks survive restarts (see tasks.queue); ``manage.py
+extract_previews`` extracts whatever is still missing synchronously.
+"""
+
+import logging
+import os
+import re
+import zipfile
+import zlib
+from xml.etree import ElementTree
+
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from crm_project.mongo import get_collection
+from crm_project.storage import name_sha256
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_CHARS = 2000
+FIELDS = ('preview_status', 'preview_text', 'preview_pages', 'preview_words', 'preview_detail')
+
+# Caps on what a (possibly hostile) file may make us inflate.
+MAX_XML_SIZE = 50 * 1024 * 1024
+MAX_STREAM_SIZE = 10 * 1024 * 1024
+
+
+def _column(name):
+    return Job._meta.get_field(name).column
+
+
+def _store(pk, values, attachment=None):
+    match = {'id': pk}
+    if attachment is not None:
+        # Replaced while we were extracting: that upload has its own run.
+        match[_column('attachment')] = attachment
+    get_collection(Job).update_one(match, {'$set': {_column(name): value for name, value in values.items()}})
+
+
+def schedule(job):
+    """
+    Extract ``job``'s attachment preview in the background.
+    """
+    from .tasks import extract_preview
+    values = dict.fromkeys(FIELDS)
+    values['preview_status'] = 'pending'
+    _store(job.pk, values)
+    for name, value in values.items():
+        setattr(job, name, value)
+    extract_preview.enqueue(job.pk)
+
+
+def extract_job(pk):
+    """
+    Extract and store the preview of job ``pk``'s attachment; returns the
+    stored values, or None if the job has no attachment.
+    """
+    collection = get_collection(Job)
+    attachment, sha256_column = _column('attachment'), _column('attachment_sha256')
+    doc = collection.find_one({'id': pk}, {attachment: 1, sha256_column: 1})
+    if not doc or not doc.get(attachment):
+        return None
+    name = doc[attachment]
+
+    values = None
+    sha256 = doc.get(sha256_column) or name_sha256(name)
+    if sha256:
+        done = collection.find_one(
+            {sha256_column: sha256, _column('preview_status'): {'$in': ['ready', 'unsupported']}, 'id': {'$ne': pk}},
+            {_column(field): 1 for field in FIELDS},
+        )
+        if done:
+            values = {field: done.get(_column(field)) for field in FIELDS}
+    if values is None:
+        values = extract(default_storage.path(name), name)
+    _store(pk, values, attachment=name)
+    return values
+
+
+def extract(path, name):
+    """
+    Preview values for the file at ``path``, typed by ``name``'s extension.
+    """
+    values = dict.fromkeys(FIELDS)
+    extractor = EXTRACTORS.get(os.path.splitext(name)[1].lower())
+    if extractor is None:
+        values['preview_status'] = 'unsupported'
+        return values
+    try:
+        text, pages, detail = extractor(path)
+    except Exception:
+        logger.warning('Could not extract a preview from %s', name, exc_info=True)
+        values['preview_status'] = 'failed'
+        return values
+
+    if text is not None:
+        text = re.sub(r'\n{3,}', '\n\n', text).strip()
+        values['preview_words'] = len(text.split())
+        if len(text) > PREVIEW_CHARS:
+            text = text[:PREVIEW_CHARS].rsplit(None, 1)[0] + ' …'
+    values.update(preview_status='ready', preview_text=text, preview_pages=pages, preview_detail=detail)
+    return values
+
+
+# .docx
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_APP_PAGES = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}Pages'
+
+
+def _read_xml(archive, member):
+    if archive.getinfo(member).file_size > MAX_XML_SIZE:
+        raise ValueError(f'{member} is too large to preview')
+    return ElementTree.fromstring(archive.read(member))
+
+
+def _docx(path):
+    with zipfile.ZipFile(path) as archive:
+        document = _read_xml(archive, 'word/document.xml')
+        paragraphs = []
+        for paragraph in document.iter(f'{_W}p'):
+            parts = []
+            for node in paragraph.iter():
+                if node.tag == f'{_W}t':
+                    parts.append(node.text or '')
+                elif node.tag == f'{_W}tab':
+                    parts.append('\t')
+                elif node.tag in (f'{_W}br', f'{_W}cr'):
+                    parts.append('\n')
+            paragraphs.append(''.join(parts))
+
+        pages = None
+        if 'docProps/app.xml' in archive.namelist():
+            count = _read_xml(archive, 'docProps/app.xml').find(_APP_PAGES)
+            if count is not None and (count.text or '').strip().isdigit():
+                pages = int(count.text)
+    return '\n'.join(paragraphs), pages, None
+
+
+# PDF
+
+_PDF_PAGE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+_PDF_TEXT = re.compile(rb'\[((?:\\.|[^\]\\])*)\]\s*TJ|\(((?:\\.|[^)\\])*)\)\s*(?:Tj|\'|")|(ET|T\*|Td|TD)\b', re.S)
+_PDF_STRING = re.compile(rb'\(((?:\\.|[^)\\])*)\)', re.S)
+_PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+_PDF_ESCAPE = re.compile(rb'\\([0-7]{1,3}|\r\n|.)', re.S)
+
+
+def _pdf_string(raw):
+    def unescape(match):
+        code = match.group(1)
+        if code[:1].isdigit():
+            return bytes([int(code, 8) & 0xFF])
+        if code in (b'\n', b'\r', b'\r\n'):
+            return b''  # line continuation
+        return _PDF_ESCAPES.get(code, code)
+    return _PDF_ESCAPE.sub(unescape, raw).decode('latin-1')
+
+
+def _pdf_streams(data):
+    """
+    ``(dictionary, decoded data)`` of each stream we can read.
+    """
+    position = 0
+    while True:
+        start = data.find(b'stream', position)
+        end = data.find(b'endstream', start + 6) if start >= 0 else -1
+        if end < 0:
+            return
+        position = end + 9
+        header = data[max(data.rfind(b'obj', 0, start), start - 4096, 0):start]
+        body = data[start + 6:end].lstrip(b'\r\n')
+        if b'/FlateDecode' in header:
+            try:
+                body = zlib.decompressobj().decompress(body, MAX_STREAM_SIZE)
+            except zlib.error:
+                continue
+        elif b'/Filter' in header:
+            continue  # images and encodings we don't read
+        yield header, body
+
+
+def _pdf(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(b'%PDF'):
+        raise ValueError('not a PDF')
+
+    pages = len(_PDF_PAGE.findall(data))
+    text = []
+    for header, stream in _pdf_streams(data):
+        if b'/ObjStm' in header:
+            # Compressed objects: page objects can be in here too.
+            pages += len(_PDF_PAGE.findall(stream))
+            continue
+        for array, string, operator in _PDF_TEXT.findall(stream):
+            if operator:
+                text.append('\n' if operator == b'ET' else ' ')
+            elif array:
+                text.append(''.join(_pdf_string(part) for part in _PDF_STRING.findall(array)))
+            else:
+                text.append(_pdf_string(string))
+    text = re.sub(r'[ \t]+', ' ', ''.join(text))
+    return text, pages or None, None
+
+
+# Images
+
+def _image(path):
+    with Image.open(path) as image:
+        return None, getattr(image, 'n_frames', 1), f'{image.format}, {image.width}×{image.height}'
+
+
+EXTRACTORS = {
+    '.docx': _docx,
+    '.pdf': _pdf,
+    **dict.fromkeys(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.tif', '.tiff'), _image),
+}
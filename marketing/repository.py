@@ -0,0 +1,246 @@
+"""
+Direct pymongo reads for the hot job lists.
+
+The writer and process queues, the allocator's lists and the marketing job
+list are read straight from the ``marketing_job`` collection, fetching only
+the fields each page shows, instead of through Djongo's SQL translation.
+Documents come back as ``JobRow``: read-only, attribute-compatible with
+``Job`` for what the templates use (fields, ``pk``, ``get_*_display``,
+``attachment.url``, ``created_by.first_name``...). Related users are
+batch-loaded in one query per page.
+
+Writes keep going through the ORM (signals, counters and change markers
+depend on it): a row is not a model, and ``JobRow.instance()`` loads the
+real ``Job`` when one is needed.
+"""
+
+from datetime import timezone as dt_timezone
+
+from bson.decimal128 import Decimal128
+from django.db.models.fields.files import FieldFile
+
+from authentication.models import CustomUser
+from crm_project.mongo import get_collection
+from crm_project.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, KeysetPaginator, paginate_with
+
+from .models import Job
+
+USER_FIELDS = ('first_name', 'last_name', 'email', 'role')
+
+# Fields each list shows (besides ``id``).
+ALLOCATOR_FIELDS = (
+    'job_id', 'topic', 'word_count', 'amount', 'status', 'expected_deadline', 'strict_deadline',
+    'created_at', 'updated_at', 'allocated_at', 'late_since', 'overdue_since',
+    'created_by', 'allocated_to',
+)
+WRITER_FIELDS = (
+    'job_id', 'topic', 'instructions', 'completion_instructions', 'word_count', 'amount', 'status',
+    'referencing_style', 'writing_style', 'expected_deadline', 'late_since', 'overdue_since', 'allocated_to',
+)
+PROCESS_FIELDS = (
+    'job_id', 'topic', 'word_count', 'status', 'expected_deadline', 'process_assigned_at',
+    'late_since', 'overdue_since', 'process_user',
+)
+MARKETING_FIELDS = (
+    'job_id', 'topic', 'instructions', 'completion_instructions', 'attachment', 'word_count', 'amount',
+    'status', 'expected_deadline', 'strict_deadline', 'created_at', 'created_by',
+)
+
+
+class Row:
+    """
+    Read-only attribute view of a document's values.
+    """
+    __slots__ = ('_values',)
+
+    def __init__(self, values):
+        object.__setattr__(self, '_values', values)
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f'{type(self).__name__} has no {name!r} (not in the projection?)') from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is read-only; change the model through the ORM')
+
+    @property
+    def pk(self):
+        return self._values['id']
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.pk == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
+class UserRow(Row):
+    __slots__ = ()
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+
+class JobRow(Row):
+    __slots__ = ()
+
+    def _display(self, name):
+        value = getattr(self, name)
+        return dict(Job._meta.get_field(name).flatchoices).get(value, value)
+
+    def get_status_display(self):
+        return self._display('status')
+
+    def get_referencing_style_display(self):
+        return self._display('referencing_style')
+
+    def get_writing_style_display(self):
+        return self._display('writing_style')
+
+    is_late = Job.is_late
+    is_overdue = Job.is_overdue
+    time_remaining = Job.time_remaining
+    as_dict = Job.as_dict
+
+    def instance(self):
+        """
+        The ORM ``Job``, for writing.
+        """
+        return Job.objects.get(pk=self.pk)
+
+    def __repr__(self):
+        return f'<JobRow {self.pk}: {self._values.get("job_id")}>'
+
+
+def _column(name):
+    return Job._meta.get_field(name).column
+
+
+def _convert(field, value):
+    if value is None:
+        return None
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    if field.get_internal_type() == 'DateTimeField' and value.tzinfo is None:
+        return value.replace(tzinfo=dt_timezone.utc)
+    if field.get_internal_type() == 'FileField':
+        return FieldFile(None, field, value)
+    return value
+
+
+def _projection(fields):
+    return {'id': 1, **{_column(name): 1 for name in fields}}
+
+
+def _hydrate(docs, fields):
+    model_fields = [Job._meta.get_field(name) for name in fields]
+    rows = []
+    for doc in docs:
+        values = {'id': doc['id']}
+        for field in model_fields:
+            values[field.attname] = _convert(field, doc.get(field.column))
+        rows.append(values)
+    return rows
+
+
+def _attach_users(rows, fields):
+    """
+    Replace each ``<relation>_id`` in ``rows`` by a ``UserRow`` under the
+    relation's name, loading all of them in one query.
+    """
+    relations = [Job._meta.get_field(name) for name in fields if Job._meta.get_field(name).is_relation]
+    ids = {row[field.attname] for row in rows for field in relations} - {None}
+    users = {}
+    if ids:
+        meta = CustomUser._meta
+        columns = {name: meta.get_field(name).column for name in USER_FIELDS}
+        for doc in get_collection(CustomUser).find(
+            {'id': {'$in': list(ids)}}, {'id': 1, **{column: 1 for column in columns.values()}},
+        ):
+            users[doc['id']] = UserRow({'id': doc['id'], **{name: doc.get(column) for name, column in columns.items()}})
+    for row in rows:
+        for field in relations:
+            row[field.name] = users.get(row[field.attname])
+    return rows
+
+
+def find_jobs(match, fields, sort=None, limit=None):
+    """
+    ``JobRow``s for the jobs matching ``match`` (a MongoDB filter on column
+    names), with ``fields`` loaded and related users attached.
+    """
+    cursor = get_collection(Job).find(match, _projection(fields))
+    if sort:
+        cursor = cursor.sort([(_column(name), direction) for name, direction in sort])
+    if limit:
+        cursor = cursor.limit(limit)
+    return [JobRow(values) for values in _attach_users(_hydrate(cursor, fields), fields)]
+
+
+class JobKeysetPaginator(KeysetPaginator):
+    """
+    Keyset pagination over ``find_jobs``; cursors are interchangeable with
+    the queryset paginator's.
+    """
+
+    def __init__(self, match, fields, field='created_at', per_page=DEFAULT_PAGE_SIZE, descending=True):
+        self.match = match
+        self.fields = tuple(fields) if field in fields else tuple(fields) + (field,)
+        self.field = field
+        self.per_page = max(1, min(int(per_page), MAX_PAGE_SIZE))
+        self.descending = descending
+        self._model_field = Job._meta.get_field(field)
+
+    def rows(self, after, limit):
+        match = self.match
+        if after:
+            value, pk = after
+            op = '$lt' if self.descending else '$gt'
+            column = _column(self.field)
+            match = {'$and': [match, {'$or': [
+                {column: {op: value}},
+                {column: value, 'id': {op: pk}},
+            ]}]}
+        direction = -1 if self.descending else 1
+        return find_jobs(match, self.fields, sort=[(self.field, direction), ('id', direction)], limit=limit)
+
+
+def pending_allocation_page(request, param='pending_cursor'):
+    return paginate_with(request, JobKeysetPaginator(
+        {_column('status'): 'pending_allocation'}, ALLOCATOR_FIELDS), param)
+
+
+def allocated_page(request, param='allocated_cursor'):
+    return paginate_with(request, JobKeysetPaginator(
+        {_column('status'): {'$in': ['allocated', 'in_progress']}}, ALLOCATOR_FIELDS), param)
+
+
+def recently_completed(limit=10):
+    return find_jobs({_column('status'): 'completed'}, ALLOCATOR_FIELDS, sort=[('updated_at', -1)], limit=limit)
+
+
+def marketing_jobs_page(request, user, param='cursor'):
+    return paginate_with(request, JobKeysetPaginator({_column('created_by'): user.pk}, MARKETING_FIELDS), param)
+
+
+def writer_queue(writer, statuses=('allocated', 'in_progress', 'submitted')):
+    return find_jobs(
+        {_column('allocated_to'): writer.pk, _column('status'): {'$in': list(statuses)}},
+        WRITER_FIELDS, sort=[('status', 1), ('expected_deadline', 1)],
+    )
+
+
+def process_queue(process_user):
+    return find_jobs(
+        {_column('process_user'): process_user.pk, _column('status'): 'processing_queue'},
+        PROCESS_FIELDS, sort=[('expected_deadline', 1)],
+    )
+
+
+def process_recent(process_user, limit=10):
+    return find_jobs(
+        {_column('process_user'): process_user.pk, _column('status'): 'processing'},
+        PROCESS_FIELDS, sort=[('process_assigned_at', -1)], limit=limit,
+    )
@@ -0,0 +1,62 @@
+"""
+Job signals.
+
+The receivers keep the materialized dashboard counters (``marketing.counters``)
+in step with Job writes, and ``track_references`` does the same for the
+attachment's media blob reference count. Deadline crossings are passed on to
+the live dashboards (``marketing.live``).
+
+Before a save or delete the job's stored state is read back, so the write
+applies exactly the difference between the old and the new state - even
+when the sweeper flagged the job after this instance was loaded.
+``QuerySet.update()`` and raw pymongo writes bypass these signals; callers
+doing that apply the transitions themselves or leave it to
+``reconcile_counters``.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from crm_project.storage import track_references
+
+from . import counters, live
+from .models import Job
+
+# Sent by the deadline sweeper (marketing.deadlines) for each batch of jobs
+# that newly crossed a deadline: flag ('late_since' / 'overdue_since'),
+# job_pks and at.
+deadline_crossed = Signal()
+
+track_references(Job)
+
+
+@receiver(pre_save, sender=Job)
+@receiver(pre_delete, sender=Job)
+def load_counter_state(sender, instance, update_fields=None, **kwargs):
+    if not instance.pk or instance._state.adding:
+        instance._counter_snapshot = None
+        return
+    stored = counters.stored_snapshot(instance.pk)
+    instance._counter_snapshot = stored
+    # Job.save leaves the sweeper's flag out; the new state keeps the stored one.
+    if stored and update_fields is not None and 'overdue_since' not in update_fields:
+        instance.overdue_since = stored.overdue_since and counters._aware(stored.overdue_since)
+
+
+@receiver(post_save, sender=Job)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    old = None if created else instance._counter_snapshot
+    new = counters.snapshot(instance) or counters.stored_snapshot(instance.pk)
+    counters.apply_transitions([(old, new)])
+    instance._counter_snapshot = new
+
+
+@receiver(post_delete, sender=Job)
+def update_counters_on_delete(sender, instance, **kwargs):
+    counters.apply_transitions([(instance._counter_snapshot, None)])
+    instance._counter_snapshot = None
+
+
+@receiver(deadline_crossed)
+def publish_deadline_crossed(sender, flag, job_pks, **kwargs):
+    live.publish_deadlines(flag, job_pks)
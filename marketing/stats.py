@@ -0,0 +1,225 @@
+"""
+Dashboard counters computed in a single aggregation round trip.
+
+Each role dashboard used to fire one ``.count()`` per card, and every one of
+those went through Djongo's SQL translation. The functions here push all of a
+role's counters into one ``$match`` + ``$group`` pipeline on the job
+collection and return a small typed result the templates read like the old
+dicts (``stats.pending_count`` etc.).
+
+Normally that pipeline doesn't even run: the counters are kept materialized
+in ``marketing.counters`` and read as one document. The aggregation is the
+fallback for scopes whose counters document is missing or not yet seeded
+by a reconcile (see ``marketing.counters``).
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from crm_project.mongo import get_collection
+
+from .counters import read as read_counters
+from .models import Job
+
+OPEN_STATUSES = ['allocated', 'in_progress']
+
+
+@dataclass(frozen=True)
+class AllocatorStats:
+    pending_count: int = 0
+    # Jobs allocated today, whatever their status is now.
+    allocated_today: int = 0
+    # Active writers whose account is approved (the ones jobs can go to).
+    active_writers: int = 0
+    # Allocated or in-progress jobs the sweeper flagged past their strict
+    # deadline (marketing.deadlines).
+    overdue_count: int = 0
+
+
+@dataclass(frozen=True)
+class WriterStats:
+    assigned_count: int = 0
+    in_progress: int = 0
+    completed: int = 0
+    # placeholder until there is a reviews model
+    rating: float = 4.8
+
+
+@dataclass(frozen=True)
+class ProcessStats:
+    in_queue: int = 0
+    completed_today: int = 0
+
+
+@dataclass(frozen=True)
+class MarketingStats:
+    total: int = 0
+    completed: int = 0
+
+    @property
+    def pending(self):
+        return self.total - self.completed
+
+    @property
+    def success_rate(self):
+        return round((self.completed / self.total) * 100) if self.total else 0
+
+
+def _today_bounds(now):
+    start = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
+
+
+def _counter(doc, name):
+    # Drift can push an incrementally maintained counter below zero until the
+    # next reconcile; never show that.
+    return max(0, int(doc.get(name, 0)))
+
+
+def _dated_counter(doc, name, now):
+    day = timezone.localtime(now).date().isoformat()
+    return max(0, int(doc.get(name, {}).get(day, 0)))
+
+
+def _field(name):
+    return '$' + Job._meta.get_field(name).column
+
+
+def _is(field, value):
+    return {'$eq': [_field(field), value]}
+
+
+def _is_in(field, values):
+    return {'$in': [_field(field), values]}
+
+
+def _between(field, start, end):
+    return {'$and': [{'$gte': [_field(field), start]}, {'$lt': [_field(field), end]}]}
+
+
+def _is_set(field):
+    # In expressions null (and missing) sorts below every date.
+    return {'$gt': [_field(field), None]}
+
+
+def _count_where(match, counters):
+    """
+    Run one pipeline over the jobs selected by ``match`` and return
+    ``{name: count}`` for every ``{name: condition}`` in ``counters``.
+    """
+    group = {'_id': None}
+    for name, condition in counters.items():
+        group[name] = {'$sum': {'$cond': [condition, 1, 0]}}
+
+    rows = list(get_collection(Job).aggregate([{'$match': match}, {'$group': group}]))
+    row = rows[0] if rows else {}
+    return {name: int(row.get(name, 0)) for name in counters}
+
+
+def _allocator_counts(now):
+    start, end = _today_bounds(now)
+    status = Job._meta.get_field('status').column
+    allocated_at = Job._meta.get_field('allocated_at').column
+    overdue_since = Job._meta.get_field('overdue_since').column
+
+    return _count_where(
+        # Each branch can use its own index (status / allocated_at).
+        {'$or': [
+            {status: 'pending_allocation'},
+            {allocated_at: {'$gte': start, '$lt': end}},
+            {status: {'$in': OPEN_STATUSES}, overdue_since: {'$type': 'date'}},
+        ]},
+        {
+            'pending_count': _is('status', 'pending_allocation'),
+            'allocated_today': _between('allocated_at', start, end),
+            'overdue_count': {'$and': [_is_in('status', OPEN_STATUSES), _is_set('overdue_since')]},
+        },
+    )
+
+
+def allocator_stats(now=None):
+    """
+    The allocator dashboard's cards, from the ``allocator`` counters when
+    they exist. These keep dashboard_view's definitions; the unrouted
+    marketing.views.allocator_dashboard used to count all active writers,
+    only still-open jobs allocated today and expected_deadline as overdue.
+    """
+    now = now or timezone.now()
+    doc = read_counters('allocator')
+    if doc is None:
+        counts = _allocator_counts(now)
+    else:
+        counts = {
+            'pending_count': _counter(doc, 'pending_count'),
+            'allocated_today': _dated_counter(doc, 'allocated_on', now),
+            'overdue_count': _counter(doc, 'overdue_count'),
+        }
+    active_writers = CustomUser.objects.filter(
+        role='writer',
+        is_active=True,
+        approval_status='approved'
+    ).count()
+    return AllocatorStats(active_writers=active_writers, **counts)
+
+
+def writer_stats(user):
+    doc = read_counters(f'writer:{user.pk}')
+    if doc is not None:
+        return WriterStats(**{name: _counter(doc, name) for name in ('assigned_count', 'in_progress', 'completed')})
+
+    counts = _count_where(
+        {
+            Job._meta.get_field('allocated_to').column: user.pk,
+            Job._meta.get_field('status').column: {'$in': OPEN_STATUSES + ['submitted', 'completed']},
+        },
+        {
+            'assigned_count': _is_in('status', OPEN_STATUSES),
+            'in_progress': _is('status', 'in_progress'),
+            'completed': _is_in('status', ['submitted', 'completed']),
+        },
+    )
+    return WriterStats(**counts)
+
+
+def process_stats(user, now=None):
+    now = now or timezone.now()
+    doc = read_counters(f'process:{user.pk}')
+    if doc is not None:
+        return ProcessStats(
+            in_queue=_counter(doc, 'in_queue'),
+            completed_today=_dated_counter(doc, 'completed_on', now),
+        )
+
+    start, end = _today_bounds(now)
+    counts = _count_where(
+        {
+            Job._meta.get_field('process_user').column: user.pk,
+            Job._meta.get_field('status').column: {'$in': ['processing_queue', 'completed']},
+        },
+        {
+            'in_queue': _is('status', 'processing_queue'),
+            'completed_today': {'$and': [
+                _is('status', 'completed'),
+                _between('process_assigned_at', start, end),
+            ]},
+        },
+    )
+    return ProcessStats(**counts)
+
+
+def marketing_stats(user):
+    doc = read_counters(f'marketing:{user.pk}')
+    if doc is not None:
+        return MarketingStats(total=_counter(doc, 'total'), completed=_counter(doc, 'completed'))
+
+    counts = _count_where(
+        {Job._meta.get_field('created_by').column: user.pk},
+        {
+            'total': {'$literal': True},
+            'completed': _is('status', 'completed'),
+        },
+    )
+    return MarketingStats(**counts)
@@ -0,0 +1,16 @@
+from tasks.queue import task
+
+from . import previews
+
+
+@task
+def extract_preview(job_pk):
+    """
+    Extract the attachment preview of job ``job_pk`` (marketing.previews).
+    """
+    try:
+        previews.extract_job(job_pk)
+    except Exception:
+        # Shown as failed meanwhile; a retry that succeeds overwrites it.
+        previews._store(job_pk, {'preview_status': 'failed'})
+        raise
@@ -1,3 +1,75 @@
-from django.test import TestCase
+import unittest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from authentication.models import CustomUser
+from monitoring.standin import StandInTestCase
+
+from . import counters, stats
+from .models import Job
+from .repository import JobRow
+
+
+class CounterRebuildTests(StandInTestCase):
+    """
+    Materialized counters: only trusted once a rebuild has seeded them, and a
+    rebuild never loses an increment made while it was recounting.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.marketer = CustomUser.objects.create_user(
+            username='marketer@example.com', email='marketer@example.com', password='pass12345',
+            role='marketing', approval_status='approved', is_active=True,
+        )
+
+    def make_job(self, job_id):
+        return Job.objects.create(
+            job_id=job_id, instructions='Write it', created_by=self.marketer, status='pending_allocation',
+        )
+
+    def test_unseeded_counters_fall_back_to_aggregation(self):
+        scope = f'marketing:{self.marketer.pk}'
+        self.make_job('PENDING-1')
+        # Upserted by the first increment, missing the jobs from before it.
+        counters._collection().update_one({'_id': scope}, {'$set': {'total': 0}})
+
+        self.assertIsNone(counters.read(scope))
+        self.assertEqual(stats.marketing_stats(self.marketer).total, 1)
+
+        counters.rebuild()
+        self.assertEqual(counters.read(scope)['total'], 1)
+        self.assertEqual(stats.marketing_stats(self.marketer).total, 1)
+
+    def test_rebuild_keeps_increments_made_meanwhile(self):
+        self.make_job('PENDING-1')
+        self.make_job('PENDING-2')
+        recount = counters._recount
+        calls = []
+
+        def recount_then_create(*args, **kwargs):
+            computed = recount(*args, **kwargs)
+            if not calls:
+                self.make_job('PENDING-3')
+            calls.append(args)
+            return computed
+
+        with mock.patch.object(counters, '_recount', recount_then_create):
+            counters.rebuild()
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(counters.read('allocator')['pending_count'], 3)
+        self.assertEqual(counters.rebuild(dry_run=True), {})
+
+
+class TimeRemainingTests(unittest.TestCase):
+
+    def test_counts_from_the_given_time(self):
+        now = datetime(2024, 5, 1, 12, tzinfo=dt_timezone.utc)
+        deadline = now + timedelta(days=2, hours=5, minutes=30)
+        job = Job(status='allocated', expected_deadline=deadline)
+        row = JobRow({'status': 'allocated', 'expected_deadline': deadline, 'overdue_since': None})
+
+        self.assertEqual(job.time_remaining(now), '2d 5h')
+        self.assertEqual(row.time_remaining(now), '2d 5h')
+        self.assertEqual(job.time_remaining(deadline + timedelta(minutes=1)), 'N/A')
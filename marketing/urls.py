@@ -3,8 +3,9 @@ from . import views
 
 urlpatterns = [
     path('job-drop/', views.job_drop_view, name='job_drop'),
-    # accept hyphens, letters and digits for your custom string job_id like "JOB-2024-001"
-    path('job-completion/<slug:job_id>/', views.job_completion_view, name='job_completion'),
-    path('job-edit/<int:job_id>/', views.job_edit_view, name='job_edit'),
+    path('job-completion/<int:pk>/', views.job_completion_view, name='job_completion'),
+    path('job-edit/<int:pk>/', views.job_edit_view, name='job_edit'),
     path('jobs/', views.job_list_view, name='job_list'),
+    path('jobs/json/', views.job_list_json, name='job_list_json'),
+    path('jobs/<int:pk>/attachment/', views.attachment_download, name='job_attachment'),
 ]
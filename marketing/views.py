@@ -3,48 +3,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db import IntegrityError
-from django.http import Http404
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_safe
 
+from . import previews, repository
 from .models import Job
 from .forms import JobDropForm, JobCompletionForm
+from .stats import MarketingStats, allocator_stats, marketing_stats
 from authentication.models import CustomUser
-
-
-def _dedupe_jobs(qs):
-    """
-    Return a list of jobs deduped by job_id, keeping the most recent created_at.
-    Safe for Djongo because we dedupe in Python, not via SQL/aggregation.
-    """
-    latest_by_id = {}
-    for j in qs:
-        current = latest_by_id.get(j.job_id)
-        if current is None:
-            latest_by_id[j.job_id] = j
-        else:
-            cur_ts = getattr(current, "created_at", None)
-            new_ts = getattr(j, "created_at", None)
-            if cur_ts is None or (new_ts and new_ts > cur_ts):
-                latest_by_id[j.job_id] = j
-
-    # Sort by created_at desc, fallback to now if missing
-    def _key(obj):
-        return getattr(obj, "created_at", timezone.now())
-    return sorted(latest_by_id.values(), key=_key, reverse=True)
-
-def _compute_stats(jobs):
-    """
-    Build dashboard counters from a deduped jobs list.
-    """
-    total = len(jobs)
-    completed = sum(1 for j in jobs if j.status == "completed")
-    pending = total - completed
-    success_rate = round((completed / total) * 100) if total else 0
-    return {
-        "total": total,
-        "completed": completed,
-        "pending": pending,
-        "success_rate": success_rate,
-    }
+from crm_project import downloads
+from crm_project.downloads import can_access_job_files
+from crm_project.pagination import DEFAULT_PAGE_SIZE, InvalidCursor, KeysetPaginator
+from crm_project.uploads import upload_errors
 
 
 @login_required
@@ -57,12 +28,10 @@ def marketing_dashboard(request):
         return redirect('dashboard')
 
     try:
-        base_qs = Job.objects.filter(created_by=request.user).order_by('-created_at')
-        jobs = _dedupe_jobs(base_qs)
+        stats = marketing_stats(request.user)
     except Exception:
-        jobs = []
+        stats = MarketingStats()
 
-    stats = _compute_stats(jobs)
     return render(request, 'marketing/marketing_dashboard.html', {"stats": stats})
 
 
@@ -76,19 +45,21 @@ def job_drop_view(request):
         return redirect('dashboard')
 
     if request.method == 'POST':
-        form = JobDropForm(request.POST, request.FILES)
+        form = JobDropForm(request.POST, request.FILES, upload_errors=upload_errors(request))
         if form.is_valid():
             try:
                 job = form.save(commit=False)
                 job.created_by = request.user
                 job.status = 'pending_completion'
                 job.save()
+                if job.attachment:
+                    previews.schedule(job)
 
                 messages.success(
                     request,
                     f'Job {job.job_id} created successfully! Please complete the job details.'
                 )
-                return redirect('job_completion', job_id=job.job_id)
+                return redirect('job_completion', pk=job.pk)
 
             except IntegrityError:
                 messages.error(
@@ -102,12 +73,7 @@ def job_drop_view(request):
     else:
         form = JobDropForm()
 
-    # Load and de-duplicate jobs for this user
-    try:
-        base_qs = Job.objects.filter(created_by=request.user).order_by('-created_at')
-        jobs = _dedupe_jobs(base_qs)
-    except Exception:
-        jobs = []
+    jobs = Job.objects.filter(created_by=request.user).order_by('-created_at')
 
     context = {
         'form': form,
@@ -117,42 +83,15 @@ def job_drop_view(request):
 
 
 @login_required
-def job_completion_view(request, job_id):
+def job_completion_view(request, pk):
     """
     Job completion form to add detailed information.
-    Djongo-safe filtering and duplicate handling for same job_id.
     """
     if request.user.role != 'marketing':
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('dashboard')
 
-    # Djongo-safe: avoid .exists()/.count(); use slice-to-list
-    try:
-        candidates = list(
-            Job.objects.filter(job_id=job_id, created_by=request.user).order_by('-created_at')[:20]
-        )
-    except Exception as e:
-        # If the driver itself fails, show 404-like behavior
-        raise Http404("Unable to load job records.") from e
-
-    if not candidates:
-        raise Http404("Job not found.")
-
-    # Prefer a pending/draft record if present, else the newest
-    job = None
-    for c in candidates:
-        if c.status in ('pending_completion', 'draft'):
-            job = c
-            break
-    if job is None:
-        job = candidates[0]
-
-    # Warn if we detect duplicates for same job_id
-    if len(candidates) > 1:
-        messages.warning(
-            request,
-            'Multiple records found with the same Job ID. Using the latest pending/draft one.'
-        )
+    job = get_object_or_404(Job, pk=pk, created_by=request.user)
 
     if job.status not in ['pending_completion', 'draft']:
         messages.warning(request, 'This job has already been completed.')
@@ -188,7 +127,7 @@ def job_completion_view(request, job_id):
 
 
 @login_required
-def job_edit_view(request, job_id):
+def job_edit_view(request, pk):
     """
     Edit job drop details (only if not yet allocated)
     """
@@ -196,17 +135,19 @@ def job_edit_view(request, job_id):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('dashboard')
 
-    job = get_object_or_404(Job, id=job_id, created_by=request.user)
+    job = get_object_or_404(Job, pk=pk, created_by=request.user)
 
     if job.status in ['allocated', 'in_progress', 'submitted', 'completed']:
         messages.warning(request, 'Cannot edit job that has been allocated or completed.')
         return redirect('job_drop')
 
     if request.method == 'POST':
-        form = JobDropForm(request.POST, request.FILES, instance=job)
+        form = JobDropForm(request.POST, request.FILES, instance=job, upload_errors=upload_errors(request))
         if form.is_valid():
             try:
                 job = form.save()
+                if 'attachment' in form.changed_data and job.attachment:
+                    previews.schedule(job)
                 messages.success(request, f'Job {job.job_id} updated successfully!')
                 return redirect('job_drop')
             except Exception as e:
@@ -216,12 +157,7 @@ def job_edit_view(request, job_id):
     else:
         form = JobDropForm(instance=job)
 
-    # Sidebar jobs, deduped
-    try:
-        base_qs = Job.objects.filter(created_by=request.user).order_by('-created_at')
-        jobs = _dedupe_jobs(base_qs)
-    except Exception:
-        jobs = []
+    jobs = Job.objects.filter(created_by=request.user).order_by('-created_at')
 
     context = {
         'form': form,
@@ -235,50 +171,62 @@ def job_edit_view(request, job_id):
 @login_required
 def job_list_view(request):
     """
-    View all jobs created by marketing user (deduped by job_id)
+    View all jobs created by marketing user
     """
     if request.user.role != 'marketing':
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('dashboard')
 
     try:
-        base_qs = Job.objects.filter(created_by=request.user).order_by('-created_at')
-        jobs = _dedupe_jobs(base_qs)
+        jobs = repository.marketing_jobs_page(request, request.user)
+        stats = marketing_stats(request.user)
     except Exception:
         jobs = []
+        stats = MarketingStats()
         messages.warning(request, 'Unable to load jobs at this time.')
 
-    # NEW: build stats for the header cards
-    stats = _compute_stats(jobs)
-
-    # NEW: pass stats to the template
     context = {'jobs': jobs, 'stats': stats}
     return render(request, 'marketing/job_list.html', context)
 
+
+@login_required
+def job_list_json(request):
+    """
+    JSON variant of the job list: one keyset page per request.
+    Pass ?cursor=<next_cursor> to fetch the following page.
+    """
+    if request.user.role != 'marketing':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    try:
+        per_page = int(request.GET.get('per_page', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid per_page'}, status=400)
+
+    paginator = KeysetPaginator(Job.objects.filter(created_by=request.user), per_page=per_page)
+    try:
+        page = paginator.page(request.GET.get('cursor') or None)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    return JsonResponse({
+        'results': [job.as_dict() for job in page],
+        'next_cursor': page.next_cursor,
+    })
+
 @login_required
 def allocator_dashboard(request):
     if request.user.role not in ("allocator", "admin", "manager"):
         messages.error(request, "You do not have permission to view this page.")
         return redirect("dashboard")
 
-    pending_jobs = Job.objects.filter(status="pending_allocation").order_by("-created_at")
-    allocated_jobs = Job.objects.filter(status__in=["allocated", "in_progress"]).order_by("-allocated_at")
+    pending_jobs = repository.pending_allocation_page(request)
+    allocated_jobs = repository.allocated_page(request)
 
     writers = CustomUser.objects.filter(role="writer", is_active=True).order_by("first_name", "last_name")
     process_users = CustomUser.objects.filter(role="process", is_active=True).order_by("first_name", "last_name")
 
-    stats = {
-        "pending_count": pending_jobs.count(),
-        "allocated_today": Job.objects.filter(
-            status__in=["allocated", "in_progress"],
-            allocated_at__date=timezone.now().date()
-        ).count(),
-        "active_writers": writers.count(),
-        "overdue_count": Job.objects.filter(
-            status__in=["allocated", "in_progress"],
-            expected_deadline__lt=timezone.now()
-        ).count(),
-    }
+    stats = allocator_stats()
 
     return render(request, "dashboard/allocator_dashboard.html", {
         "pending_jobs": pending_jobs,
@@ -287,3 +235,19 @@ def allocator_dashboard(request):
         "process_users": process_users,
         "stats": stats,
     })
+
+
+@login_required
+@require_safe
+def attachment_download(request, pk):
+    """
+    The job's attachment, for staff and the job's marketer, writer and
+    process user.
+    """
+    job = get_object_or_404(Job.objects.only(
+        'attachment', 'created_by', 'allocated_to', 'process_user'), pk=pk)
+    if not can_access_job_files(request.user, job):
+        raise PermissionDenied
+    if not job.attachment:
+        raise Http404('This job has no attachment.')
+    return downloads.serve(request, job.attachment.name)
@@ -0,0 +1,28 @@
+from django.apps import AppConfig
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+    verbose_name = 'Monitoring'
+
+    def ready(self):
+        # Must happen before Djongo creates its MongoClient (lazily, on the
+        # first query): pymongo only attaches global listeners to new clients.
+        from pymongo import monitoring
+        from .mongo_commands import command_listener
+        from .pool import pool_listener
+        monitoring.register(pool_listener)
+        monitoring.register(command_listener)
+
+        from .metrics import instrument_queries, instrument_templates
+        instrument_queries()
+        instrument_templates()
+
+        # Djongo is patched from here: the parse cache, and the profiler when on.
+        from crm_project.statement_cache import install
+        install()
+
+        from django.conf import settings
+        if settings.DJONGO_PROFILE:
+            from . import djongo_profile
+            djongo_profile.install()
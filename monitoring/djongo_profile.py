@@ -0,0 +1,195 @@
+"""
+Split the cost of each ORM query between Djongo and MongoDB.
+
+Every query goes through Djongo's ``Query``: the constructor parses the SQL
+with sqlparse and converts it to a find / aggregate (running INSERT / UPDATE
+/ DELETE on the spot), and iterating it pulls the results. ``install()``
+wraps both and subtracts the server round-trip time pymongo reports for the
+commands sent meanwhile, giving each query
+
+- ``translate``: SQL parsing and conversion, in Python;
+- ``server``: MongoDB round trips;
+- ``fetch``: iterating the results minus the round trips (BSON decoding,
+  Djongo's row alignment).
+
+Queries slower than DJONGO_SLOW_QUERY_MS are logged with their call site and
+the commands actually sent. Inside ``profile()`` (which QueryProfileMiddleware
+opens around each request) queries are also collected per request.
+Enable with DJONGO_PROFILE=1; it adds a stack walk to every query.
+"""
+
+import contextvars
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List
+
+from bson import json_util
+from django.conf import settings
+
+from .mongo_commands import command_listener
+
+logger = logging.getLogger(__name__)
+
+# RequestProfiles collecting queries (see ``profile``).
+_requests = contextvars.ContextVar('profiled_requests', default=())
+
+_HERE = os.path.dirname(__file__)
+
+
+@dataclass
+class QueryProfile:
+    sql: str
+    params: tuple
+    caller: str
+    translate: float = 0.0
+    server: float = 0.0
+    fetch: float = 0.0
+    commands: List[dict] = field(default_factory=list)
+    finished: bool = False
+
+    @property
+    def total(self):
+        return self.translate + self.server + self.fetch
+
+
+@dataclass
+class RequestProfile:
+    queries: List[QueryProfile] = field(default_factory=list)
+
+    def totals(self):
+        return {
+            'queries': len(self.queries),
+            'translate': sum(q.translate for q in self.queries),
+            'server': sum(q.server for q in self.queries),
+            'fetch': sum(q.fetch for q in self.queries),
+        }
+
+    def by_call_site(self):
+        """
+        ``[(caller, sql, count, translate, server, fetch)]``, costliest first.
+        """
+        groups = {}
+        for q in self.queries:
+            group = groups.setdefault((q.caller, q.sql), [0, 0.0, 0.0, 0.0])
+            group[0] += 1
+            group[1] += q.translate
+            group[2] += q.server
+            group[3] += q.fetch
+        rows = [key + tuple(values) for key, values in groups.items()]
+        return sorted(rows, key=lambda row: -(row[3] + row[4] + row[5]))
+
+
+@contextmanager
+def profile():
+    """
+    Collect the profiles of the queries run in the block, including on
+    other threads in a copy of its context (crm_project.parallel).
+    """
+    request_profile = RequestProfile()
+    token = _requests.set(_requests.get() + (request_profile,))
+    try:
+        yield request_profile
+    finally:
+        _requests.reset(token)
+
+
+def _caller():
+    project = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(project) and not filename.startswith(_HERE)
+                and 'site-packages' not in filename):
+            return f'{os.path.relpath(filename, project)}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return '?'
+
+
+def _command_summary(commands, limit=2000):
+    shown = []
+    for command in commands:
+        shown.append({key: value for key, value in command.items()
+                      if key not in ('lsid', '$db', '$clusterTime', '$readPreference')})
+    text = json_util.dumps(shown, default=str)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+def _finish(query_profile):
+    if query_profile.finished:
+        return
+    query_profile.finished = True
+    if query_profile.total * 1000 >= settings.DJONGO_SLOW_QUERY_MS:
+        logger.warning(
+            'Slow query %.1f ms (translate %.1f, server %.1f, fetch %.1f) at %s\nSQL: %s\nParams: %r\nMongo: %s',
+            query_profile.total * 1000, query_profile.translate * 1000, query_profile.server * 1000,
+            query_profile.fetch * 1000, query_profile.caller, query_profile.sql, query_profile.params,
+            _command_summary(query_profile.commands),
+        )
+
+
+def install():
+    """
+    Wrap Djongo's Query. Safe to call more than once.
+    """
+    from djongo.sql2mongo.query import Query, SelectQuery
+
+    if getattr(Query, '_profiled', False):
+        return
+    original_init, original_iter = Query.__init__, Query.__iter__
+    original_get_cursor = SelectQuery._get_cursor
+
+    def __init__(self, client_connection, db_connection, connection_properties, sql, params):
+        query_profile = QueryProfile(sql, tuple(params or ()), _caller())
+        self._profile = query_profile
+        with command_listener.capture(keep_commands=True) as tally:
+            started = time.perf_counter()
+            try:
+                original_init(self, client_connection, db_connection, connection_properties, sql, params)
+            finally:
+                query_profile.server += tally.seconds
+                query_profile.translate += time.perf_counter() - started - tally.seconds
+                query_profile.commands.extend(tally.commands)
+                for request_profile in _requests.get():
+                    request_profile.queries.append(query_profile)
+        if not hasattr(self._query, '_get_cursor'):
+            # Not a SELECT: it has already run.
+            _finish(query_profile)
+
+    def __iter__(self):
+        query_profile = self._profile
+        rows = original_iter(self)
+        try:
+            while True:
+                with command_listener.capture(keep_commands=True) as tally:
+                    started = time.perf_counter()
+                    try:
+                        row = next(rows)
+                    except StopIteration:
+                        return
+                    finally:
+                        # The first step also builds the find / pipeline.
+                        built = getattr(self._query, '__dict__', {}).pop('_build_seconds', 0.0)
+                        query_profile.server += tally.seconds
+                        query_profile.translate += built
+                        query_profile.fetch += time.perf_counter() - started - tally.seconds - built
+                        query_profile.commands.extend(tally.commands)
+                yield row
+        finally:
+            _finish(query_profile)
+
+    def _get_cursor(self):
+        # aggregate() runs its first batch right away, find() lazily.
+        with command_listener.capture() as tally:
+            started = time.perf_counter()
+            cursor = original_get_cursor(self)
+            self._build_seconds = time.perf_counter() - started - tally.seconds
+        return cursor
+
+    Query.__init__ = __init__
+    Query.__iter__ = __iter__
+    SelectQuery._get_cursor = _get_cursor
+    Query._profiled = True
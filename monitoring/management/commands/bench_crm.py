@@ -0,0 +1,131 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from authentication.models import CustomUser
+from marketing.models import Job
+from monitoring import seeding
+from monitoring.mongo_commands import command_listener
+from monitoring.pool import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot views - the dashboard of every role, the writer and "
+        "process dashboards, the marketing job list, single-job allocation and the assignee typeahead - and report "
+        "latency percentiles with the SQL (Djongo) and MongoDB commands each "
+        "request issued. Expects data from `manage.py seed_crm`, or use "
+        "--stand-in to seed and benchmark an in-memory mongomock database. "
+        "The allocation case allocates real pending jobs; skip it with "
+        "--read-only on data you care about."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per case (default 50).')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per case first (default 3).')
+        parser.add_argument('--only', action='append', metavar='CASE',
+                            help='Run only the named case (repeatable), e.g. dashboard:writer or typeahead.')
+        parser.add_argument('--read-only', action='store_true', help='Skip the allocation case.')
+        parser.add_argument('--stand-in', action='store_true',
+                            help='Seed an in-memory mongomock database and benchmark that.')
+        parser.add_argument('--seed-users', type=int, default=200, help='Users to seed with --stand-in (default 200).')
+        parser.add_argument('--seed-jobs', type=int, default=2000, help='Jobs to seed with --stand-in (default 2000).')
+
+    def handle(self, *args, **options):
+        if options['stand_in']:
+            call_command('seed_crm', stand_in=True, users=options['seed_users'], jobs=options['seed_jobs'],
+                         stdout=self.stderr)
+        self.stand_in = options['stand_in']
+
+        cases = list(self.cases(options))
+        if options['only']:
+            cases = [case for case in cases if case[0] in options['only']]
+        if not cases:
+            raise CommandError('Nothing to benchmark; seed some data with `manage.py seed_crm` first.')
+
+        self.stdout.write(f"{'case':<24}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+                          f"{'sql/req':>10}{'mongo/req':>11}")
+        for name, user, requests in cases:
+            self.report(name, self.run(user, requests, options))
+
+    def cases(self, options):
+        """
+        ``(name, user, request factory)`` per benchmark case; the factory
+        takes the client and the request number.
+        """
+        total = options['warmup'] + options['requests']
+        dashboard = reverse('dashboard')
+        for role, _ in CustomUser.ROLE_CHOICES:
+            user = seeding.representative(role)
+            if user:
+                yield f'dashboard:{role}', user, lambda client, n: client.get(dashboard)
+
+        # The writer and process lanes have their own, busier, dashboards.
+        for role, url_name in (('writer', 'writer_dashboard'), ('process', 'process_dashboard')):
+            user = seeding.representative(role)
+            if user:
+                path = reverse(url_name)
+                yield url_name, user, lambda client, n, path=path: client.get(path)
+
+        marketing = seeding.representative('marketing')
+        if marketing:
+            job_list = reverse('job_list')
+            yield 'job_list', marketing, lambda client, n: client.get(job_list)
+
+        allocator = seeding.representative('allocator')
+        if not allocator:
+            return
+        typeahead = reverse('allocate:get_assignees')
+        prefixes = sorted({name[:2] for name in seeding.FIRST_NAMES}) + ['']
+        yield 'typeahead', allocator, lambda client, n: client.get(
+            typeahead, {'type': 'writer', 'q': prefixes[n % len(prefixes)]})
+
+        writer = seeding.representative('writer')
+        if options['read_only'] or not writer:
+            return
+        pending = list(Job.objects.filter(status='pending_allocation')
+                       .order_by('id').values_list('id', flat=True)[:total])
+        if len(pending) < total:
+            self.stderr.write(f'Skipping allocate_job: needs {total} pending jobs, found {len(pending)}.')
+            return
+        yield 'allocate_job', allocator, lambda client, n: client.post(
+            reverse('allocate:allocate_job', args=[pending[n]]),
+            {'assignee_type': 'writer', 'assignee_id': writer.pk})
+
+    def run(self, user, make_request, options):
+        # Report a view that blows up as a 500 rather than aborting the run.
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        for n in range(options['warmup']):
+            make_request(client, n)
+
+        latencies, sql, mongo, statuses = [], 0, 0, set()
+        connection = connections['default']
+        for n in range(options['warmup'], options['warmup'] + options['requests']):
+            with CaptureQueriesContext(connection) as queries, command_listener.capture() as commands:
+                started = time.perf_counter()
+                response = make_request(client, n)
+                latencies.append((time.perf_counter() - started) * 1000)
+            sql += len(queries)
+            mongo += sum(commands.values())
+            statuses.add(response.status_code)
+        return latencies, sql, mongo, statuses
+
+    def report(self, name, result):
+        latencies, sql, mongo, statuses = result
+        n = len(latencies)
+        # mongomock never reaches pymongo's monitoring hooks, so there are
+        # no command counts to show against the stand-in.
+        mongo = '-' if self.stand_in else f'{mongo / n:.1f}'
+        line = (f'{name:<24}{n:>5}'
+                + ''.join(f'{percentile(latencies, pct):>10.1f}' for pct in (50, 95, 99))
+                + f'{sql / n:>10.1f}{mongo:>11}')
+        other = sorted(statuses - {200})
+        if other:
+            line += f'  (HTTP {", ".join(map(str, other))})'
+        self.stdout.write(line)
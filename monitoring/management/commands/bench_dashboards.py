@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncRequestFactory, RequestFactory
+
+from crm_project import parallel
+from dashboard import views as dashboard_views
+from monitoring import seeding, standin
+from monitoring.pool import percentile
+from process import views as process_views
+from writer import views as writer_views
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync dashboards, which run their reads one after "
+        "another, with the async variants served under ASGI "
+        "(ASYNC_DASHBOARDS), which run them concurrently. Also times each "
+        "read on its own: the async page should approach the slowest read, "
+        "the sync one their sum. Expects data from `manage.py seed_crm`, or "
+        "use --stand-in (with --latency to stand for the network)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per case and mode (default 20).')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per case first (default 2).')
+        parser.add_argument('--stand-in', action='store_true',
+                            help='Seed an in-memory mongomock database and benchmark that.')
+        parser.add_argument('--seed-users', type=int, default=200, help='Users to seed with --stand-in (default 200).')
+        parser.add_argument('--seed-jobs', type=int, default=2000, help='Jobs to seed with --stand-in (default 2000).')
+        parser.add_argument('--latency', type=float, default=0, metavar='MS',
+                            help='With --stand-in, delay every MongoDB operation by MS milliseconds.')
+
+    def handle(self, *args, **options):
+        if options['stand_in']:
+            call_command('seed_crm', stand_in=True, users=options['seed_users'], jobs=options['seed_jobs'],
+                         stdout=self.stderr)
+            if options['latency']:
+                standin.simulate_latency(options['latency'])
+        elif options['latency']:
+            raise CommandError('--latency only applies to --stand-in.')
+
+        cases = list(self.cases())
+        if not cases:
+            raise CommandError('Nothing to benchmark; seed some data with `manage.py seed_crm` first.')
+
+        self.stdout.write(f"{'case':<20}{'reads':>6}{'sync p50':>10}{'async p50':>11}{'speedup':>9}"
+                          f"{'sum p50':>9}{'max p50':>9}  (ms)")
+        for name, user, sync_view, async_view, loaders in cases:
+            self.report(name, user, sync_view, async_view, loaders, options)
+
+    def cases(self):
+        """
+        ``(name, user, sync view, async view, loaders(request, user))`` per
+        dashboard.
+        """
+        for role in ('allocator', 'admin'):
+            user = seeding.representative(role)
+            if user:
+                yield (f'dashboard:{role}', user, dashboard_views.dashboard_view,
+                       dashboard_views.dashboard_async_view, dashboard_views._dashboard_loaders)
+        user = seeding.representative('writer')
+        if user:
+            yield ('writer_dashboard', user, writer_views.writer_dashboard, writer_views.writer_dashboard_async,
+                   lambda request, user: writer_views._writer_loaders(user))
+        user = seeding.representative('process')
+        if user:
+            yield ('process_dashboard', user, process_views.process_dashboard,
+                   process_views.process_dashboard_async, lambda request, user: process_views._process_loaders(user))
+
+    def request(self, factory, user):
+        request = factory.get('/')
+        request.user = user
+        request.session = SessionBase()
+        return request
+
+    def report(self, name, user, sync_view, async_view, loaders, options):
+        sync_factory, async_factory = RequestFactory(), AsyncRequestFactory()
+        total = options['warmup'] + options['requests']
+        sync_ms, async_ms, sum_ms, max_ms, statuses = [], [], [], [], set()
+        for n in range(total):
+            request = self.request(sync_factory, user)
+            started = time.perf_counter()
+            statuses.add(sync_view(request).status_code)
+            elapsed = time.perf_counter() - started
+
+            request = self.request(async_factory, user)
+            started = time.perf_counter()
+            statuses.add(asyncio.run(async_view(request)).status_code)
+            async_elapsed = time.perf_counter() - started
+
+            reads = []
+            for loader in loaders(self.request(sync_factory, user), user).values():
+                started = time.perf_counter()
+                parallel.load({'read': loader})
+                reads.append(time.perf_counter() - started)
+
+            if n >= options['warmup']:
+                sync_ms.append(elapsed * 1000)
+                async_ms.append(async_elapsed * 1000)
+                sum_ms.append(sum(reads) * 1000)
+                max_ms.append(max(reads, default=0) * 1000)
+
+        sync_p50, async_p50 = percentile(sync_ms, 50), percentile(async_ms, 50)
+        line = (f'{name:<20}{len(reads):>6}{sync_p50:>10.1f}{async_p50:>11.1f}'
+                f'{sync_p50 / async_p50 if async_p50 else 0:>8.1f}x'
+                f'{percentile(sum_ms, 50):>9.1f}{percentile(max_ms, 50):>9.1f}')
+        other = sorted(statuses - {200})
+        if other:
+            line += f'  (HTTP {", ".join(map(str, other))})'
+        self.stdout.write(line)
@@ -0,0 +1,97 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from authentication.models import CustomUser
+from crm_project.pagination import paginate
+from marketing import repository
+from marketing.models import Job
+from monitoring.pool import percentile
+
+
+def _writer(user):
+    return list(Job.objects.filter(
+        allocated_to=user, status__in=['allocated', 'in_progress', 'submitted'],
+    ).order_by('status', 'expected_deadline'))
+
+
+def _process(user):
+    queue = list(Job.objects.filter(process_user=user, status='processing_queue').order_by('expected_deadline'))
+    done = list(Job.objects.filter(process_user=user, status='processing').order_by('-process_assigned_at')[:10])
+    return queue + done
+
+
+def _allocator(request):
+    pending = paginate(request, Job.objects.filter(status='pending_allocation').prefetch_related('created_by'),
+                       param='pending_cursor')
+    allocated = paginate(request, Job.objects.filter(status__in=['allocated', 'in_progress'])
+                         .prefetch_related('allocated_to'), param='allocated_cursor')
+    completed = list(Job.objects.filter(status='completed').prefetch_related('allocated_to').order_by('-updated_at')[:10])
+    return [job.created_by.first_name for job in pending] + [job.allocated_to for job in allocated] + completed
+
+
+def _allocator_repository(request):
+    pending = repository.pending_allocation_page(request)
+    allocated = repository.allocated_page(request)
+    completed = repository.recently_completed()
+    return [job.created_by.first_name for job in pending] + [job.allocated_to for job in allocated] + completed
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the ORM querysets of the hot job lists (writer queue, process "
+        "queue, allocator lists, marketing job list) with their pymongo "
+        "repository versions (marketing.repository)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per variant (default 50).')
+        parser.add_argument('--stand-in', action='store_true',
+                            help='Seed an in-memory mongomock database and benchmark that.')
+
+    def busiest(self, role, field):
+        ids = list(Job.objects.exclude(**{field: None}).values_list(field, flat=True)[:2000])
+        if not ids:
+            return None
+        return CustomUser.objects.get(pk=max(set(ids), key=ids.count), role=role)
+
+    def handle(self, *args, **options):
+        if options['stand_in']:
+            call_command('seed_crm', stand_in=True, users=100, jobs=2000, stdout=self.stderr)
+
+        request = RequestFactory().get('/')
+        writer = self.busiest('writer', 'allocated_to')
+        process = self.busiest('process', 'process_user')
+        marketing = self.busiest('marketing', 'created_by')
+        if not (writer and process and marketing):
+            raise CommandError('Needs jobs for writers, process users and marketing; run `manage.py seed_crm`.')
+
+        cases = [
+            ('writer queue', lambda: _writer(writer), lambda: repository.writer_queue(writer)),
+            ('process queue', lambda: _process(process),
+             lambda: repository.process_queue(process) + repository.process_recent(process)),
+            ('allocator lists', lambda: _allocator(request), lambda: _allocator_repository(request)),
+            ('marketing job list', lambda: list(paginate(request, Job.objects.filter(created_by=marketing))),
+             lambda: list(repository.marketing_jobs_page(request, marketing))),
+        ]
+
+        self.stdout.write(f"{'list':<20}{'rows':>6}{'orm p50':>10}{'orm p95':>10}{'repo p50':>10}{'repo p95':>10}"
+                          f"{'speedup':>9}")
+        for name, orm, repo in cases:
+            rows = len(repo())
+            timings = {}
+            for variant, func in (('orm', orm), ('repo', repo)):
+                func()  # warm up
+                samples = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    func()
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[variant] = samples
+            orm_p50, repo_p50 = percentile(timings['orm'], 50), percentile(timings['repo'], 50)
+            self.stdout.write(
+                f"{name:<20}{rows:>6}{orm_p50:>10.2f}{percentile(timings['orm'], 95):>10.2f}"
+                f"{repo_p50:>10.2f}{percentile(timings['repo'], 95):>10.2f}{orm_p50 / repo_p50:>8.1f}x"
+            )
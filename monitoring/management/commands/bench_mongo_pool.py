@@ -0,0 +1,85 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from authentication.models import CustomUser
+from monitoring.pool import percentile, pool_listener
+
+
+class Command(BaseCommand):
+    help = (
+        "Hit a dashboard from concurrent threads and report latency percentiles "
+        "together with what the MongoDB pool did. Run it once per configuration "
+        "(e.g. DB_CONN_MAX_AGE=0 vs unset, different MONGO_MAX_POOL_SIZE) to "
+        "compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, metavar='EMAIL', help='User to log in as.')
+        parser.add_argument('--path', help='URL to request (default: the dashboard).')
+        parser.add_argument('--requests', type=int, default=200, help='Total requests (default 200).')
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads (default 8).')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests first (default 10).')
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}.")
+        path = options['path'] or reverse('dashboard')
+        concurrency = max(1, options['concurrency'])
+
+        client = Client()
+        client.force_login(user)
+        for _ in range(options['warmup']):
+            client.get(path)
+
+        pool_listener.reset()
+        latencies, errors = [], []
+        lock = threading.Lock()
+        per_thread = [options['requests'] // concurrency + (i < options['requests'] % concurrency)
+                      for i in range(concurrency)]
+
+        def worker(count):
+            thread_client = Client()
+            thread_client.force_login(user)
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = thread_client.get(path)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        if not latencies:
+            raise CommandError('No requests were made.')
+
+        self.stdout.write(f'{path}: {len(latencies)} requests, {concurrency} threads, {wall:.2f}s '
+                          f'({len(latencies) / wall:.1f} req/s), {len(errors)} errors')
+        self.stdout.write('latency ms: ' + '  '.join(
+            f'{name} {percentile(latencies, pct):.1f}'
+            for name, pct in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100))
+        ))
+        for address, stats in pool_listener.snapshot().items():
+            wait = stats['checkout_wait_ms']['p99']
+            self.stdout.write(
+                f"pool {address}: {stats['connections_created']} connections opened, "
+                f"{stats['connections_closed']} closed, {stats['pools_cleared']} pool clears, "
+                f"max {stats['max_checked_out']} checked out, "
+                f"checkout wait p99 {'-' if wait is None else f'{wait:.2f}'} ms"
+            )
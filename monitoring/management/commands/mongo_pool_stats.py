@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from crm_project.mongo import get_database
+from monitoring.pool import client_options, pool_listener, server_connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the MongoDB client's pool configuration, this process's pool "
+        "events and the server-wide connection counts. Web workers report "
+        "their own pools at /monitoring/pool/."
+    )
+
+    def handle(self, *args, **options):
+        try:
+            get_database().command('ping')
+            data = {
+                'client': client_options(),
+                'pools': pool_listener.snapshot(),
+                'server_connections': server_connections(),
+            }
+        except PyMongoError as e:
+            raise CommandError(f'Could not reach MongoDB: {e}') from e
+        self.stdout.write(json.dumps(data, indent=2, default=str))
@@ -0,0 +1,65 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from authentication.models import CustomUser
+from monitoring import djongo_profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Request a page and show where its ORM time goes, per call site: "
+        "Djongo translation (SQL parsing and conversion), MongoDB round trips "
+        "and result fetching. Call sites dominated by translation are the "
+        "candidates for moving to direct pymongo reads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', metavar='EMAIL',
+                            help='User to log in as (default: the first approved user of --role).')
+        parser.add_argument('--role', default='allocator', help='Role to pick a user from (default allocator).')
+        parser.add_argument('--path', help='URL to request (default: the dashboard).')
+        parser.add_argument('--repeat', type=int, default=5, help='Profiled requests (default 5).')
+        parser.add_argument('--stand-in', action='store_true',
+                            help='Seed an in-memory mongomock database and profile that.')
+
+    def handle(self, *args, **options):
+        if options['stand_in']:
+            call_command('seed_crm', stand_in=True, users=60, jobs=500, stdout=self.stderr)
+        djongo_profile.install()
+
+        users = CustomUser.objects.filter(approval_status='approved', is_active=True)
+        if options['user']:
+            user = users.filter(email=options['user']).first()
+        else:
+            user = users.filter(role=options['role']).order_by('id').first()
+        if user is None:
+            raise CommandError('No such approved user.')
+        path = options['path'] or reverse('dashboard')
+
+        client = Client()
+        client.force_login(user)
+        client.get(path)  # warm caches and the URL resolver
+
+        combined = djongo_profile.RequestProfile()
+        for _ in range(max(1, options['repeat'])):
+            with djongo_profile.profile() as request_profile:
+                response = client.get(path)
+            combined.queries.extend(request_profile.queries)
+
+        repeat = max(1, options['repeat'])
+        totals = combined.totals()
+        orm = totals['translate'] + totals['server'] + totals['fetch']
+        self.stdout.write(
+            f"{path} as {user.email} ({user.role}), HTTP {response.status_code}: "
+            f"{totals['queries'] / repeat:.0f} queries/request, ORM {orm * 1000 / repeat:.1f} ms/request - "
+            f"translate {totals['translate'] * 1000 / repeat:.1f}, server {totals['server'] * 1000 / repeat:.1f}, "
+            f"fetch {totals['fetch'] * 1000 / repeat:.1f}"
+        )
+        self.stdout.write(f"\n{'calls':>6} {'translate':>10} {'server':>8} {'fetch':>8}  (ms per request)  call site / SQL")
+        for caller, sql, count, translate, server, fetch in combined.by_call_site():
+            self.stdout.write(
+                f'{count / repeat:>6.0f} {translate * 1000 / repeat:>10.2f} {server * 1000 / repeat:>8.2f} '
+                f'{fetch * 1000 / repeat:>8.2f}  {caller}\n{"":>37}{sql[:160]}'
+            )
@@ -0,0 +1,225 @@
+"""
+In-process request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` records, for every request, its latency, the SQL
+queries Djongo ran and how long their execute() took, the MongoDB commands
+sent and their server round-trip time, and the time spent rendering
+templates. Everything is labelled with the URL name (``dashboard``,
+``allocate:get_assignees``, ...) and the user's role.
+
+Aggregation is a dict of counters / fixed-bucket histograms behind one
+lock, so recording costs a few dict updates. Each worker process keeps its
+own numbers; scrape every worker (or run one per container) to see them all.
+
+The per-request tallies live in context variables rather than thread
+locals, so reads a view runs on other threads (crm_project.parallel) are
+counted towards the request too.
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}'
+        yield f'{name}_sum{_labels(labels)} {_number(self.sum)}'
+        yield f'{name}_count{_labels(labels)} {cumulative}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+class Registry:
+    """
+    Metrics keyed by name and label set. ``describe`` declares a metric
+    (type, help, buckets); ``inc`` / ``observe`` record into it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._series = {}
+        self._collectors = []
+
+    def describe(self, name, kind, help_text, buckets=None):
+        self._meta[name] = (kind, help_text, buckets)
+        self._series.setdefault(name, {})
+
+    def inc(self, name, labels, amount=1):
+        key = tuple(labels.items())
+        with self._lock:
+            series = self._series[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = tuple(labels.items())
+        with self._lock:
+            series = self._series[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._meta[name][2])
+            histogram.observe(value)
+
+    def collector(self, func):
+        """
+        Register ``func() -> [(name, kind, help, value)]``, called at scrape
+        time for numbers kept elsewhere (caches, pools).
+        """
+        self._collectors.append(func)
+        return func
+
+    def reset(self):
+        with self._lock:
+            for series in self._series.values():
+                series.clear()
+
+    def exposition(self):
+        """
+        All metrics in the Prometheus text exposition format (0.0.4).
+        """
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, _) in self._meta.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in sorted(self._series[name].items()):
+                    if kind == 'histogram':
+                        lines.extend(value.lines(name, labels))
+                    else:
+                        lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        for collect in self._collectors:
+            for name, kind, help_text, value in collect():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+registry.describe('crm_http_requests_total', 'counter', 'Requests handled, by view, role, method and status.')
+registry.describe('crm_http_request_duration_seconds', 'histogram', 'Request latency.', LATENCY_BUCKETS)
+registry.describe('crm_db_queries_per_request', 'histogram',
+                  'SQL queries Djongo translated per request.', COUNT_BUCKETS)
+registry.describe('crm_db_query_seconds_total', 'counter',
+                  'Time in Djongo cursor.execute() (SQL translation and query setup).')
+registry.describe('crm_mongo_commands_per_request', 'histogram',
+                  'MongoDB commands sent per request (ORM and direct pymongo).', COUNT_BUCKETS)
+registry.describe('crm_mongo_command_seconds_total', 'counter',
+                  'Server round-trip time of those MongoDB commands.')
+registry.describe('crm_djongo_translate_seconds_total', 'counter',
+                  'Djongo SQL parsing and conversion to MongoDB (DJONGO_PROFILE only).')
+registry.describe('crm_djongo_server_seconds_total', 'counter',
+                  'MongoDB round trips of ORM queries (DJONGO_PROFILE only).')
+registry.describe('crm_djongo_fetch_seconds_total', 'counter',
+                  'Iterating ORM results, excluding round trips (DJONGO_PROFILE only).')
+registry.describe('crm_template_render_seconds', 'histogram',
+                  'Template rendering time per request.', LATENCY_BUCKETS)
+
+
+# Accumulator of the request being handled, for the query and template
+# hooks below: {'queries', 'query_seconds', 'render'}.
+request_timings = contextvars.ContextVar('request_timings', default=None)
+_timings_lock = threading.Lock()
+
+
+def add_timings(**values):
+    timings = request_timings.get()
+    if timings is not None:
+        with _timings_lock:
+            for name, value in values.items():
+                timings[name] += value
+
+
+def _time_query(execute, sql, params, many, context):
+    # Djongo translates the SQL in execute() but fetches from MongoDB
+    # lazily, so the server time is taken from pymongo instead.
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        add_timings(queries=1, query_seconds=time.perf_counter() - started)
+
+
+def _add_query_timer(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def instrument_queries():
+    """
+    Count the SQL queries and their execute() time on every database
+    connection, whichever thread opens it.
+    """
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(_add_query_timer, dispatch_uid='monitoring.metrics.query_timer')
+
+
+def instrument_templates():
+    """
+    Time every top-level template render. Only the backend wrapper is
+    patched; ``{% include %}`` and ``{% extends %}`` render inside it.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            add_timings(render=time.perf_counter() - started)
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+@registry.collector
+def _statement_cache():
+    from crm_project.statement_cache import statement_cache
+    if statement_cache is None:
+        return []
+    stats = statement_cache.stats()
+    return [
+        ('crm_djongo_parse_cache_hits_total', 'counter', 'Djongo statements served from the parse cache.',
+         stats['hits']),
+        ('crm_djongo_parse_cache_misses_total', 'counter', 'Djongo statements parsed and cached.', stats['misses']),
+        ('crm_djongo_parse_cache_evictions_total', 'counter', 'Query shapes evicted from the parse cache.',
+         stats['evictions']),
+        ('crm_djongo_parse_cache_entries', 'gauge', 'Query shapes in the parse cache.', stats['size']),
+    ]
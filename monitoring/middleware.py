@@ -0,0 +1,98 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import djongo_profile
+from .metrics import registry, request_timings
+from .mongo_commands import command_listener
+
+
+def _role(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    return getattr(user, 'role', '') or 'unknown'
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    """
+    Record latency, query and template metrics for every request
+    (see monitoring.metrics).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = {'queries': 0, 'query_seconds': 0.0, 'render': 0.0}
+        token = request_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with command_listener.capture() as commands:
+                response = self.get_response(request)
+        finally:
+            request_timings.reset(token)
+        elapsed = time.perf_counter() - started
+
+        labels = {'view': _view_name(request), 'role': _role(request)}
+        registry.inc('crm_http_requests_total',
+                     dict(labels, method=request.method, status=str(response.status_code)))
+        registry.observe('crm_http_request_duration_seconds', labels, elapsed)
+        registry.observe('crm_db_queries_per_request', labels, timings['queries'])
+        registry.inc('crm_db_query_seconds_total', labels, timings['query_seconds'])
+        registry.observe('crm_mongo_commands_per_request', labels, sum(commands.values()))
+        registry.inc('crm_mongo_command_seconds_total', labels, commands.seconds)
+        if timings['render']:
+            registry.observe('crm_template_render_seconds', labels, timings['render'])
+        return response
+
+
+class QueryProfileMiddleware:
+    """
+    With DJONGO_PROFILE on, break each request's ORM time down into Djongo
+    translation, MongoDB round trips and result fetching (see
+    monitoring.djongo_profile). The totals go out in a Server-Timing header
+    and to the metrics; the per-call-site breakdown is logged at INFO.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DJONGO_PROFILE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.logger = logging.getLogger(djongo_profile.__name__)
+
+    def __call__(self, request):
+        with djongo_profile.profile() as request_profile:
+            response = self.get_response(request)
+
+        totals = request_profile.totals()
+        response['Server-Timing'] = ', '.join(
+            f'djongo-{part};dur={totals[part] * 1000:.1f}' for part in ('translate', 'server', 'fetch')
+        )
+
+        labels = {'view': _view_name(request), 'role': _role(request)}
+        for part in ('translate', 'server', 'fetch'):
+            registry.inc(f'crm_djongo_{part}_seconds_total', labels, totals[part])
+
+        if totals['queries'] and self.logger.isEnabledFor(logging.INFO):
+            lines = [
+                f'  {count:>3}x {translate * 1000:7.1f} {server * 1000:7.1f} {fetch * 1000:7.1f}  {caller}  {sql[:120]}'
+                for caller, sql, count, translate, server, fetch in request_profile.by_call_site()
+            ]
+            self.logger.info(
+                '%s %s [%s]: %d queries, translate %.1f ms, server %.1f ms, fetch %.1f ms\n'
+                '  calls  translate  server  fetch (ms)\n%s',
+                request.method, request.path, labels['view'], totals['queries'],
+                totals['translate'] * 1000, totals['server'] * 1000, totals['fetch'] * 1000,
+                '\n'.join(lines),
+            )
+        return response
@@ -0,0 +1,76 @@
+"""
+Count of the MongoDB commands a block of code sends.
+
+Django's CaptureQueriesContext only sees queries that go through Djongo's
+SQL layer; direct pymongo reads (counters, aggregations, markers) bypass it.
+``command_listener`` (registered in ``MonitoringConfig.ready``) sees both,
+and also adds up the server round-trip time pymongo measured for them.
+
+Captures are kept in a context variable: code run in a copy of the
+context on another thread (crm_project.parallel) counts towards them too.
+"""
+
+import contextvars
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+
+class CommandTally(Counter):
+    """
+    Commands sent, by name, plus ``seconds`` spent waiting for replies and,
+    if asked for, the command documents themselves in ``commands``.
+    """
+    seconds = 0.0
+    commands = None
+
+
+class CommandCountListener(monitoring.CommandListener):
+    def __init__(self):
+        self._tallies = contextvars.ContextVar('command_tallies', default=())
+        # Threads sharing a context update the same tallies.
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        tallies = self._tallies.get()
+        if tallies:
+            with self._lock:
+                for tally in tallies:
+                    tally[event.command_name] += 1
+                    if tally.commands is not None:
+                        tally.commands.append(event.command)
+
+    def succeeded(self, event):
+        tallies = self._tallies.get()
+        if tallies:
+            with self._lock:
+                for tally in tallies:
+                    tally.seconds += event.duration_micros / 1e6
+
+    def failed(self, event):
+        self.succeeded(event)
+
+    @contextmanager
+    def capture(self, keep_commands=False):
+        """
+        Count the commands sent inside the block::
+
+            with command_listener.capture() as counts:
+                ...
+            sum(counts.values()), counts.seconds
+
+        Captures nest; an outer one also counts what inner ones see.
+        """
+        tally = CommandTally()
+        if keep_commands:
+            tally.commands = []
+        token = self._tallies.set(self._tallies.get() + (tally,))
+        try:
+            yield tally
+        finally:
+            self._tallies.reset(token)
+
+
+command_listener = CommandCountListener()
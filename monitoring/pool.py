@@ -0,0 +1,167 @@
+"""
+MongoDB connection pool statistics.
+
+``pool_listener`` is a pymongo CMAP listener (registered in
+``MonitoringConfig.ready``) that counts pool events per server address in
+this process: connections opened and closed, check-outs, how long they
+waited for a free connection, and failures. Stats are per process, so under
+gunicorn each worker reports its own pool.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from pymongo import monitoring
+
+# Check-out wait samples kept per address for the percentiles.
+WAIT_SAMPLES = 2048
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of ``samples`` (None when empty).
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class _AddressStats:
+    def __init__(self):
+        self.pools_created = 0
+        self.pools_cleared = 0
+        self.created = 0
+        self.closed = Counter()
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = Counter()
+        self.waits_ms = deque(maxlen=WAIT_SAMPLES)
+
+    def as_dict(self):
+        waits = list(self.waits_ms)
+        return {
+            'pools_created': self.pools_created,
+            'pools_cleared': self.pools_cleared,
+            'connections_created': self.created,
+            'connections_closed': sum(self.closed.values()),
+            'connections_closed_by_reason': dict(self.closed),
+            'connections_open': self.created - sum(self.closed.values()),
+            'checked_out': self.checked_out,
+            'max_checked_out': self.max_checked_out,
+            'checkouts': self.checkouts,
+            'checkout_failures': dict(self.checkout_failures),
+            'checkout_wait_ms': {
+                'p50': percentile(waits, 50),
+                'p95': percentile(waits, 95),
+                'p99': percentile(waits, 99),
+                'max': max(waits) if waits else None,
+            },
+        }
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}
+
+    def _for(self, event):
+        address = '%s:%s' % event.address
+        stats = self._stats.get(address)
+        if stats is None:
+            stats = self._stats.setdefault(address, _AddressStats())
+        return stats
+
+    def pool_created(self, event):
+        with self._lock:
+            self._for(event).pools_created += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._for(event).pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self._for(event).created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._for(event).closed[event.reason] += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._for(event).checkout_failures[event.reason] += 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        with self._lock:
+            stats = self._for(event)
+            stats.checkouts += 1
+            stats.checked_out += 1
+            stats.max_checked_out = max(stats.max_checked_out, stats.checked_out)
+            if started is not None:
+                stats.waits_ms.append((time.perf_counter() - started) * 1000)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._for(event).checked_out -= 1
+
+    def snapshot(self):
+        """
+        ``{address: stats dict}`` for this process.
+        """
+        with self._lock:
+            return {address: stats.as_dict() for address, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+pool_listener = PoolStatsListener()
+
+
+def client_options():
+    """
+    Effective pool options of the MongoClient Djongo is using, plus the
+    configured client options (settings.MONGO_CLIENT).
+    """
+    from crm_project.mongo import get_database
+
+    client = get_database().client
+    return {
+        'max_pool_size': client.max_pool_size,
+        'min_pool_size': client.min_pool_size,
+        'max_idle_time_ms': client.max_idle_time_ms,
+        'server_selection_timeout': client.server_selection_timeout,
+        'configured': dict(settings.DATABASES['default'].get('CLIENT', {})),
+    }
+
+
+def server_connections():
+    """
+    ``serverStatus().connections`` - the server-wide view (all clients), or
+    None when the user may not run serverStatus.
+    """
+    from pymongo.errors import OperationFailure
+
+    from crm_project.mongo import get_database
+
+    try:
+        return get_database().client.admin.command('serverStatus')['connections']
+    except OperationFailure:
+        return None
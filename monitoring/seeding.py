@@ -0,0 +1,240 @@
+"""
+Deterministic synthetic data for benchmarks.
+
+Users and jobs are written straight through pymongo in batches (the ORM
+would need hours for a million jobs), taking their ids from Djongo's own
+auto-increment counter. The same seed and anchor date always produce the
+same data. Everything seeded is recognisable - emails end in SEED_DOMAIN,
+job ids start with SEED_JOB_PREFIX - so ``clear`` can remove it again.
+"""
+
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from bson.decimal128 import Decimal128
+from django.contrib.auth.hashers import make_password
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from crm_project import changes
+from crm_project.mongo import get_collection, reserve_ids
+from marketing.models import Job
+from writer.models import WriterSubmission
+
+SEED_DOMAIN = 'seed.example'
+SEED_JOB_PREFIX = 'SEED-'
+SEED_PASSWORD = 'seed-password'
+
+# Share of users per role; every role gets at least one user.
+ROLE_WEIGHTS = {
+    'writer': 60, 'marketing': 14, 'process': 10, 'allocator': 4, 'user': 4,
+    'manager': 2, 'admin': 2, 'superadmin': 1, 'accounts_team': 3,
+}
+
+# Share of jobs per status (the union of both status declarations on Job).
+STATUS_WEIGHTS = {
+    'draft': 2, 'pending_completion': 4, 'pending_allocation': 8, 'allocated': 8,
+    'in_progress': 10, 'processing_queue': 4, 'processing': 3, 'submitted': 6,
+    'completed': 52, 'cancelled': 3,
+}
+
+WRITER_STATUSES = {'allocated', 'in_progress', 'submitted', 'completed'}
+PROCESS_STATUSES = {'processing_queue', 'processing'}
+FINISHED_STATUSES = set(Job.FINISHED_STATUSES)
+
+TOPICS = [
+    'Supply chain resilience', 'Machine learning in healthcare', 'Renewable energy policy',
+    'Consumer behaviour online', 'Corporate governance', 'Climate adaptation', 'Data privacy law',
+    'Urban transport planning', 'Early childhood education', 'Microfinance in Africa',
+]
+FIRST_NAMES = ['Aarav', 'Maya', 'Liam', 'Zara', 'Noah', 'Isha', 'Omar', 'Lena', 'Ravi', 'Sofia', 'Kian', 'Anya']
+LAST_NAMES = ['Sharma', 'Smith', 'Khan', 'Garcia', 'Chen', 'Patel', 'Okafor', 'Novak', 'Silva', 'Iyer']
+
+
+def _document(instance):
+    """
+    The document Djongo would store for an unsaved model instance.
+    """
+    doc = {}
+    for field in instance._meta.concrete_fields:
+        value = getattr(instance, field.attname)
+        if isinstance(value, Decimal):
+            value = Decimal128(value)
+        elif isinstance(value, FieldFile):
+            value = value.name or None
+        doc[field.column] = value
+    return doc
+
+
+def _insert(model, instances):
+    if not instances:
+        return
+    first_id = reserve_ids(model, len(instances))
+    for offset, instance in enumerate(instances):
+        instance.pk = first_id + offset
+    get_collection(model).insert_many([_document(instance) for instance in instances], ordered=False)
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class Seeder:
+    def __init__(self, seed=42, anchor=None, batch_size=5000):
+        self.rng = random.Random(seed)
+        # Dates are laid out around the anchor (midnight today by default),
+        # so one seed gives the same data all day.
+        anchor = anchor or timezone.localdate()
+        self.anchor = timezone.make_aware(datetime.combine(anchor, time()))
+        self.batch_size = batch_size
+        self.users_by_role = {}
+
+    def seed_users(self, count):
+        roles = list(ROLE_WEIGHTS)
+        password = make_password(SEED_PASSWORD)
+        users = []
+        for n in range(count):
+            role = roles[n] if n < len(roles) else _weighted(self.rng, ROLE_WEIGHTS)
+            status = 'approved' if n < len(roles) else self.rng.choices(
+                ['approved', 'pending', 'rejected'], weights=[90, 7, 3])[0]
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            email = f'{role}.{n}@{SEED_DOMAIN}'
+            joined = self.anchor - timedelta(days=self.rng.randint(1, 720), minutes=self.rng.randint(0, 1439))
+            users.append(CustomUser(
+                username=email, email=email, password=password,
+                first_name=first, last_name=last, whatsapp_no=f'9{self.rng.randint(100000000, 999999999)}',
+                role=role, approval_status=status, is_active=status == 'approved',
+                approved_at=joined + timedelta(hours=6) if status != 'pending' else None,
+                rejection_reason='Incomplete profile' if status == 'rejected' else None,
+                date_joined=joined,
+            ))
+        for start in range(0, len(users), self.batch_size):
+            _insert(CustomUser, users[start:start + self.batch_size])
+
+        for user in users:
+            if user.approval_status == 'approved':
+                self.users_by_role.setdefault(user.role, []).append(user.pk)
+        return users
+
+    def _job(self, n):
+        rng = self.rng
+        status = _weighted(rng, STATUS_WEIGHTS)
+        created = self.anchor - timedelta(days=rng.randint(0, 180), minutes=rng.randint(0, 1439))
+        expected = created + timedelta(days=rng.randint(2, 14), hours=rng.randint(0, 23))
+        strict = expected + timedelta(hours=24)
+        job = Job(
+            job_id=f'{SEED_JOB_PREFIX}{n:07d}',
+            instructions=' '.join(rng.choices(TOPICS, k=6)),
+            created_by_id=rng.choice(self.users_by_role['marketing']),
+            created_at=created,
+            updated_at=created,
+            status=status,
+        )
+        if status not in ('draft', 'pending_completion'):
+            job.topic = rng.choice(TOPICS)
+            job.word_count = rng.randrange(500, 10001, 250)
+            job.referencing_style = rng.choice(['apa', 'mla', 'harvard', 'chicago', 'ieee'])
+            job.writing_style = rng.choice(['academic', 'professional', 'technical'])
+            job.expected_deadline = expected
+            job.strict_deadline = strict
+            job.amount = Decimal(job.word_count) * Decimal('0.75')
+            job.completed_form_at = created + timedelta(hours=2)
+        if status in WRITER_STATUSES:
+            job.allocated_to_id = rng.choice(self.users_by_role['writer'])
+            job.allocated_by_id = rng.choice(self.users_by_role['allocator'])
+            job.allocated_at = created + timedelta(hours=rng.randint(3, 30))
+        if status in PROCESS_STATUSES or (status == 'completed' and rng.random() < 0.2):
+            job.process_user_id = rng.choice(self.users_by_role['process'])
+            job.process_assigned_at = created + timedelta(hours=rng.randint(3, 30))
+        if job.expected_deadline and status not in FINISHED_STATUSES:
+            if job.expected_deadline <= self.anchor:
+                job.late_since = job.expected_deadline
+            if job.strict_deadline <= self.anchor:
+                job.overdue_since = job.strict_deadline
+        return job
+
+    def _submission(self, job):
+        started = job.allocated_at + timedelta(hours=self.rng.randint(1, 24))
+        status = 'in_progress' if job.status == 'in_progress' else 'submitted'
+        return WriterSubmission(
+            job_id=job.pk,
+            writer_id=job.allocated_to_id,
+            status=status,
+            started_at=started,
+            submitted_at=started + timedelta(days=self.rng.randint(1, 5)) if status == 'submitted' else None,
+            final_summary='Delivered as briefed.' if status == 'submitted' else None,
+            created_at=started,
+            updated_at=started,
+        )
+
+    def seed_jobs(self, count, progress=None):
+        for role in ('marketing', 'writer', 'allocator', 'process'):
+            if not self.users_by_role.get(role):
+                raise ValueError(f'Seeding jobs needs at least one approved {role} user.')
+
+        for start in range(0, count, self.batch_size):
+            jobs = [self._job(n) for n in range(start, min(start + self.batch_size, count))]
+            _insert(Job, jobs)
+            _insert(WriterSubmission, [
+                self._submission(job) for job in jobs
+                if job.status in ('in_progress', 'submitted', 'completed')
+            ])
+            if progress:
+                progress(start + len(jobs))
+
+    def mark_changed(self):
+        """
+        Bump the change markers of every seeded dashboard, so no browser
+        keeps a pre-seed page via 304.
+        """
+        scopes = {'allocator', 'users'}
+        for role in ('marketing', 'writer', 'process'):
+            scopes.update(f'{role}:{pk}' for pk in self.users_by_role.get(role, []))
+        changes.bump(scopes)
+
+
+def representative(role):
+    """
+    The approved user of ``role`` with the most jobs behind them, falling
+    back to a seeded (or any) approved user of the role.
+    """
+    users = CustomUser.objects.filter(role=role, approval_status='approved', is_active=True)
+    lane = {'marketing': 'created_by', 'writer': 'allocated_to', 'process': 'process_user'}.get(role)
+    if lane:
+        column = Job._meta.get_field(lane).column
+        busiest = get_collection(Job).aggregate([
+            {'$match': {column: {'$ne': None}}},
+            {'$group': {'_id': '$' + column, 'jobs': {'$sum': 1}}},
+            {'$sort': {'jobs': -1}},
+            {'$limit': 1},
+        ])
+        for row in busiest:
+            user = users.filter(pk=row['_id']).first()
+            if user:
+                return user
+    seeded = users.filter(email__endswith='@' + SEED_DOMAIN)
+    return seeded.order_by('id').first() or users.order_by('id').first()
+
+
+def clear():
+    """
+    Remove all seeded users, jobs and submissions. Returns the counts removed.
+    """
+    users = get_collection(CustomUser)
+    email = CustomUser._meta.get_field('email').column
+    user_ids = [doc['id'] for doc in users.find({email: {'$regex': f'@{SEED_DOMAIN}$'}}, {'id': 1})]
+
+    jobs = get_collection(Job)
+    job_id = Job._meta.get_field('job_id').column
+    job_pks = [doc['id'] for doc in jobs.find({job_id: {'$regex': f'^{SEED_JOB_PREFIX}'}}, {'id': 1})]
+
+    submission_job = WriterSubmission._meta.get_field('job').column
+    removed = {
+        'submissions': get_collection(WriterSubmission).delete_many({submission_job: {'$in': job_pks}}).deleted_count,
+        'jobs': jobs.delete_many({'id': {'$in': job_pks}}).deleted_count,
+        'users': users.delete_many({'id': {'$in': user_ids}}).deleted_count,
+    }
+    changes.bump({'allocator', 'users'})
+    return removed
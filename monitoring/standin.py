@@ -0,0 +1,120 @@
+"""
+In-process MongoDB stand-in for seeding and benchmarking without a mongod.
+
+``use_mongomock()`` makes every MongoClient Djongo creates from then on a
+shared ``mongomock`` client (an optional dependency: ``pip install
+mongomock``). Absolute timings against it say little about production -
+it is an interpreter, not a server - but relative numbers and query counts
+between views or between commits are still meaningful.
+
+mongomock sends no commands, so pymongo's command monitoring never fires;
+instead each collection operation is reported to ``command_listener``
+(monitoring.mongo_commands) as one command, which keeps command counts
+(bench_crm, the metrics, the dashboard tests) meaningful here too.
+
+``StandInTestCase`` runs tests against a fresh stand-in, without a mongod.
+"""
+
+import importlib.util
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.db import connections
+
+from .mongo_commands import command_listener
+
+# mongomock.Collection methods that stand for one round trip each.
+OPERATIONS = (
+    'find', 'find_one', 'aggregate', 'count_documents', 'distinct', 'insert_one', 'insert_many',
+    'update_one', 'update_many', 'replace_one', 'delete_one', 'delete_many', 'find_one_and_update',
+    'bulk_write',
+)
+
+# Delay per operation, set by simulate_latency.
+_latency = 0.0
+# Operations call each other (find_one -> find); only the outer one counts.
+_depth = threading.local()
+
+
+def _instrument():
+    import mongomock
+
+    for name in OPERATIONS:
+        method = getattr(mongomock.Collection, name)
+        if getattr(method, 'instrumented', False):
+            continue
+
+        def operation(self, *args, __method=method, __name=name, **kwargs):
+            depth = getattr(_depth, 'n', 0)
+            if depth:
+                return __method(self, *args, **kwargs)
+            _depth.n = 1
+            event = SimpleNamespace(command_name=__name, command={__name: self.name}, duration_micros=0)
+            command_listener.started(event)
+            started = time.perf_counter()
+            try:
+                if _latency:
+                    time.sleep(_latency)
+                return __method(self, *args, **kwargs)
+            finally:
+                _depth.n = 0
+                event.duration_micros = int((time.perf_counter() - started) * 1e6)
+                command_listener.succeeded(event)
+        operation.instrumented = True
+        setattr(mongomock.Collection, name, operation)
+
+
+def use_mongomock(migrate=True):
+    """
+    Route Djongo to an in-memory mongomock client and (by default) create
+    the schema in it. Returns the mongomock client.
+    """
+    import mongomock
+    from djongo import database
+
+    _instrument()
+    client = mongomock.MongoClient()
+    database.clients.clear()
+    database.connect = lambda db, **kwargs: client
+    connections.close_all()
+    if migrate:
+        call_command('migrate', verbosity=0)
+    return client
+
+
+def simulate_latency(ms):
+    """
+    Make every mongomock collection operation wait ``ms`` milliseconds, as a
+    round trip to a real server would (sleeping, so other threads run
+    meanwhile). For comparing serial and concurrent reads.
+    """
+    global _latency
+    _instrument()
+    _latency = ms / 1000
+
+
+class StandInTestCase(unittest.TestCase):
+    """
+    A test against a fresh stand-in database (skipped without mongomock).
+    Not a Django TestCase: there is no test database to create or roll
+    back, so the test runner needs no mongod.
+    """
+
+    def setUp(self):
+        super().setUp()
+        if importlib.util.find_spec('mongomock') is None:
+            self.skipTest('needs mongomock')
+        from djongo import database
+
+        connect = database.connect
+        use_mongomock()
+        self.addCleanup(self._restore, database, connect)
+
+    @staticmethod
+    def _restore(database, connect):
+        database.connect = connect
+        database.clients.clear()
+        connections.close_all()
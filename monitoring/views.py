@@ -0,0 +1,54 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
+from pymongo.errors import PyMongoError
+
+from .metrics import registry
+from .pool import client_options, pool_listener, server_connections
+
+
+def _is_operator(user):
+    return user.is_superuser or user.role in ('admin', 'superadmin')
+
+
+@login_required
+def pool_stats(request):
+    """
+    JSON view of this worker process's MongoDB connection pool.
+    """
+    if not _is_operator(request.user):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    data = {'pid': os.getpid(), 'pools': pool_listener.snapshot()}
+    try:
+        data['client'] = client_options()
+        data['server_connections'] = server_connections()
+    except PyMongoError as e:
+        data['error'] = str(e)
+    return JsonResponse(data)
+
+
+def _may_scrape(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if hmac.compare_digest(supplied.encode(), token.encode()):
+            return True
+    elif settings.METRICS_TRUST_LOOPBACK and request.META.get('REMOTE_ADDR') in ('127.0.0.1', '::1'):
+        return True
+    return request.user.is_authenticated and _is_operator(request.user)
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint for this worker's request metrics. Needs
+    ``Authorization: Bearer $METRICS_TOKEN`` when METRICS_TOKEN is set, or
+    a local scraper with METRICS_TRUST_LOOPBACK; operators can always read
+    it.
+    """
+    if not _may_scrape(request):
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,3 +1,45 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
 
-# Create your tests here.
+from authentication.models import CustomUser
+from marketing import counters
+from marketing.models import Job
+from monitoring.standin import StandInTestCase
+
+from . import views
+
+
+class ProcessDashboardTests(StandInTestCase):
+    """
+    Smoke test: both process dashboard views render
+    dashboards/process_dashboard.html with the user's queue.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(
+            username='process@example.com', email='process@example.com', password='pass12345',
+            role='process', approval_status='approved', is_active=True,
+        )
+        marketer = CustomUser.objects.create_user(
+            username='marketer@example.com', email='marketer@example.com', password='pass12345',
+            role='marketing', approval_status='approved', is_active=True,
+        )
+        Job.objects.create(job_id='QUEUED-1', instructions='Check it', created_by=marketer,
+                           status='processing_queue', process_user=self.user)
+        counters.rebuild()
+
+    def get(self):
+        request = RequestFactory().get('/process/')
+        request.user = self.user
+        return request
+
+    def assertRendersQueue(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'QUEUED-1', response.content)
+
+    def test_renders(self):
+        self.assertRendersQueue(views.process_dashboard(self.get()))
+
+    def test_async_renders(self):
+        self.assertRendersQueue(async_to_sync(views.process_dashboard_async)(self.get()))
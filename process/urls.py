@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('', views.process_dashboard, name='process_dashboard'),
+    path('', views.process_dashboard_async if settings.ASYNC_DASHBOARDS else views.process_dashboard,
+         name='process_dashboard'),
 ]
@@ -1,29 +1,49 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.utils import timezone
+from django.views.decorators.http import condition
+
+from crm_project.changes import conditional_etag, conditional_last_modified
+from crm_project.parallel import aload, async_dashboard, load
+from marketing import repository
+from marketing.stats import process_stats
+
+
+def _process_scopes(request):
+    if request.user.role != 'process':
+        return None
+    return [f'process:{request.user.pk}', f'user:{request.user.pk}']
+
+
+def _process_loaders(user):
+    return {
+        'queue': lambda: repository.process_queue(user),
+        'done': lambda: repository.process_recent(user),
+        'stats': lambda: process_stats(user),
+    }
 
-from marketing.models import Job
 
 @login_required
+@condition(etag_func=conditional_etag(_process_scopes),
+           last_modified_func=conditional_last_modified(_process_scopes))
 def process_dashboard(request):
     if request.user.role != 'process':
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('dashboard')
 
-    queue = Job.objects.filter(process_user=request.user, status='processing_queue').order_by('expected_deadline')
-    done = Job.objects.filter(process_user=request.user, status='processing').order_by('-process_assigned_at')[:10]
+    return render(request, 'dashboards/process_dashboard.html', load(_process_loaders(request.user)))
 
-    stats = {
-        'in_queue': queue.count(),
-        'completed_today': Job.objects.filter(
-            process_user=request.user, status='completed',
-            process_assigned_at__date=timezone.now().date()
-        ).count()
-    }
 
-    return render(request, 'process/dashboard.html', {
-        'queue': queue,
-        'done': done,
-        'stats': stats,
-    })
+@async_dashboard(_process_scopes)
+async def process_dashboard_async(request):
+    """
+    ``process_dashboard`` for ASGI: the queue, recent jobs and stats are read
+    concurrently.
+    """
+    if request.user.role != 'process':
+        await sync_to_async(messages.error)(request, 'You do not have permission to access this page.')
+        return redirect('dashboard')
+
+    context = await aload(_process_loaders(request.user))
+    return await sync_to_async(render)(request, 'dashboards/process_dashboard.html', context)
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'payload']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'locked_by', 'lease_until', 'last_error']
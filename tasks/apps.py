@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tasks'
+    verbose_name = 'Background Tasks'
+
+    def ready(self):
+        # Register every app's tasks.py, so workers know all task names.
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tasks')
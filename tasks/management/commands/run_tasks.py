@@ -0,0 +1,88 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pymongo.errors import PyMongoError
+
+from tasks import queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background tasks: those no web process ran, retries that "
+        "came due and tasks whose worker died (expired lease). Runs until "
+        "interrupted, or with --once until the queue has nothing due."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.TASKS_WORKERS,
+                            help=f'Tasks run at the same time (default {settings.TASKS_WORKERS}).')
+        parser.add_argument('--poll', type=float, default=2.0, metavar='SECONDS',
+                            help='Wait between checks of an empty queue (default 2).')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once nothing is due instead of waiting for more.')
+        parser.add_argument('--purge-days', type=int, default=7, metavar='DAYS',
+                            help='Delete tasks done more than this many days ago (default 7; 0 keeps them).')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        counts = {'done': 0, 'retry': 0, 'failed': 0}
+        running = set()
+        last_maintenance = None
+        self.stdout.write(f'Running tasks with {workers} worker(s).')
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='run_tasks') as pool:
+            try:
+                while True:
+                    now = time.monotonic()
+                    if last_maintenance is None or now - last_maintenance > 60:
+                        self._maintain(options['purge_days'])
+                        last_maintenance = now
+
+                    while len(running) < workers:
+                        doc = queue.claim()
+                        if doc is None:
+                            break
+                        running.add(pool.submit(self._execute, doc, counts))
+
+                    if running:
+                        done, running = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    elif options['once']:
+                        break
+                    else:
+                        time.sleep(options['poll'])
+            except PyMongoError as e:
+                raise CommandError(f'Task queue unavailable: {e}') from e
+            except KeyboardInterrupt:
+                self.stdout.write('Interrupted; finishing the running tasks...')
+                wait(running)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Tasks: {counts['done']} done, {counts['retry']} to retry, {counts['failed']} failed."
+        ))
+
+    def _execute(self, doc, counts):
+        status, retry_in = queue.execute(doc)
+        name = doc[queue.Task._meta.get_field('name').column]
+        if status == 'queued':
+            counts['retry'] += 1
+            self.stderr.write(self.style.WARNING(f"{name} #{doc['id']}: failed, retrying in {retry_in}s"))
+        elif status == 'failed':
+            counts['failed'] += 1
+            self.stderr.write(self.style.ERROR(f"{name} #{doc['id']}: failed"))
+        else:
+            counts['done'] += 1
+            self.stdout.write(f"{name} #{doc['id']}: done")
+
+    def _maintain(self, purge_days):
+        requeued = queue.requeue_expired()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} task(s) with an expired lease.'))
+        if purge_days:
+            purged = queue.purge(timezone.now() - timedelta(days=purge_days))
+            if purged:
+                self.stdout.write(f'Purged {purged} finished task(s).')
@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Durable record of a background task (see tasks.queue).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    # JSON: {"args": [...], "kwargs": {...}}
+    payload = models.TextField(default='{}')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    # Not before: set to the backoff time when a failed attempt is retried
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Claim of the current attempt; another worker may take the task over
+    # once lease_until has passed
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    lease_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    # Created through pymongo by `manage.py sync_job_indexes` (see Job.MONGO_INDEXES).
+    MONGO_INDEXES = [
+        # claiming: due queued tasks, oldest first
+        {'name': 'task_status_run_at', 'keys': [('status', 1), ('run_at', 1)]},
+        # expired leases
+        {'name': 'task_lease_until', 'keys': [('lease_until', 1)],
+         'partialFilterExpression': {'lease_until': {'$type': 'date'}}},
+    ]
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'tasks_task'
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} - {self.status}"
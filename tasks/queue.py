@@ -0,0 +1,230 @@
+"""
+A small background task queue with durable task records.
+
+Functions decorated with ``@task`` (in an app's ``tasks.py``) are queued
+with ``.enqueue(*args, **kwargs)``, which inserts a Task row and returns
+at once; arguments must be JSON-serializable (pass ids, not instances).
+
+    @task(max_attempts=5)
+    def send_welcome(user_id): ...
+
+    send_welcome.enqueue(user.pk)
+
+With TASKS_IN_PROCESS (the default) the web process runs the task on its
+own thread pool of TASKS_WORKERS threads once the enqueuing transaction
+commits. ``manage.py run_tasks`` is the standalone worker: it runs queued
+tasks nobody has claimed, retries that came due, and tasks whose process
+died mid-run - set TASKS_IN_PROCESS = False to leave everything to it.
+
+A worker claims a task by atomically moving it from ``queued`` to
+``running`` with a lease of TASKS_LEASE_SECONDS; a task still running when
+its lease expires is put back in the queue. A task that raises is retried
+after ``retry_delay * 2 ** (attempt - 1)`` seconds until ``max_attempts``,
+then left ``failed`` with its traceback. Tasks may therefore run more than
+once and must be safe to repeat.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from pymongo import ReturnDocument
+
+from crm_project.mongo import get_collection
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TaskFunction:
+    """
+    A registered task: call it to run it inline, ``enqueue`` it to run it
+    in the background.
+    """
+
+    def __init__(self, func, name, max_attempts, retry_delay):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        return enqueue(self.name, *args, **kwargs)
+
+    def __repr__(self):
+        return f'<task {self.name}>'
+
+
+def task(func=None, *, name=None, max_attempts=3, retry_delay=10):
+    """
+    Register ``func`` as a task, named ``<module>.<function>`` by default.
+    """
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        if task_name in REGISTRY:
+            raise ValueError(f'Task {task_name!r} is already registered.')
+        REGISTRY[task_name] = TaskFunction(func, task_name, max_attempts, retry_delay)
+        return REGISTRY[task_name]
+    return register(func) if func is not None else register
+
+
+def enqueue(name, *args, **kwargs):
+    """
+    Queue the task ``name`` and return its Task row.
+    """
+    registered = REGISTRY.get(name)
+    if registered is None:
+        raise LookupError(f'Unknown task {name!r}.')
+    record = Task.objects.create(
+        name=name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}, cls=DjangoJSONEncoder),
+        max_attempts=registered.max_attempts,
+    )
+    if settings.TASKS_IN_PROCESS:
+        pk = record.pk
+        transaction.on_commit(lambda: _submit(pk))
+    return record
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.TASKS_WORKERS, thread_name_prefix='task')
+    return _executor
+
+
+def _submit(pk, delay=0):
+    if delay:
+        timer = threading.Timer(delay, _submit, args=(pk,))
+        timer.daemon = True
+        timer.start()
+        return
+    _pool().submit(_run_one, pk)
+
+
+def _run_one(pk):
+    doc = claim(pk)
+    if doc is not None:
+        status, retry_in = execute(doc)
+        if status == 'queued' and settings.TASKS_IN_PROCESS:
+            _submit(pk, retry_in)
+
+
+def _column(name):
+    return Task._meta.get_field(name).column
+
+
+def claim(pk=None):
+    """
+    Atomically take a due queued task (``pk``, or the oldest due one) and
+    return its document, or None if there is none to take.
+    """
+    now = timezone.now()
+    match = {_column('status'): 'queued', _column('run_at'): {'$lte': now}}
+    if pk is not None:
+        match['id'] = pk
+    return get_collection(Task).find_one_and_update(
+        match,
+        {
+            '$set': {
+                _column('status'): 'running',
+                _column('started_at'): now,
+                _column('locked_by'): f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}',
+                _column('lease_until'): now + timedelta(seconds=settings.TASKS_LEASE_SECONDS),
+            },
+            '$inc': {_column('attempts'): 1},
+        },
+        sort=[(_column('run_at'), 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _finish(doc, values):
+    # Only while our claim holds: a task whose lease expired may be running
+    # elsewhere by now.
+    values = {_column(name): value for name, value in values.items()}
+    values[_column('lease_until')] = None
+    get_collection(Task).update_one(
+        {'id': doc['id'], _column('status'): 'running', _column('locked_by'): doc[_column('locked_by')]},
+        {'$set': values},
+    )
+
+
+def execute(doc):
+    """
+    Run a claimed task. Returns ``(status, retry_in)``: ``done``,
+    ``failed``, or ``queued`` to retry in ``retry_in`` seconds.
+    """
+    name = doc[_column('name')]
+    attempts = doc[_column('attempts')]
+    registered = REGISTRY.get(name)
+    try:
+        if registered is None:
+            raise LookupError(f'Unknown task {name!r}.')
+        payload = json.loads(doc[_column('payload')] or '{}')
+        registered(*payload.get('args', ()), **payload.get('kwargs', {}))
+    except Exception:
+        error = traceback.format_exc()
+        if registered is not None and attempts < doc[_column('max_attempts')]:
+            delay = registered.retry_delay * 2 ** (attempts - 1)
+            logger.warning('Task %s #%s failed (attempt %s), retrying in %ss', name, doc['id'], attempts, delay,
+                           exc_info=True)
+            _finish(doc, {'status': 'queued', 'run_at': timezone.now() + timedelta(seconds=delay),
+                          'locked_by': None, 'last_error': error})
+            return 'queued', delay
+        logger.error('Task %s #%s failed after %s attempt(s)', name, doc['id'], attempts, exc_info=True)
+        _finish(doc, {'status': 'failed', 'finished_at': timezone.now(), 'last_error': error})
+        return 'failed', None
+    _finish(doc, {'status': 'done', 'finished_at': timezone.now()})
+    return 'done', None
+
+
+def requeue_expired():
+    """
+    Put running tasks whose lease expired (their worker died) back in the
+    queue, or fail them if they have no attempts left. Returns how many.
+    """
+    collection = get_collection(Task)
+    status, attempts, max_attempts = _column('status'), _column('attempts'), _column('max_attempts')
+    expired = {status: 'running', _column('lease_until'): {'$lt': timezone.now()}}
+    cleared = {_column('locked_by'): None, _column('lease_until'): None}
+    count = 0
+    for doc in collection.find(expired, {'id': 1, attempts: 1, max_attempts: 1}):
+        if doc[attempts] < doc[max_attempts]:
+            values = dict(cleared, **{status: 'queued', _column('run_at'): timezone.now()})
+        else:
+            values = dict(cleared, **{status: 'failed', _column('finished_at'): timezone.now(),
+                                      _column('last_error'): 'Lease expired: the worker running it stopped.'})
+        count += collection.update_one(dict(expired, id=doc['id']), {'$set': values}).modified_count
+    return count
+
+
+def purge(older_than):
+    """
+    Delete tasks done before ``older_than`` (a datetime). Failed tasks are
+    kept for inspection.
+    """
+    return get_collection(Task).delete_many(
+        {_column('status'): 'done', _column('finished_at'): {'$lt': older_than}}
+    ).deleted_count
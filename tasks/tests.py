@@ -0,0 +1,165 @@
+import unittest
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connections
+from django.test import override_settings
+from django.utils import timezone
+
+from crm_project.mongo import get_collection
+
+from . import queue
+from .models import Task
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+calls = []
+
+
+@queue.task(name='tasks.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task(name='tasks.tests.explode', max_attempts=3, retry_delay=10)
+def explode():
+    raise RuntimeError('boom')
+
+
+def _column(name):
+    return Task._meta.get_field(name).column
+
+
+@unittest.skipUnless(mongomock, 'needs mongomock')
+class TaskQueueTests(unittest.TestCase):
+    """
+    The queue's claim / execute / lease cycle, on the in-memory MongoDB
+    stand-in (monitoring.standin) rather than a test database. Tasks are
+    claimed and executed by the tests themselves, not the in-process pool.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from djongo import database
+        from monitoring.standin import use_mongomock
+
+        cls._settings = override_settings(TASKS_IN_PROCESS=False)
+        cls._settings.enable()
+        cls._connect = database.connect
+        use_mongomock()
+
+    @classmethod
+    def tearDownClass(cls):
+        from djongo import database
+
+        database.connect = cls._connect
+        database.clients.clear()
+        connections.close_all()
+        cls._settings.disable()
+        super().tearDownClass()
+
+    def setUp(self):
+        get_collection(Task).delete_many({})
+        calls.clear()
+
+    def stored(self, pk):
+        return get_collection(Task).find_one({'id': pk})
+
+    def make_due(self, pk):
+        get_collection(Task).update_one({'id': pk}, {'$set': {_column('run_at'): timezone.now()}})
+
+    def expire_lease(self, pk):
+        get_collection(Task).update_one(
+            {'id': pk}, {'$set': {_column('lease_until'): timezone.now() - timedelta(seconds=1)}},
+        )
+
+    def test_claim_and_execute(self):
+        queued = record.enqueue('hello')
+
+        doc = queue.claim()
+        self.assertEqual(doc['id'], queued.pk)
+        self.assertEqual(doc[_column('status')], 'running')
+        self.assertEqual(doc[_column('attempts')], 1)
+        self.assertIsNotNone(doc[_column('lease_until')])
+        self.assertIsNone(queue.claim())
+
+        self.assertEqual(queue.execute(doc), ('done', None))
+        self.assertEqual(calls, ['hello'])
+        stored = self.stored(queued.pk)
+        self.assertEqual(stored[_column('status')], 'done')
+        self.assertIsNone(stored[_column('lease_until')])
+        self.assertIsNotNone(stored[_column('finished_at')])
+
+    def test_retries_with_backoff_until_failed(self):
+        pk = explode.enqueue().pk
+
+        for attempt, delay in ((1, 10), (2, 20)):
+            doc = queue.claim()
+            self.assertEqual(doc[_column('attempts')], attempt)
+            started = timezone.now()
+            with self.assertLogs('tasks.queue', 'WARNING'):
+                self.assertEqual(queue.execute(doc), ('queued', delay))
+            stored = self.stored(pk)
+            self.assertEqual(stored[_column('status')], 'queued')
+            self.assertIn('RuntimeError: boom', stored[_column('last_error')])
+            run_at = stored[_column('run_at')].replace(tzinfo=dt_timezone.utc)
+            self.assertGreaterEqual(run_at, started.replace(microsecond=0) + timedelta(seconds=delay))
+            # Not due before the backoff has passed.
+            self.assertIsNone(queue.claim())
+            self.make_due(pk)
+
+        doc = queue.claim()
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertEqual(queue.execute(doc), ('failed', None))
+        stored = self.stored(pk)
+        self.assertEqual(stored[_column('status')], 'failed')
+        self.assertEqual(stored[_column('attempts')], 3)
+        self.make_due(pk)
+        self.assertIsNone(queue.claim())
+
+    def test_expired_lease_is_requeued(self):
+        pk = record.enqueue('again').pk
+        queue.claim()
+        self.assertEqual(queue.requeue_expired(), 0)
+
+        self.expire_lease(pk)
+        self.assertEqual(queue.requeue_expired(), 1)
+        stored = self.stored(pk)
+        self.assertEqual(stored[_column('status')], 'queued')
+        self.assertIsNone(stored[_column('locked_by')])
+
+        doc = queue.claim()
+        self.assertEqual(doc[_column('attempts')], 2)
+        self.assertEqual(queue.execute(doc), ('done', None))
+
+    def test_expired_lease_without_attempts_left_fails(self):
+        pk = record.enqueue('last').pk
+        get_collection(Task).update_one({'id': pk}, {'$set': {_column('max_attempts'): 1}})
+        queue.claim()
+        self.expire_lease(pk)
+
+        self.assertEqual(queue.requeue_expired(), 1)
+        self.assertEqual(self.stored(pk)[_column('status')], 'failed')
+
+    def test_finish_leaves_a_reclaimed_task_alone(self):
+        pk = explode.enqueue().pk
+        stale = queue.claim()
+        self.expire_lease(pk)
+        queue.requeue_expired()
+        current = queue.claim()
+        self.assertNotEqual(stale[_column('locked_by')], current[_column('locked_by')])
+
+        # The first worker finishes after losing its lease.
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            queue.execute(stale)
+        stored = self.stored(pk)
+        self.assertEqual(stored[_column('status')], 'running')
+        self.assertEqual(stored[_column('locked_by')], current[_column('locked_by')])
+        self.assertEqual(stored[_column('attempts')], 2)
+
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            self.assertEqual(queue.execute(current), ('queued', 20))
+        self.assertEqual(self.stored(pk)[_column('status')], 'queued')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WriterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'writer'
+
+    def ready(self):
+        from crm_project.storage import track_references
+        track_references(self.get_model('WriterSubmission'))
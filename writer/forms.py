@@ -1,10 +1,11 @@
 from django import forms
+from crm_project.uploads import UploadFormMixin
 from .models import WriterSubmission
 
 class StartJobForm(forms.Form):
     confirm = forms.BooleanField(required=True, label="I want to start this job now")
 
-class StructureUploadForm(forms.ModelForm):
+class StructureUploadForm(UploadFormMixin, forms.ModelForm):
     class Meta:
         model = WriterSubmission
         fields = ['structure_file']
@@ -12,7 +13,7 @@ class StructureUploadForm(forms.ModelForm):
             'structure_file': forms.FileInput(attrs={'class': 'form-control'})
         }
 
-class FinalUploadForm(forms.ModelForm):
+class FinalUploadForm(UploadFormMixin, forms.ModelForm):
     class Meta:
         model = WriterSubmission
         fields = ['final_copy', 'associate_file', 'final_summary']
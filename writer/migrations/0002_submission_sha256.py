@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='writersubmission',
+            name='associate_file_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='writersubmission',
+            name='final_copy_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='writersubmission',
+            name='structure_file_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:38
+
+from django.db import migrations, models
+import writer.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0002_submission_sha256'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='writersubmission',
+            name='associate_file',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to=writer.models.writer_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='writersubmission',
+            name='final_copy',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to=writer.models.writer_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='writersubmission',
+            name='structure_file',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to=writer.models.writer_upload_path),
+        ),
+    ]
@@ -15,9 +15,13 @@ class WriterSubmission(models.Model):
     writer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="writer_submissions")
 
     # Deliverables
-    structure_file = models.FileField(upload_to=writer_upload_path, null=True, blank=True)
-    final_copy = models.FileField(upload_to=writer_upload_path, null=True, blank=True)
-    associate_file = models.FileField(upload_to=writer_upload_path, null=True, blank=True)  # software or associated file
+    structure_file = models.FileField(upload_to=writer_upload_path, max_length=255, null=True, blank=True)
+    final_copy = models.FileField(upload_to=writer_upload_path, max_length=255, null=True, blank=True)
+    associate_file = models.FileField(upload_to=writer_upload_path, max_length=255, null=True, blank=True)  # software or associated file
+    # Hex SHA-256 of each file, computed while it was uploaded
+    structure_file_sha256 = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    final_copy_sha256 = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    associate_file_sha256 = models.CharField(max_length=64, null=True, blank=True, editable=False)
     final_summary = models.TextField(blank=True, null=True)
 
     # Timestamps
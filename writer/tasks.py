@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from marketing.models import Job
+from tasks.queue import task
+
+
+@task(max_attempts=5, retry_delay=60)
+def notify_submission(job_id):
+    """
+    Email the allocator and the marketer of a job that its writer submitted
+    the final files.
+    """
+    job = Job.objects.select_related('allocated_to', 'allocated_by', 'created_by').filter(pk=job_id).first()
+    if job is None:
+        return
+    recipients = sorted({user.email for user in (job.allocated_by, job.created_by) if user and user.email})
+    if not recipients:
+        return
+    writer = job.allocated_to
+    writer_name = 'The writer'
+    if writer:
+        writer_name = f'{writer.first_name} {writer.last_name}'.strip() or writer.username
+    send_mail(
+        f'Job {job.job_id} submitted',
+        f'{writer_name} has uploaded the final files for job {job.job_id}; it is ready for review.\n',
+        settings.DEFAULT_FROM_EMAIL,
+        recipients,
+    )
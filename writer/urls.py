@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('dashboard/', views.writer_dashboard, name='writer_dashboard'),
-    path('start/<slug:job_id>/', views.start_job, name='writer_start'),
-    path('upload-structure/<slug:job_id>/', views.upload_structure, name='writer_upload_structure'),
-    path('upload-final/<slug:job_id>/', views.upload_final, name='writer_upload_final'),
+    path('dashboard/', views.writer_dashboard_async if settings.ASYNC_DASHBOARDS else views.writer_dashboard,
+         name='writer_dashboard'),
+    path('start/<int:pk>/', views.start_job, name='writer_start'),
+    path('upload-structure/<int:pk>/', views.upload_structure, name='writer_upload_structure'),
+    path('upload-final/<int:pk>/', views.upload_final, name='writer_upload_final'),
+    path('files/<int:pk>/<str:field>/', views.deliverable_download, name='writer_deliverable'),
 ]
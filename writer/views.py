@@ -1,29 +1,48 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.views.decorators.http import condition, require_safe
+from crm_project import downloads
+from crm_project.changes import conditional_etag, conditional_last_modified
+from crm_project.downloads import can_access_job_files
+from crm_project.parallel import aload, async_dashboard, load
+from crm_project.uploads import upload_errors
+from marketing import repository
 from marketing.models import Job
+from marketing.stats import writer_stats
 from authentication.models import CustomUser
 from .models import WriterSubmission
 from .forms import StartJobForm, StructureUploadForm, FinalUploadForm
+from .tasks import notify_submission
 
-@login_required
-def writer_dashboard(request):
+DELIVERABLE_FIELDS = ('structure_file', 'final_copy', 'associate_file')
+
+
+def _writer_scopes(request):
     if request.user.role != 'writer':
-        messages.error(request, 'You do not have permission to access the writer dashboard.')
-        return redirect('dashboard')
+        return None
+    return [f'writer:{request.user.pk}', f'user:{request.user.pk}']
 
-    # Jobs assigned to this writer
-    assigned_qs = Job.objects.filter(
-        allocated_to=request.user,
-        status__in=['allocated', 'in_progress', 'submitted']
-    ).order_by('status', 'expected_deadline')
 
+def _writer_loaders(user):
+    return {
+        # Jobs assigned to this writer (read-only rows, see marketing.repository)
+        'assigned': lambda: repository.writer_queue(user),
+        # Stats (one aggregation round trip)
+        'stats': lambda: writer_stats(user),
+    }
+
+
+def _writer_context(user, assigned, stats):
     # Strategic rule: only first job is fully visible, rest appear blurred until the first is submitted
     visible_job = None
     blurred_jobs = []
 
-    for j in assigned_qs:
+    for j in assigned:
         # if a job is already submitted, skip it from the "gate"
         if j.status == 'submitted':
             continue
@@ -32,39 +51,56 @@ def writer_dashboard(request):
         break
 
     if visible_job:
-        blurred_jobs = [j for j in assigned_qs if j.id != visible_job.id]
+        blurred_jobs = [j for j in assigned if j.id != visible_job.id]
     else:
         # either no jobs or all submitted
-        blurred_jobs = list(assigned_qs)
+        blurred_jobs = list(assigned)
 
     # Ensure a submission row exists for the visible job
     if visible_job:
-        WriterSubmission.objects.get_or_create(job=visible_job, writer=request.user)
-
-    # Stats
-    stats = {
-        'assigned_count': Job.objects.filter(allocated_to=request.user, status__in=['allocated', 'in_progress']).count(),
-        'in_progress': Job.objects.filter(allocated_to=request.user, status='in_progress').count(),
-        'completed': Job.objects.filter(allocated_to=request.user, status__in=['submitted', 'completed']).count(),
-        # rating is placeholder, integrate later with a reviews model if needed
-        'rating': 4.8
-    }
+        WriterSubmission.objects.get_or_create(job_id=visible_job.pk, writer=user)
 
-    context = {
+    return {
         'visible_job': visible_job,
         'blurred_jobs': blurred_jobs,
         'stats': stats,
     }
+
+
+@login_required
+@condition(etag_func=conditional_etag(_writer_scopes),
+           last_modified_func=conditional_last_modified(_writer_scopes))
+def writer_dashboard(request):
+    if request.user.role != 'writer':
+        messages.error(request, 'You do not have permission to access the writer dashboard.')
+        return redirect('dashboard')
+
+    context = _writer_context(request.user, **load(_writer_loaders(request.user)))
     return render(request, 'dashboards/writer_dashboard.html', context)
 
 
+@async_dashboard(_writer_scopes)
+async def writer_dashboard_async(request):
+    """
+    ``writer_dashboard`` for ASGI: the job queue and stats are read
+    concurrently.
+    """
+    if request.user.role != 'writer':
+        await sync_to_async(messages.error)(request, 'You do not have permission to access the writer dashboard.')
+        return redirect('dashboard')
+
+    loaded = await aload(_writer_loaders(request.user))
+    context = await sync_to_async(_writer_context)(request.user, **loaded)
+    return await sync_to_async(render)(request, 'dashboards/writer_dashboard.html', context)
+
+
 @login_required
-def start_job(request, job_id):
+def start_job(request, pk):
     if request.user.role != 'writer':
         messages.error(request, 'You do not have permission.')
         return redirect('dashboard')
 
-    job = get_object_or_404(Job, job_id=job_id, allocated_to=request.user)
+    job = get_object_or_404(Job, pk=pk, allocated_to=request.user)
 
     submission, _ = WriterSubmission.objects.get_or_create(job=job, writer=request.user)
 
@@ -85,16 +121,16 @@ def start_job(request, job_id):
 
 
 @login_required
-def upload_structure(request, job_id):
+def upload_structure(request, pk):
     if request.user.role != 'writer':
         messages.error(request, 'You do not have permission.')
         return redirect('dashboard')
 
-    job = get_object_or_404(Job, job_id=job_id, allocated_to=request.user)
+    job = get_object_or_404(Job, pk=pk, allocated_to=request.user)
     submission = get_object_or_404(WriterSubmission, job=job, writer=request.user)
 
     if request.method == 'POST':
-        form = StructureUploadForm(request.POST, request.FILES, instance=submission)
+        form = StructureUploadForm(request.POST, request.FILES, instance=submission, upload_errors=upload_errors(request))
         if form.is_valid():
             form.save()
             # Automatically move job to in_progress if not already
@@ -112,25 +148,45 @@ def upload_structure(request, job_id):
 
 
 @login_required
-def upload_final(request, job_id):
+def upload_final(request, pk):
     if request.user.role != 'writer':
         messages.error(request, 'You do not have permission.')
         return redirect('dashboard')
 
-    job = get_object_or_404(Job, job_id=job_id, allocated_to=request.user)
+    job = get_object_or_404(Job, pk=pk, allocated_to=request.user)
     submission = get_object_or_404(WriterSubmission, job=job, writer=request.user)
 
     if request.method == 'POST':
-        form = FinalUploadForm(request.POST, request.FILES, instance=submission)
+        form = FinalUploadForm(request.POST, request.FILES, instance=submission, upload_errors=upload_errors(request))
         if form.is_valid():
             form.save()
             submission.mark_submitted()
             # Move job to submitted so allocator/process team can take over
             job.status = 'submitted'
             job.save(update_fields=['status', 'updated_at'])
+            notify_submission.enqueue(job.pk)
             messages.success(request, 'Final files uploaded and summary saved. Job submitted for review.')
             return redirect('writer_dashboard')
     else:
         form = FinalUploadForm(instance=submission)
 
     return render(request, 'writer/upload_final.html', {'job': job, 'form': form})
+
+
+@login_required
+@require_safe
+def deliverable_download(request, pk, field):
+    """
+    One of the writer's files for a job (structure, final copy or associated
+    file), for staff and the job's marketer, writer and process user.
+    """
+    if field not in DELIVERABLE_FIELDS:
+        raise Http404('No such file.')
+    job = get_object_or_404(Job.objects.only('created_by', 'allocated_to', 'process_user'), pk=pk)
+    if not can_access_job_files(request.user, job):
+        raise PermissionDenied
+    submission = get_object_or_404(WriterSubmission.objects.only(field), job=job)
+    file = getattr(submission, field)
+    if not file:
+        raise Http404('Not uploaded yet.')
+    return downloads.serve(request, file.name)